@@ -1,5 +1,12 @@
+import bz2
+import gzip
 import json
+import lzma
 import re
+try:
+    import orjson  # Optional faster encoder used by save_to_file(compact=True)
+except ImportError:
+    orjson = None
 def validate_email(email):
     """
     Validates the given email address against a regular expression pattern.
@@ -229,58 +236,140 @@ class Course:
 
 
 #Serialization
-def save_to_file(instructors, courses, students, fileName):
+COMPRESSION_MODULES = {"gzip": gzip, "bz2": bz2, "lzma": lzma}
+
+# Leading bytes of each compressed format, used by load_from_file to pick a reader
+COMPRESSION_MAGIC = {b"\x1f\x8b": gzip, b"BZh": bz2, b"\xfd7zXZ\x00": lzma}
+
+
+def _instructor_entry(instructor):
+    return {
+        "Name": instructor.name,
+        "Age": instructor.age,
+        "Email": instructor._Person__email,
+        "InstructorID": instructor.instructor_id,
+        "Assigned Courses": [course.course_id for course in instructor.assigned_courses]
+    }
+
+
+def _course_entry(course):
+    return {
+        "CourseID": course.course_id,
+        "Course Name": course.course_name,
+        "InstructorID": course.instructor.instructor_id,
+        "Enrolled Students": [student.student_id for student in course.enrolled_students]
+    }
+
+
+def _student_entry(student):
+    return {
+        "Name": student.name,
+        "Age": student.age,
+        "Email": student._Person__email,
+        "StudentID": student.student_id,
+        "Registered Courses": [course.course_id for course in student.registered_courses]
+    }
+
+
+def _entry_encoder(compact, use_fast_encoder):
+    """Returns a function turning one entity dictionary into JSON text."""
+    if not compact:
+        encoder = json.JSONEncoder(indent=4)
+
+        def encode(entry):
+            # Same layout json.dump(..., indent=4) gives an entity nested two levels deep
+            return encoder.encode(entry).replace("\n", "\n        ")
+        return encode
+    if use_fast_encoder and orjson is not None:
+        return lambda entry: orjson.dumps(entry).decode("utf-8")
+    return json.JSONEncoder(separators=(",", ":")).encode
+
+
+def save_to_file(instructors, courses, students, fileName, compact=False, compression=None, use_fast_encoder=True):
     """Saves instructor, course, and student data to a JSON file.
 
+    The document is streamed: each entity is encoded and written on its own, so the whole
+    document is never held in memory and the lists may be any iterables (e.g. generators
+    reading from a database).
+
     Args:
         instructor (list of Instructor): List of instructor objects to serialize.
         courses (list of Course): List of course objects to serialize.
         students (list of Student): List of student objects to serialize.
         file_name (str): The name of the file to save data to.
+        compact (bool): If True, writes no indentation and one entity per line instead of
+            the indented layout of json.dump(..., indent=4).
+        compression (str): None, "gzip", "bz2" or "lzma". load_from_file detects it.
+        use_fast_encoder (bool): In compact mode, encode with orjson when it is installed.
 
     Raises:
+        ValueError: If the compression is not supported.
         Exception: If there is an error in writing to the file.
     """
-    # Prepare data for serialization
-    data = {
-        "Instructor": [
-            {
-                "Name": instructor.name,
-                "Age": instructor.age,
-                "Email": instructor._Person__email, 
-                "InstructorID": instructor.instructor_id,
-                "Assigned Courses": [course.course_id for course in instructor.assigned_courses]
-    }
-    for instructor in instructors  
-
-        ],
-        "Courses": [
-            {
-                "CourseID": course.course_id,
-                "Course Name": course.course_name,
-                "InstructorID": course.instructor.instructor_id,
-                "Enrolled Students": [student.student_id for student in course.enrolled_students]
-            }
-            for course in courses  # Generates a dictionary for each course in the courses list
-        ],
-        "Students": [
-            {
-                "Name": student.name,
-                "Age": student.age,
-                "Email": student._Person__email,  
-                "StudentID": student.student_id,
-                "Registered Courses": [course.course_id for course in student.registered_courses]
-            }
-            for student in students  # Generates a dictionary for each student in the students list
-        ]
-    }
+    save_entries_to_file((_instructor_entry(instructor) for instructor in instructors),
+                         (_course_entry(course) for course in courses),
+                         (_student_entry(student) for student in students),
+                         fileName, compact, compression, use_fast_encoder)
+
+
+def save_entries_to_file(instructors, courses, students, fileName, compact=False, compression=None, use_fast_encoder=True):
+    """Saves already serialized entities (the dictionaries found in a saved file) to a JSON file.
+
+    Takes the same options as save_to_file, which calls it; used to write rosters that are
+    not held as objects, such as a roster patched by roster_diff.apply_patch.
 
-    # Write data to JSON file
+    Args:
+        instructors (iterable of dict): Instructor entries.
+        courses (iterable of dict): Course entries.
+        students (iterable of dict): Student entries.
+        fileName (str): The name of the file to save data to.
+
+    Raises:
+        ValueError: If the compression is not supported.
+        Exception: If there is an error in writing to the file.
+    """
+    if compression is not None and compression not in COMPRESSION_MODULES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    encode = _entry_encoder(compact, use_fast_encoder)
+    sections = [
+        ("Instructor", instructors),
+        ("Courses", courses),
+        ("Students", students),
+    ]
+    # Indented output reproduces json.dump(..., indent=4); compact output puts one entity per line
+    section_indent, entry_indent = ("", "") if compact else ("    ", "        ")
+    colon = ":" if compact else ": "
+
+    # Write data to JSON file, one entity at a time
     try:
-        with open(fileName, 'w') as json_file:
-            json.dump(data, json_file, indent=4)  # Indent for better readability
+        if compression is None:
+            json_file = open(fileName, 'w', encoding='utf-8')
+        else:
+            json_file = COMPRESSION_MODULES[compression].open(fileName, 'wt', encoding='utf-8')
+        with json_file:
+            json_file.write("{" if compact else "{\n")
+            for index, (name, entries) in enumerate(sections):
+                if index:
+                    json_file.write("," if compact else ",\n")
+                json_file.write(f'{section_indent}"{name}"{colon}[')
+                count = 0
+                for entry in entries:
+                    json_file.write(("\n" if count == 0 else ",\n") + entry_indent + encode(entry))
+                    count += 1
+                json_file.write(f"\n{section_indent}]" if count else "]")
+            json_file.write("}\n" if compact else "\n}")
     except Exception as e:
         raise Exception(f"An error occurred while writing to the file: {e}")
+
+
+def open_saved_file(fileName):
+    """Opens a file written by save_to_file for reading as text, decompressing it if needed."""
+    with open(fileName, 'rb') as file:
+        magic = file.read(6)
+    reader = next((module for prefix, module in COMPRESSION_MAGIC.items() if magic.startswith(prefix)), None)
+    if reader is None:
+        return open(fileName, 'r', encoding='utf-8')
+    return reader.open(fileName, 'rt', encoding='utf-8')
     
 
 #Deserialization
@@ -302,7 +391,8 @@ def load_from_file(fileName):
           Student objects.
 
     The function performs the following steps:
-    1. Opens and reads a JSON file specified by the `fileName` parameter.
+    1. Opens and reads a JSON file specified by the `fileName` parameter, decompressing it
+       first if it was saved with gzip, bz2 or lzma compression.
     2. Parses the JSON data to create Instructor objects and stores them in `Instructors_Dict`.
     3. Parses the JSON data to create Course objects, linking each course to its respective 
        instructor from `Instructors_Dict`, and stores them in `Courses_Dict`.
@@ -312,7 +402,7 @@ def load_from_file(fileName):
     5. Assigns courses to instructors, ensuring that each instructor has a record of the 
        courses they teach.
     """
-    with open(fileName, 'r') as file:
+    with open_saved_file(fileName) as file:
         data = json.load(file)
     
     Instructors_Dict = {}
@@ -1,337 +1,635 @@
-import sys
-from PyQt5.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QTabWidget, QComboBox, QMessageBox, QFileDialog, QFormLayout
-)
-from PyQt5.QtCore import Qt
-import sqlite3
-import csv
-
-"""
-School Management System
-------------------------
-This PyQt5-based GUI application manages students, instructors, and courses, 
-allowing users to add, view, and register students for courses. The data is stored in an SQLite database.
-
-Classes and Methods:
---------------------
-SchoolManagementSystem(QMainWindow):
-    - __init__(self): Initializes the GUI, sets up database connection, and creates tabs for different functionalities.
-    - initialize_database(self): Sets up the SQLite database and creates tables for students, instructors, courses, and registrations.
-    - create_add_student_widgets(self): Creates input fields and buttons for adding a student to the database.
-    - create_add_instructor_widgets(self): Creates input fields and buttons for adding an instructor to the database.
-    - create_add_course_widgets(self): Creates input fields and buttons for adding a course to the database.
-    - create_register_course_widgets(self): Creates dropdowns and buttons for registering a student for a course.
-    - create_view_all_widgets(self): Sets up a table to display students and an option to export data to CSV.
-    - refresh_dropdowns(self): Updates the student and course dropdowns when new data is added.
-    - add_student(self): Adds a new student to the 'students' table in the database.
-    - add_instructor(self): Adds a new instructor to the 'instructors' table in the database.
-    - add_course(self): Adds a new course to the 'courses' table in the database.
-    - register_course(self): Registers a student for a course and stores this information in the 'registrations' table.
-    - refresh_view_all(self): Displays all students in the table on the 'View All' tab.
-    - export_to_csv(self): Exports the data from the 'View All' table into a CSV file.
-    - clear_student_inputs(self): Clears the input fields for adding a student.
-    - clear_instructor_inputs(self): Clears the input fields for adding an instructor.
-    - clear_course_inputs(self): Clears the input fields for adding a course.
-
-    Database Tables:
-    ----------------
-    - students: Stores student information (id, name, age, email, unique_id).
-    - instructors: Stores instructor information (id, name, age, email, unique_id).
-    - courses: Stores course information (id, course_id, course_name, instructor_id).
-    - registrations: Stores course registrations (student_id, course_id).
-"""
-class SchoolManagementSystem(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("School Management System")
-        self.setGeometry(100, 100, 800, 600)
-        self.db_connection = None
-        self.cursor = None
-        self.initialize_database()
-        
-        self.tabs = QTabWidget()
-        self.setCentralWidget(self.tabs)
-        
-        self.add_student_tab = QWidget()
-        self.add_instructor_tab = QWidget()
-        self.add_course_tab = QWidget()
-        self.register_course_tab = QWidget()
-        self.view_all_tab = QWidget()
-        
-        self.tabs.addTab(self.add_student_tab, "Add Student")
-        self.tabs.addTab(self.add_instructor_tab, "Add Instructor")
-        self.tabs.addTab(self.add_course_tab, "Add Course")
-        self.tabs.addTab(self.register_course_tab, "Register for Course")
-        self.tabs.addTab(self.view_all_tab, "View All")
-        
-        self.create_add_student_widgets()
-        self.create_add_instructor_widgets()
-        self.create_add_course_widgets()
-        self.create_register_course_widgets()
-        self.create_view_all_widgets()
-
-    def initialize_database(self):
-        self.db_connection = sqlite3.connect("school_management.db")
-        self.cursor = self.db_connection.cursor()
-        # Create tables if they do not exist
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                age INTEGER,
-                email TEXT NOT NULL,
-                unique_id TEXT NOT NULL
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS instructors (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                age INTEGER,
-                email TEXT NOT NULL,
-                unique_id TEXT NOT NULL
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS courses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                course_id TEXT NOT NULL,
-                course_name TEXT NOT NULL,
-                instructor_id TEXT NOT NULL
-            )
-        """)
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS registrations (
-                student_id INTEGER,
-                course_id INTEGER,
-                FOREIGN KEY (student_id) REFERENCES students(id),
-                FOREIGN KEY (course_id) REFERENCES courses(id)
-            )
-        """)
-
-        self.db_connection.commit()
-
-    def create_add_student_widgets(self):
-        layout = QFormLayout()
-        self.student_name = QLineEdit()
-        self.student_age = QLineEdit()
-        self.student_email = QLineEdit()
-        self.student_id = QLineEdit()
-        layout.addRow(QLabel("Name:"), self.student_name)
-        layout.addRow(QLabel("Age:"), self.student_age)
-        layout.addRow(QLabel("Email:"), self.student_email)
-        layout.addRow(QLabel("Student ID:"), self.student_id)
-        
-        add_button = QPushButton("Add Student")
-        add_button.clicked.connect(self.add_student)
-        layout.addWidget(add_button)
-        self.add_student_tab.setLayout(layout)
-
-    def create_add_instructor_widgets(self):
-        layout = QFormLayout()
-        self.instructor_name = QLineEdit()
-        self.instructor_age = QLineEdit()
-        self.instructor_email = QLineEdit()
-        self.instructor_id = QLineEdit()
-        layout.addRow(QLabel("Name:"), self.instructor_name)
-        layout.addRow(QLabel("Age:"), self.instructor_age)
-        layout.addRow(QLabel("Email:"), self.instructor_email)
-        layout.addRow(QLabel("Instructor ID:"), self.instructor_id)
-        
-        add_button = QPushButton("Add Instructor")
-        add_button.clicked.connect(self.add_instructor)
-        layout.addWidget(add_button)
-        self.add_instructor_tab.setLayout(layout)
-
-    def create_add_course_widgets(self):
-        layout = QFormLayout()
-        self.course_id = QLineEdit()
-        self.course_name = QLineEdit()
-        self.instructor_id_course = QLineEdit()
-        layout.addRow(QLabel("Course ID:"), self.course_id)
-        layout.addRow(QLabel("Course Name:"), self.course_name)
-        layout.addRow(QLabel("Instructor ID:"), self.instructor_id_course)
-        
-        add_button = QPushButton("Add Course")
-        add_button.clicked.connect(self.add_course)
-        layout.addWidget(add_button)
-        self.add_course_tab.setLayout(layout)
-
-    def create_register_course_widgets(self):
-        layout = QFormLayout()
-        self.student_dropdown = QComboBox()
-        self.course_dropdown = QComboBox()
-        layout.addRow(QLabel("Select Student:"), self.student_dropdown)
-        layout.addRow(QLabel("Select Course:"), self.course_dropdown)
-        
-        register_button = QPushButton("Register")
-        register_button.clicked.connect(self.register_course)
-        layout.addWidget(register_button)
-        self.register_course_tab.setLayout(layout)
-        
-        self.refresh_dropdowns()
-
-    def create_view_all_widgets(self):
-        self.view_all_table = QTableWidget()
-        self.view_all_table.setColumnCount(5)
-        self.view_all_table.setHorizontalHeaderLabels(['ID', 'Name', 'Age', 'Email', 'Additional Info'])
-        self.view_all_table.horizontalHeader().setStretchLastSection(True)
-        
-        layout = QVBoxLayout()
-        layout.addWidget(self.view_all_table)
-        
-        refresh_button = QPushButton("Refresh")
-        refresh_button.clicked.connect(self.refresh_view_all)
-        layout.addWidget(refresh_button)
-        
-        export_button = QPushButton("Export to CSV")
-        export_button.clicked.connect(self.export_to_csv)
-        layout.addWidget(export_button)
-        
-        self.view_all_tab.setLayout(layout)
-
-    def refresh_dropdowns(self):
-        self.student_dropdown.clear()
-        self.course_dropdown.clear()
-        
-        self.cursor.execute("SELECT name FROM students")
-        students = [row[0] for row in self.cursor.fetchall()]
-        self.student_dropdown.addItems(students)
-        
-        self.cursor.execute("SELECT course_name FROM courses")
-        courses = [row[0] for row in self.cursor.fetchall()]
-        self.course_dropdown.addItems(courses)
-
-    def add_student(self):
-        name = self.student_name.text()
-        age = int(self.student_age.text())
-        email = self.student_email.text()
-        student_id = self.student_id.text()
-        
-        try:
-            self.cursor.execute("""
-                INSERT INTO students (name, age, email, unique_id) 
-                VALUES (?, ?, ?, ?)
-            """, (name, age, email, student_id))
-            self.db_connection.commit()
-            QMessageBox.information(self, "Success", "Student added successfully")
-            self.clear_student_inputs()
-            self.refresh_dropdowns()  # Refresh dropdowns after adding a student
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error adding student: {e}")
-
-    def add_instructor(self):
-        name = self.instructor_name.text()
-        age = int(self.instructor_age.text())
-        email = self.instructor_email.text()
-        instructor_id = self.instructor_id.text()
-        
-        try:
-            self.cursor.execute("""
-                INSERT INTO instructors (name, age, email, unique_id) 
-                VALUES (?, ?, ?, ?)
-            """, (name, age, email, instructor_id))
-            self.db_connection.commit()
-            QMessageBox.information(self, "Success", "Instructor added successfully")
-            self.clear_instructor_inputs()
-            self.refresh_dropdowns()  # Refresh dropdowns if necessary
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error adding instructor: {e}")
-
-    def add_course(self):
-        course_id = self.course_id.text()
-        course_name = self.course_name.text()
-        instructor_id = self.instructor_id_course.text()
-        
-        try:
-            self.cursor.execute("""
-                INSERT INTO courses (course_id, course_name, instructor_id) 
-                VALUES (?, ?, ?)
-            """, (course_id, course_name, instructor_id))
-            self.db_connection.commit()
-            QMessageBox.information(self, "Success", "Course added successfully")
-            self.clear_course_inputs()
-            self.refresh_dropdowns()  # Refresh dropdowns after adding a course
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error adding course: {e}")
-
-    def register_course(self):
-        student_name = self.student_dropdown.currentText()
-        course_name = self.course_dropdown.currentText()
-        
-        try:
-            # Get the student ID from the student's name
-            self.cursor.execute("SELECT id FROM students WHERE name = ?", (student_name,))
-            student_id = self.cursor.fetchone()[0]
-            
-            # Get the course ID from the course name
-            self.cursor.execute("SELECT id FROM courses WHERE course_name = ?", (course_name,))
-            course_id = self.cursor.fetchone()[0]
-            
-            # Insert into the registrations table
-            self.cursor.execute("""
-                INSERT INTO registrations (student_id, course_id)
-                VALUES (?, ?)
-            """, (student_id, course_id))
-            self.db_connection.commit()
-            QMessageBox.information(self, "Success", "Course registered successfully")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Error registering course: {e}")
-
-      
-           
-
-    def refresh_view_all(self):
-        # Clear the table
-        self.view_all_table.clearContents()
-        self.view_all_table.setRowCount(0)
-
-        # Fetch and display students
-        self.cursor.execute("SELECT id, name, age, email, unique_id FROM students")
-        students = self.cursor.fetchall()
-        for row_data in students:
-            row_position = self.view_all_table.rowCount()
-            self.view_all_table.insertRow(row_position)
-            for column, data in enumerate(row_data):
-                self.view_all_table.setItem(row_position, column, QTableWidgetItem(str(data)))
-
-        # Adjust column count and header for the instructors and courses if needed
-
-
-    def export_to_csv(self):
-        filename, _ = QFileDialog.getSaveFileName(self, "Save CSV", "", "CSV Files (*.csv);;All Files (*)")
-        if filename:
-            try:
-                with open(filename, 'w', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(["ID", "Name", "Age", "Email", "Additional Info"])
-                    for row in range(self.view_all_table.rowCount()):
-                        row_data = [self.view_all_table.item(row, col).text() for col in range(self.view_all_table.columnCount())]
-                        writer.writerow(row_data)
-                QMessageBox.information(self, "Success", "Data exported successfully")
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Error exporting data: {e}")
-
-    def clear_student_inputs(self):
-        self.student_name.clear()
-        self.student_age.clear()
-        self.student_email.clear()
-        self.student_id.clear()
-
-    def clear_instructor_inputs(self):
-        self.instructor_name.clear()
-        self.instructor_age.clear()
-        self.instructor_email.clear()
-        self.instructor_id.clear()
-
-    def clear_course_inputs(self):
-        self.course_id.clear()
-        self.course_name.clear()
-        self.instructor_id_course.clear()
-
-
-if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = SchoolManagementSystem()
-    window.show()
-    sys.exit(app.exec_())
+import sys
+from PyQt5.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QTableWidget, QTableWidgetItem, QTabWidget, QComboBox, QMessageBox, QFileDialog, QFormLayout, QCheckBox, QShortcut
+)
+from PyQt5.QtCore import Qt, QTimer
+from PyQt5.QtGui import QBrush, QColor, QKeySequence
+import sqlite3
+import csv
+import school_db
+import concurrency
+from backup import BackupManager
+from batch_entry import StudentBatch, STUDENT_COLUMNS, parse_clipboard
+from events import EventBus, DataVersionWatcher, ChangeEvent, StudentAdded, CourseAdded, RegistrationCreated
+
+"""
+School Management System
+------------------------
+This PyQt5-based GUI application manages students, instructors, and courses, 
+allowing users to add, view, and register students for courses. The data is stored in an SQLite database.
+
+Classes and Methods:
+--------------------
+SchoolManagementSystem(QMainWindow):
+    - __init__(self): Initializes the GUI, sets up database connection, and creates tabs for different functionalities.
+    - initialize_database(self): Sets up the SQLite database and creates tables for students, instructors, courses, and registrations.
+    - create_add_student_widgets(self): Creates input fields and buttons for adding a student to the database,
+      and a batch entry grid for adding many students at once.
+    - create_add_instructor_widgets(self): Creates input fields and buttons for adding an instructor to the database.
+    - create_add_course_widgets(self): Creates input fields and buttons for adding a course to the database.
+    - create_register_course_widgets(self): Creates dropdowns and buttons for registering a student for a course.
+    - create_view_all_widgets(self): Sets up a view selector, sort and filter controls, a paged table to display the
+      selected view and an option to export data to CSV.
+    - on_view_selected(self): Offers the sort keys and filters of the selected view and shows its first page.
+    - sort_by_column(self, column): Sorts by a clicked column header, toggling the direction on a second click.
+    - view_all_filters(self): Reads the filter fields into the filters understood by view_query.
+    - refresh_dropdowns(self): Reloads the student and course dropdowns from the database.
+    - on_student_added(self, event): Appends a new student to the student dropdown.
+    - on_course_added(self, event): Appends a new course to the course dropdown.
+    - add_student(self): Adds a new student to the 'students' table in the database.
+    - batch_rows(self): Reads the text of every cell of the batch entry grid.
+    - show_batch_rows(self, rows): Fills the batch entry grid with rows and validates them.
+    - paste_batch_rows(self): Appends rows pasted from the clipboard (spreadsheet or CSV) to the grid.
+    - add_batch_row(self), clear_batch(self): Add an empty row to the grid, or empty it.
+    - validate_batch(self): Validates every cell with the OOP.py validators and highlights the invalid ones.
+    - commit_batch(self): Adds the valid rows in one transaction and refreshes the dependent views once.
+    - add_instructor(self): Adds a new instructor to the 'instructors' table in the database.
+    - add_course(self): Adds a new course to the 'courses' table in the database.
+    - register_course(self): Registers a student for a course and stores this information in the 'registrations' table.
+    - refresh_view_all(self): Displays the first page of the selected view (students, instructors,
+      courses with enrollment counts, or each student's courses) on the 'View All' tab.
+    - load_view_all_page(self): Displays the page starting after the last key on the page stack.
+    - next_view_all_page(self), previous_view_all_page(self): Move between pages.
+    - on_view_all_change(self, event): Re-reads the rows of the displayed view that a change event affects,
+      updating them in place, or re-reading the page when a row is new or may have moved in the sort order.
+    - schedule_view_all_reload(self), reload_view_all_page(self): Re-read the displayed page once for a burst of changes.
+    - show_view_all_row(self, row_data): Replaces the displayed row with the same ID, or appends it.
+    - export_to_csv(self): Exports every row of the selected 'View All' view, with its sort and filters, into a CSV file.
+    - clear_student_inputs(self): Clears the input fields for adding a student.
+    - clear_instructor_inputs(self): Clears the input fields for adding an instructor.
+    - clear_course_inputs(self): Clears the input fields for adding a course.
+    - closeEvent(self, event): Stops the scheduled backups and closes the database connection.
+
+    Database Tables:
+    ----------------
+    - students: Stores student information (id, name, age, email, unique_id).
+    - instructors: Stores instructor information (id, name, age, email, unique_id).
+    - courses: Stores course information (id, course_id, course_name, instructor_id).
+    - registrations: Stores course registrations (student_id, course_id).
+    - course_enrollment_counts: Number of registrations per course, maintained by triggers.
+    - instructor_view, course_enrollment_view, student_courses_view: SQL views behind 'View All'.
+
+    Sorting and filtering in 'View All' are done by SQLite (ORDER BY/WHERE on indexed columns)
+    and pages are read with keyset pagination, so only the displayed page is ever loaded.
+
+    Change Notifications:
+    ---------------------
+    Writes stage events on self.event_bus and publish them after committing, and a
+    DataVersionWatcher polled once a second publishes rows committed by other processes,
+    so the dropdowns and the 'View All' table apply new rows instead of reloading. The
+    events of a batch entry are collected and applied once, after the whole batch.
+
+    Concurrency:
+    ------------
+    Several copies of the application can share the database file. The connection is in
+    autocommit mode with a BUSY_TIMEOUT busy timeout, and every write runs in one short
+    transaction that is retried with jittered backoff while another copy holds the write
+    lock (see concurrency.py).
+
+    Backups:
+    --------
+    A BackupManager (backup.py) backs the database up every BACKUP_INTERVAL seconds on a
+    background thread while the window is open.
+"""
+
+BACKUP_INTERVAL = 3600
+BUSY_TIMEOUT = 5.0  # Seconds a write waits for another copy of the application before retrying
+INVALID_CELL_COLOR = "#f8d7da"
+
+class SchoolManagementSystem(QMainWindow):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("School Management System")
+        self.setGeometry(100, 100, 800, 600)
+        self.db_connection = None
+        self.cursor = None
+        self.event_bus = EventBus()
+        self.batch_student_names = None  # Collects the names of a batch while it is published
+        self.initialize_database()
+        
+        self.tabs = QTabWidget()
+        self.setCentralWidget(self.tabs)
+        
+        self.add_student_tab = QWidget()
+        self.add_instructor_tab = QWidget()
+        self.add_course_tab = QWidget()
+        self.register_course_tab = QWidget()
+        self.view_all_tab = QWidget()
+        
+        self.tabs.addTab(self.add_student_tab, "Add Student")
+        self.tabs.addTab(self.add_instructor_tab, "Add Instructor")
+        self.tabs.addTab(self.add_course_tab, "Add Course")
+        self.tabs.addTab(self.register_course_tab, "Register for Course")
+        self.tabs.addTab(self.view_all_tab, "View All")
+        
+        self.create_add_student_widgets()
+        self.create_add_instructor_widgets()
+        self.create_add_course_widgets()
+        self.create_register_course_widgets()
+        self.create_view_all_widgets()
+
+        # Views apply row-level changes published by this window or detected on disk
+        self.event_bus.subscribe(StudentAdded, self.on_student_added)
+        self.event_bus.subscribe(CourseAdded, self.on_course_added)
+        self.event_bus.subscribe(ChangeEvent, self.on_view_all_change)
+        self.change_watcher = DataVersionWatcher(self.db_connection, self.event_bus, school_db.WATCHED_TABLES)
+        self.change_timer = QTimer(self)
+        self.change_timer.timeout.connect(self.change_watcher.poll)
+        self.change_timer.start(1000)
+
+        # Online backups on a background thread; see backup.py
+        self.backups = BackupManager(school_db.DATABASE_FILE)
+        self.backups.start(BACKUP_INTERVAL)
+
+    def closeEvent(self, event):
+        self.backups.stop()
+        self.db_connection.close()
+        super().closeEvent(event)
+
+    def initialize_database(self):
+        self.db_connection = concurrency.connect(school_db.DATABASE_FILE, busy_timeout=BUSY_TIMEOUT)
+        self.cursor = self.db_connection.cursor()
+        # Create (or migrate) the tables in one transaction, so copies starting together do not race
+        concurrency.run_transaction(self.db_connection, school_db.create_tables)
+
+    def create_add_student_widgets(self):
+        layout = QFormLayout()
+        self.student_name = QLineEdit()
+        self.student_age = QLineEdit()
+        self.student_email = QLineEdit()
+        self.student_id = QLineEdit()
+        layout.addRow(QLabel("Name:"), self.student_name)
+        layout.addRow(QLabel("Age:"), self.student_age)
+        layout.addRow(QLabel("Email:"), self.student_email)
+        layout.addRow(QLabel("Student ID:"), self.student_id)
+        
+        add_button = QPushButton("Add Student")
+        add_button.clicked.connect(self.add_student)
+        layout.addWidget(add_button)
+
+        # Batch entry: rows typed or pasted into the grid are validated as they change
+        self.student_batch = StudentBatch(self.cursor, school_db.WATCHED_TABLES[0])
+        self.batch_table = QTableWidget(0, len(STUDENT_COLUMNS))
+        self.batch_table.setHorizontalHeaderLabels(STUDENT_COLUMNS)
+        self.batch_table.horizontalHeader().setStretchLastSection(True)
+        self.batch_table.itemChanged.connect(lambda item: self.validate_batch())
+        self.batch_paste_shortcut = QShortcut(QKeySequence.Paste, self.batch_table, self.paste_batch_rows,
+                                              context=Qt.WidgetShortcut)
+        self.batch_status = QLabel("Paste rows of Name, Age, Email, Student ID from a spreadsheet or CSV")
+        batch_buttons = QHBoxLayout()
+        for text, slot in (("Paste Rows", self.paste_batch_rows), ("Add Row", self.add_batch_row),
+                           ("Clear", self.clear_batch), ("Add Valid Students", self.commit_batch)):
+            button = QPushButton(text)
+            button.clicked.connect(slot)
+            batch_buttons.addWidget(button)
+        layout.addRow(QLabel("Batch Entry:"), self.batch_status)
+        layout.addRow(self.batch_table)
+        layout.addRow(batch_buttons)
+        self.add_student_tab.setLayout(layout)
+
+    def create_add_instructor_widgets(self):
+        layout = QFormLayout()
+        self.instructor_name = QLineEdit()
+        self.instructor_age = QLineEdit()
+        self.instructor_email = QLineEdit()
+        self.instructor_id = QLineEdit()
+        layout.addRow(QLabel("Name:"), self.instructor_name)
+        layout.addRow(QLabel("Age:"), self.instructor_age)
+        layout.addRow(QLabel("Email:"), self.instructor_email)
+        layout.addRow(QLabel("Instructor ID:"), self.instructor_id)
+        
+        add_button = QPushButton("Add Instructor")
+        add_button.clicked.connect(self.add_instructor)
+        layout.addWidget(add_button)
+        self.add_instructor_tab.setLayout(layout)
+
+    def create_add_course_widgets(self):
+        layout = QFormLayout()
+        self.course_id = QLineEdit()
+        self.course_name = QLineEdit()
+        self.instructor_id_course = QLineEdit()
+        layout.addRow(QLabel("Course ID:"), self.course_id)
+        layout.addRow(QLabel("Course Name:"), self.course_name)
+        layout.addRow(QLabel("Instructor ID:"), self.instructor_id_course)
+        
+        add_button = QPushButton("Add Course")
+        add_button.clicked.connect(self.add_course)
+        layout.addWidget(add_button)
+        self.add_course_tab.setLayout(layout)
+
+    def create_register_course_widgets(self):
+        layout = QFormLayout()
+        self.student_dropdown = QComboBox()
+        self.course_dropdown = QComboBox()
+        layout.addRow(QLabel("Select Student:"), self.student_dropdown)
+        layout.addRow(QLabel("Select Course:"), self.course_dropdown)
+        
+        register_button = QPushButton("Register")
+        register_button.clicked.connect(self.register_course)
+        layout.addWidget(register_button)
+        self.register_course_tab.setLayout(layout)
+        
+        self.refresh_dropdowns()
+
+    def create_view_all_widgets(self):
+        self.view_selector = QComboBox()
+        self.view_selector.addItems(list(school_db.VIEW_ALL))
+        self.view_selector.currentIndexChanged.connect(lambda index: self.on_view_selected())
+        self.sort_selector = QComboBox()
+        self.descending_checkbox = QCheckBox("Descending")
+        self.view_all_table = QTableWidget()
+        self.view_all_table.horizontalHeader().setStretchLastSection(True)
+        self.view_all_table.horizontalHeader().sectionClicked.connect(self.sort_by_column)
+        self.view_all_positions = {}  # Row ID -> table row, used to apply changes in place
+        self.view_all_reload_pending = False
+        self.view_all_page_keys = [None]  # Keyset of each page visited; None is the first page
+        self.view_all_next_key = None
+        self.view_all_current_filters = {}
+
+        # Filter name (see view_query.where_clause) -> (field, filter supported by the view)
+        self.filter_name = QLineEdit()
+        self.filter_age_min = QLineEdit()
+        self.filter_age_max = QLineEdit()
+        self.filter_email_domain = QLineEdit()
+        self.filter_id = QLineEdit()
+        self.filter_fields = {
+            "name": (self.filter_name, "name"),
+            "age_min": (self.filter_age_min, "age"),
+            "age_max": (self.filter_age_max, "age"),
+            "email_domain": (self.filter_email_domain, "email"),
+            "id": (self.filter_id, "id"),
+        }
+        self.filter_name.setPlaceholderText("Name starts with")
+        self.filter_age_min.setPlaceholderText("Min age")
+        self.filter_age_max.setPlaceholderText("Max age")
+        self.filter_email_domain.setPlaceholderText("Email domain, e.g. aub.edu")
+        self.filter_id.setPlaceholderText("ID starts with")
+        
+        layout = QVBoxLayout()
+        selector_layout = QHBoxLayout()
+        selector_layout.addWidget(QLabel("View:"))
+        selector_layout.addWidget(self.view_selector)
+        selector_layout.addWidget(QLabel("Sort by:"))
+        selector_layout.addWidget(self.sort_selector)
+        selector_layout.addWidget(self.descending_checkbox)
+        layout.addLayout(selector_layout)
+
+        filter_layout = QHBoxLayout()
+        for field, _ in self.filter_fields.values():
+            field.returnPressed.connect(self.refresh_view_all)
+            filter_layout.addWidget(field)
+        apply_button = QPushButton("Apply")
+        apply_button.clicked.connect(self.refresh_view_all)
+        filter_layout.addWidget(apply_button)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.view_all_table)
+
+        page_layout = QHBoxLayout()
+        self.previous_page_button = QPushButton("Previous Page")
+        self.previous_page_button.clicked.connect(self.previous_view_all_page)
+        self.next_page_button = QPushButton("Next Page")
+        self.next_page_button.clicked.connect(self.next_view_all_page)
+        page_layout.addWidget(self.previous_page_button)
+        page_layout.addWidget(self.next_page_button)
+        layout.addLayout(page_layout)
+        
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh_view_all)
+        layout.addWidget(refresh_button)
+        
+        export_button = QPushButton("Export to CSV")
+        export_button.clicked.connect(self.export_to_csv)
+        layout.addWidget(export_button)
+        
+        self.view_all_tab.setLayout(layout)
+        self.sort_selector.currentIndexChanged.connect(lambda index: self.refresh_view_all())
+        self.descending_checkbox.toggled.connect(lambda checked: self.refresh_view_all())
+        self.on_view_selected()
+
+    def on_view_selected(self):
+        view = school_db.VIEW_ALL[self.view_selector.currentText()]
+        sort, descending = view["default_sort"]
+        # Change the sort controls without each change reloading the table
+        self.sort_selector.blockSignals(True)
+        self.descending_checkbox.blockSignals(True)
+        self.sort_selector.clear()
+        self.sort_selector.addItems(list(view["sorts"]))
+        self.sort_selector.setCurrentText(sort)
+        self.descending_checkbox.setChecked(descending)
+        self.sort_selector.blockSignals(False)
+        self.descending_checkbox.blockSignals(False)
+        for field, supported in self.filter_fields.values():
+            field.setEnabled(supported in view["filters"])
+        self.refresh_view_all()
+
+    def sort_by_column(self, column):
+        header = school_db.VIEW_ALL[self.view_selector.currentText()]["headers"][column]
+        if self.sort_selector.findText(header) < 0:
+            return  # Not an indexed sort key
+        if self.sort_selector.currentText() == header:
+            self.descending_checkbox.setChecked(not self.descending_checkbox.isChecked())
+        else:
+            self.sort_selector.setCurrentText(header)
+
+    def view_all_filters(self):
+        filters = {}
+        for key, (field, _) in self.filter_fields.items():
+            text = field.text().strip()
+            if not field.isEnabled() or not text:
+                continue
+            filters[key] = int(text) if key in ("age_min", "age_max") else text
+        return filters
+
+    def refresh_dropdowns(self):
+        self.student_dropdown.clear()
+        self.course_dropdown.clear()
+        
+        self.cursor.execute("SELECT name FROM students")
+        students = [row[0] for row in self.cursor.fetchall()]
+        self.student_dropdown.addItems(students)
+        
+        self.cursor.execute("SELECT course_name FROM courses")
+        courses = [row[0] for row in self.cursor.fetchall()]
+        self.course_dropdown.addItems(courses)
+
+    def on_student_added(self, event):
+        name, age, email, unique_id = event.row
+        if self.batch_student_names is not None:
+            self.batch_student_names.append(name)
+        else:
+            self.student_dropdown.addItem(name)
+
+    def on_course_added(self, event):
+        course_id, course_name, instructor_id = event.row
+        self.course_dropdown.addItem(course_name)
+
+    def add_student(self):
+        name = self.student_name.text()
+        age = int(self.student_age.text())
+        email = self.student_email.text()
+        student_id = self.student_id.text()
+        
+        try:
+            # Dropdowns and the 'View All' table append the new student once it commits
+            concurrency.run_transaction(
+                self.db_connection, lambda cursor: school_db.add_student(cursor, name, age, email, student_id, bus=self.event_bus),
+                bus=self.event_bus)
+            QMessageBox.information(self, "Success", "Student added successfully")
+            self.clear_student_inputs()
+        except Exception as e:
+            self.event_bus.discard()
+            QMessageBox.critical(self, "Error", f"Error adding student: {e}")
+
+    def batch_rows(self):
+        rows = []
+        for row in range(self.batch_table.rowCount()):
+            items = [self.batch_table.item(row, column) for column in range(self.batch_table.columnCount())]
+            rows.append([item.text() if item is not None else "" for item in items])
+        return rows
+
+    def show_batch_rows(self, rows):
+        self.batch_table.blockSignals(True)
+        self.batch_table.setRowCount(len(rows))
+        for row, cells in enumerate(rows):
+            for column, text in enumerate(cells):
+                self.batch_table.setItem(row, column, QTableWidgetItem(text))
+        self.batch_table.blockSignals(False)
+        self.validate_batch()
+
+    def paste_batch_rows(self):
+        rows = [cells for cells in self.batch_rows() if any(cell.strip() for cell in cells)]
+        self.show_batch_rows(rows + parse_clipboard(QApplication.clipboard().text()))
+
+    def add_batch_row(self):
+        self.batch_table.insertRow(self.batch_table.rowCount())
+
+    def clear_batch(self):
+        self.show_batch_rows([])
+
+    def validate_batch(self):
+        self.student_batch.set_rows(self.batch_rows())
+        errors = self.student_batch.validate()
+        invalid = 0
+        # Colouring the cells would emit itemChanged and validate again
+        self.batch_table.blockSignals(True)
+        for row, (cells, row_errors) in enumerate(zip(self.student_batch.rows, errors)):
+            blank = not any(cells)  # Empty rows are ignored rather than flagged
+            for column, error in enumerate(row_errors):
+                item = self.batch_table.item(row, column)
+                if item is None:
+                    item = QTableWidgetItem("")
+                    self.batch_table.setItem(row, column, item)
+                item.setBackground(QBrush(QColor(INVALID_CELL_COLOR)) if error and not blank else QBrush())
+                item.setToolTip("" if blank else error or "")
+            invalid += any(row_errors) and not blank
+        self.batch_table.blockSignals(False)
+        valid = sum(not any(row_errors) for row_errors in errors)
+        self.batch_status.setText(f"{valid} valid rows, {invalid} rows with errors")
+
+    def commit_batch(self):
+        self.student_batch.set_rows(self.batch_rows())
+        try:
+            inserted = concurrency.retry(lambda: self.student_batch.commit(self.db_connection, self.event_bus))
+        except sqlite3.Error as e:
+            QMessageBox.critical(self, "Error", f"Error adding students: {e}")
+            return
+        # The dropdown and the 'View All' page are updated once for the whole batch
+        self.batch_student_names = []
+        try:
+            self.event_bus.flush()
+        finally:
+            names, self.batch_student_names = self.batch_student_names, None
+        self.student_dropdown.addItems(names)
+        self.load_view_all_page()
+        self.show_batch_rows(self.student_batch.rows)
+        self.batch_status.setText(f"Added {len(inserted)} students; {len(self.student_batch.rows)} rows left")
+
+    def add_instructor(self):
+        name = self.instructor_name.text()
+        age = int(self.instructor_age.text())
+        email = self.instructor_email.text()
+        instructor_id = self.instructor_id.text()
+        
+        try:
+            concurrency.run_transaction(
+                self.db_connection, lambda cursor: school_db.add_instructor(cursor, name, age, email, instructor_id, bus=self.event_bus),
+                bus=self.event_bus)
+            QMessageBox.information(self, "Success", "Instructor added successfully")
+            self.clear_instructor_inputs()
+        except Exception as e:
+            self.event_bus.discard()
+            QMessageBox.critical(self, "Error", f"Error adding instructor: {e}")
+
+    def add_course(self):
+        course_id = self.course_id.text()
+        course_name = self.course_name.text()
+        instructor_id = self.instructor_id_course.text()
+        
+        try:
+            # The course dropdown appends the new course once it commits
+            concurrency.run_transaction(
+                self.db_connection, lambda cursor: school_db.add_course(cursor, course_id, course_name, instructor_id, bus=self.event_bus),
+                bus=self.event_bus)
+            QMessageBox.information(self, "Success", "Course added successfully")
+            self.clear_course_inputs()
+        except Exception as e:
+            self.event_bus.discard()
+            QMessageBox.critical(self, "Error", f"Error adding course: {e}")
+
+    def register_course(self):
+        student_name = self.student_dropdown.currentText()
+        course_name = self.course_dropdown.currentText()
+        
+        def register(cursor):
+            # Get the student ID from the student's name
+            cursor.execute("SELECT id FROM students WHERE name = ?", (student_name,))
+            student_id = cursor.fetchone()[0]
+
+            # Get the course ID from the course name
+            cursor.execute("SELECT id FROM courses WHERE course_name = ?", (course_name,))
+            course_id = cursor.fetchone()[0]
+
+            # Insert into the registrations table
+            cursor.execute("""
+                INSERT INTO registrations (student_id, course_id)
+                VALUES (?, ?)
+            """, (student_id, course_id))
+            self.event_bus.stage(RegistrationCreated(cursor.lastrowid, (student_id, course_id)))
+
+        try:
+            concurrency.run_transaction(self.db_connection, register, bus=self.event_bus)
+            QMessageBox.information(self, "Success", "Course registered successfully")
+        except Exception as e:
+            self.event_bus.discard()
+            QMessageBox.critical(self, "Error", f"Error registering course: {e}")
+
+      
+           
+
+    def refresh_view_all(self):
+        try:
+            self.view_all_current_filters = self.view_all_filters()
+        except ValueError:
+            QMessageBox.critical(self, "Error", "Age filters must be whole numbers")
+            return
+        self.view_all_page_keys = [None]
+        self.load_view_all_page()
+
+    def load_view_all_page(self):
+        view = self.view_selector.currentText()
+        headers = school_db.VIEW_ALL[view]["headers"]
+
+        # Clear the table and set the columns of the selected view
+        self.view_all_table.clearContents()
+        self.view_all_table.setRowCount(0)
+        self.view_all_table.setColumnCount(len(headers))
+        self.view_all_table.setHorizontalHeaderLabels(headers)
+        self.view_all_positions = {}
+
+        # SQLite sorts, filters and pages; counts come from the trigger-maintained summary table
+        rows, self.view_all_next_key = school_db.view_all_rows(
+            self.cursor, view, self.sort_selector.currentText(), self.descending_checkbox.isChecked(),
+            self.view_all_current_filters, self.view_all_page_keys[-1])
+        for row_data in rows:
+            self.show_view_all_row(row_data)
+        self.previous_page_button.setEnabled(len(self.view_all_page_keys) > 1)
+        self.next_page_button.setEnabled(self.view_all_next_key is not None)
+
+    def next_view_all_page(self):
+        if self.view_all_next_key is not None:
+            self.view_all_page_keys.append(self.view_all_next_key)
+            self.load_view_all_page()
+
+    def previous_view_all_page(self):
+        if len(self.view_all_page_keys) > 1:
+            self.view_all_page_keys.pop()
+            self.load_view_all_page()
+
+    def on_view_all_change(self, event):
+        if self.batch_student_names is not None:
+            return  # commit_batch reloads the page once instead
+        view = self.view_selector.currentText()
+        spec = school_db.VIEW_ALL[view]
+        # A changed row keeps its place only when the page is sorted by row id alone
+        by_row_id = spec["sorts"].get(self.sort_selector.currentText()) == [spec.get("id", "id")]
+        for row_id in school_db.view_all_changes(self.cursor, event, view):
+            row_data = school_db.view_all_row(self.cursor, view, row_id, self.view_all_current_filters)
+            if row_id in self.view_all_positions:
+                if row_data is not None and not self.view_all_row_changed(row_data):
+                    continue
+                if row_data is not None and by_row_id:
+                    self.show_view_all_row(row_data)
+                    continue
+            elif row_data is None:
+                continue
+            # A new row, or one whose sort key may have moved: re-read the page in sorted order
+            self.schedule_view_all_reload()
+
+    def view_all_row_changed(self, row_data):
+        row_position = self.view_all_positions[row_data[0]]
+        return any(self.view_all_table.item(row_position, column).text() != ("" if data is None else str(data))
+                   for column, data in enumerate(row_data))
+
+    def schedule_view_all_reload(self):
+        # Events arriving together (a batch committed by another copy) cost one reload
+        if not self.view_all_reload_pending:
+            self.view_all_reload_pending = True
+            QTimer.singleShot(0, self.reload_view_all_page)
+
+    def reload_view_all_page(self):
+        self.view_all_reload_pending = False
+        self.load_view_all_page()
+
+    def show_view_all_row(self, row_data):
+        row_position = self.view_all_positions.get(row_data[0])
+        if row_position is None:
+            row_position = self.view_all_table.rowCount()
+            self.view_all_table.insertRow(row_position)
+            self.view_all_positions[row_data[0]] = row_position
+        for column, data in enumerate(row_data):
+            self.view_all_table.setItem(row_position, column, QTableWidgetItem("" if data is None else str(data)))
+
+    def export_to_csv(self):
+        filename, _ = QFileDialog.getSaveFileName(self, "Save CSV", "", "CSV Files (*.csv);;All Files (*)")
+        if filename:
+            try:
+                with open(filename, 'w', newline='') as file:
+                    writer = csv.writer(file)
+                    view = self.view_selector.currentText()
+                    writer.writerow(school_db.VIEW_ALL[view]["headers"])
+                    # The whole view, not just the page on screen, one page in memory at a time
+                    key = None
+                    while True:
+                        rows, key = school_db.view_all_rows(
+                            self.cursor, view, self.sort_selector.currentText(), self.descending_checkbox.isChecked(),
+                            self.view_all_current_filters, key)
+                        writer.writerows(["" if data is None else data for data in row_data] for row_data in rows)
+                        if key is None:
+                            break
+                QMessageBox.information(self, "Success", "Data exported successfully")
+            except Exception as e:
+                QMessageBox.critical(self, "Error", f"Error exporting data: {e}")
+
+    def clear_student_inputs(self):
+        self.student_name.clear()
+        self.student_age.clear()
+        self.student_email.clear()
+        self.student_id.clear()
+
+    def clear_instructor_inputs(self):
+        self.instructor_name.clear()
+        self.instructor_age.clear()
+        self.instructor_email.clear()
+        self.instructor_id.clear()
+
+    def clear_course_inputs(self):
+        self.course_id.clear()
+        self.course_name.clear()
+        self.instructor_id_course.clear()
+
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = SchoolManagementSystem()
+    window.show()
+    sys.exit(app.exec_())
@@ -1,300 +1,784 @@
-import tkinter as tk
-from tkinter import ttk
-from tkinter import messagebox, filedialog
-import sqlite3
-import csv
-"""School Management System Application using Tkinter and SQLite
-
-This application provides a GUI interface for managing students, instructors, and courses in a school.
-It allows users to add records, register students for courses, and view all records.
-
-Classes:
-    SchoolManagementApp: A class that creates the main application window and handles database interactions.
-
-Functions:
-    __init__(self): Initializes the application, creates the UI, and sets up the database.
-    get_database_connection(self): Returns a connection to the SQLite database.
-    setup_database(self): Creates the database tables if they don't exist.
-    create_student_widgets(self): Creates and sets up the UI elements for adding students.
-    create_instructor_widgets(self): Creates and sets up the UI elements for adding instructors.
-    create_course_widgets(self): Creates and sets up the UI elements for adding courses.
-    create_registration_widgets(self): Creates and sets up the UI elements for registering students to courses.
-    create_view_all_widgets(self): Creates and sets up the UI elements for viewing all student records.
-    add_student_record(self): Adds a new student record to the database.
-    update_comboboxes(self): Updates the values in the student and course dropdown menus.
-    add_instructor_record(self): Adds a new instructor record to the database.
-    add_course_record(self): Adds a new course record to the database.
-    register_student_course(self): Registers a student for a course.
-    refresh_view_all_records(self): Refreshes the records displayed in the "View All" tab.
-    clear_student_entries(self): Clears the student input fields after submission.
-    clear_instructor_entries(self): Clears the instructor input fields after submission.
-    clear_course_entries(self): Clears the course input fields after submission.
-    on_closing(self): Handles the application close event and closes the database connection.
-"""
-
-import tkinter as tk
-class SchoolManagementApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("School Management System")
-        self.geometry("600x400")
-        self.database_connection = None
-        self.database_cursor = None
-        self.setup_database()
-        
-        self.tab_control = ttk.Notebook(self)
-        self.tab_control.pack(expand=1, fill="both")
-
-        self.add_student_frame = ttk.Frame(self.tab_control)
-        self.add_instructor_frame = ttk.Frame(self.tab_control)
-        self.add_course_frame = ttk.Frame(self.tab_control)
-        self.register_course_frame = ttk.Frame(self.tab_control)
-        self.view_all_frame = ttk.Frame(self.tab_control)
-
-        self.tab_control.add(self.add_student_frame, text="Add Student")
-        self.tab_control.add(self.add_instructor_frame, text="Add Instructor")
-        self.tab_control.add(self.add_course_frame, text="Add Course")
-        self.tab_control.add(self.register_course_frame, text="Register for Course")
-        self.tab_control.add(self.view_all_frame, text="View All")
-
-        self.create_student_widgets()
-        self.create_instructor_widgets()
-        self.create_course_widgets()
-        self.create_registration_widgets()
-        self.create_view_all_widgets()
-
-    def get_database_connection(self):
-        if not self.database_connection:
-            self.database_connection = sqlite3.connect('school.db')
-            self.database_cursor = self.database_connection.cursor()
-        return self.database_connection
-
-    def setup_database(self):
-        conn = self.get_database_connection()
-        self.database_cursor.execute(""" 
-            CREATE TABLE IF NOT EXISTS students (
-                student_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_name TEXT NOT NULL,
-                student_age INTEGER NOT NULL,
-                student_email TEXT NOT NULL,
-                unique_student_id TEXT NOT NULL UNIQUE
-            )
-        """)
-        self.database_cursor.execute("""
-            CREATE TABLE IF NOT EXISTS instructors (
-                instructor_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                instructor_name TEXT NOT NULL,
-                instructor_age INTEGER NOT NULL,
-                instructor_email TEXT NOT NULL,
-                unique_instructor_id TEXT NOT NULL UNIQUE
-            )
-        """)
-        self.database_cursor.execute("""
-            CREATE TABLE IF NOT EXISTS courses (
-                course_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                unique_course_id TEXT NOT NULL UNIQUE,
-                course_title TEXT NOT NULL,
-                course_instructor_id TEXT NOT NULL,
-                FOREIGN KEY (course_instructor_id) REFERENCES instructors (unique_instructor_id)
-            )
-        """)
-        self.database_cursor.execute("""
-            CREATE TABLE IF NOT EXISTS registrations (
-                registration_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_ref_id TEXT NOT NULL,
-                course_ref_id TEXT NOT NULL,
-                FOREIGN KEY (student_ref_id) REFERENCES students (unique_student_id),
-                FOREIGN KEY (course_ref_id) REFERENCES courses (unique_course_id)
-            )
-        """)
-        conn.commit()
-
-    def create_student_widgets(self):
-        tk.Label(self.add_student_frame, text="Name:").pack()
-        self.student_name_entry = tk.Entry(self.add_student_frame)
-        self.student_name_entry.pack()
-
-        tk.Label(self.add_student_frame, text="Age:").pack()
-        self.student_age_entry = tk.Entry(self.add_student_frame)
-        self.student_age_entry.pack()
-
-        tk.Label(self.add_student_frame, text="Email:").pack()
-        self.student_email_entry = tk.Entry(self.add_student_frame)
-        self.student_email_entry.pack()
-
-        tk.Label(self.add_student_frame, text="Student ID:").pack()
-        self.student_id_entry = tk.Entry(self.add_student_frame)
-        self.student_id_entry.pack()
-
-        tk.Button(self.add_student_frame, text="Add Student", command=self.add_student_record).pack()
-
-    def create_instructor_widgets(self):
-        tk.Label(self.add_instructor_frame, text="Name:").pack()
-        self.instructor_name_entry = tk.Entry(self.add_instructor_frame)
-        self.instructor_name_entry.pack()
-
-        tk.Label(self.add_instructor_frame, text="Age:").pack()
-        self.instructor_age_entry = tk.Entry(self.add_instructor_frame)
-        self.instructor_age_entry.pack()
-
-        tk.Label(self.add_instructor_frame, text="Email:").pack()
-        self.instructor_email_entry = tk.Entry(self.add_instructor_frame)
-        self.instructor_email_entry.pack()
-
-        tk.Label(self.add_instructor_frame, text="Instructor ID:").pack()
-        self.instructor_id_entry = tk.Entry(self.add_instructor_frame)
-        self.instructor_id_entry.pack()
-
-        tk.Button(self.add_instructor_frame, text="Add Instructor", command=self.add_instructor_record).pack()
-
-    def create_course_widgets(self):
-        tk.Label(self.add_course_frame, text="Course ID:").pack()
-        self.course_id_entry = tk.Entry(self.add_course_frame)
-        self.course_id_entry.pack()
-
-        tk.Label(self.add_course_frame, text="Course Name:").pack()
-        self.course_name_entry = tk.Entry(self.add_course_frame)
-        self.course_name_entry.pack()
-
-        tk.Label(self.add_course_frame, text="Instructor ID:").pack()
-        self.course_instructor_id_entry = tk.Entry(self.add_course_frame)
-        self.course_instructor_id_entry.pack()
-
-        tk.Button(self.add_course_frame, text="Add Course", command=self.add_course_record).pack()
-
-    def create_registration_widgets(self):
-        tk.Label(self.register_course_frame, text="Select Student:").pack()
-        self.student_combobox = ttk.Combobox(self.register_course_frame)
-        self.student_combobox.pack()
-        
-        tk.Label(self.register_course_frame, text="Select Course:").pack()
-        self.course_combobox = ttk.Combobox(self.register_course_frame)
-        self.course_combobox.pack()
-        self.update_comboboxes()
-        tk.Button(self.register_course_frame, text="Register", command=self.register_student_course).pack()
-        
-    def create_view_all_widgets(self):
-        self.view_all_tree = ttk.Treeview(self.view_all_frame, columns=("ID", "Name", "Age", "Email", "Additional Info"), show="headings")
-        self.view_all_tree.heading("ID", text="ID")
-        self.view_all_tree.heading("Name", text="Name")
-        self.view_all_tree.heading("Age", text="Age")
-        self.view_all_tree.heading("Email", text="Email")
-        self.view_all_tree.heading("Additional Info", text="Additional Info")
-        self.view_all_tree.pack(expand=1, fill="both")
-
-        tk.Button(self.view_all_frame, text="Refresh", command=self.refresh_view_all_records).pack()
-     
-    def add_student_record(self):
-        name = self.student_name_entry.get()
-        age = int(self.student_age_entry.get())
-        email = self.student_email_entry.get()
-        unique_id = self.student_id_entry.get()
-        
-        try:
-            conn = self.get_database_connection()
-            self.database_cursor.execute(""" 
-                INSERT INTO students (student_name, student_age, student_email, unique_student_id)
-                VALUES (?, ?, ?, ?)
-            """, (name, age, email, unique_id))
-            conn.commit()
-            messagebox.showinfo("Success", "Student added successfully")
-            self.clear_student_entries()
-            
-            # Update the dropdowns after adding a student
-            self.update_comboboxes()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error adding student: {e}")
-
-    def update_comboboxes(self):
-        self.student_combobox['values'] = [row[0] for row in self.database_cursor.execute("SELECT student_name FROM students").fetchall()]
-        self.course_combobox['values'] = [row[0] for row in self.database_cursor.execute("SELECT course_title FROM courses").fetchall()]
-
-    def add_instructor_record(self):
-        name = self.instructor_name_entry.get()
-        age = int(self.instructor_age_entry.get())
-        email = self.instructor_email_entry.get()
-        unique_id = self.instructor_id_entry.get()
-        
-        try:
-            conn = self.get_database_connection()
-            self.database_cursor.execute(""" 
-                INSERT INTO instructors (instructor_name, instructor_age, instructor_email, unique_instructor_id)
-                VALUES (?, ?, ?, ?)
-            """, (name, age, email, unique_id))
-            conn.commit()
-            messagebox.showinfo("Success", "Instructor added successfully")
-            self.clear_instructor_entries()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error adding instructor: {e}")
-
-    def add_course_record(self):
-        unique_id = self.course_id_entry.get()
-        title = self.course_name_entry.get()
-        instructor_id = self.course_instructor_id_entry.get()
-        
-        try:
-            conn = self.get_database_connection()
-            self.database_cursor.execute(""" 
-                INSERT INTO courses (unique_course_id, course_title, course_instructor_id)
-                VALUES (?, ?, ?)
-            """, (unique_id, title, instructor_id))
-            conn.commit()
-            messagebox.showinfo("Success", "Course added successfully")
-            self.clear_course_entries()
-            self.update_comboboxes()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error adding course: {e}")
-
-    def register_student_course(self):
-        selected_student_name = self.student_combobox.get()
-        selected_course_name = self.course_combobox.get()
-        
-        try:
-            conn = self.get_database_connection()
-            self.database_cursor.execute("SELECT unique_student_id FROM students WHERE student_name = ?", (selected_student_name,))
-            student_ref_id = self.database_cursor.fetchone()[0]
-            self.database_cursor.execute("SELECT unique_course_id FROM courses WHERE course_title = ?", (selected_course_name,))
-            course_ref_id = self.database_cursor.fetchone()[0]
-            self.database_cursor.execute(""" 
-                INSERT INTO registrations (student_ref_id, course_ref_id)
-                VALUES (?, ?)
-            """, (student_ref_id, course_ref_id))
-            conn.commit()
-            messagebox.showinfo("Success", "Student registered for course successfully")
-            self.update_comboboxes()
-        except Exception as e:
-            messagebox.showerror("Error", f"Error registering student for course: {e}")
-
-    def refresh_view_all_records(self):
-        for i in self.view_all_tree.get_children():
-            self.view_all_tree.delete(i)
-        records = self.database_cursor.execute("SELECT * FROM students").fetchall()
-        for record in records:
-            self.view_all_tree.insert("", "end", values=record)
-
-    def clear_student_entries(self):
-        self.student_name_entry.delete(0, tk.END)
-        self.student_age_entry.delete(0, tk.END)
-        self.student_email_entry.delete(0, tk.END)
-        self.student_id_entry.delete(0, tk.END)
-
-    def clear_instructor_entries(self):
-        self.instructor_name_entry.delete(0, tk.END)
-        self.instructor_age_entry.delete(0, tk.END)
-        self.instructor_email_entry.delete(0, tk.END)
-        self.instructor_id_entry.delete(0, tk.END)
-
-    def clear_course_entries(self):
-        self.course_id_entry.delete(0, tk.END)
-        self.course_name_entry.delete(0, tk.END)
-        self.course_instructor_id_entry.delete(0, tk.END)
-
-    def on_closing(self):
-        if self.database_connection:
-            self.database_connection.close()
-        self.destroy()
-
-if __name__ == "__main__":
-    app = SchoolManagementApp()
-    app.protocol("WM_DELETE_WINDOW", app.on_closing)
-    app.mainloop()
+import tkinter as tk
+from tkinter import ttk
+from tkinter import messagebox, filedialog
+import sqlite3
+import csv
+import view_query
+import concurrency
+from backup import BackupManager
+from batch_entry import StudentBatch, STUDENT_COLUMNS, parse_clipboard
+from events import EventBus, DataVersionWatcher, TableSpec, ChangeEvent, StudentAdded, InstructorAdded, CourseAdded, RegistrationCreated
+"""School Management System Application using Tkinter and SQLite
+
+This application provides a GUI interface for managing students, instructors, and courses in a school.
+It allows users to add records, register students for courses, and view all records.
+
+Classes:
+    SchoolManagementApp: A class that creates the main application window and handles database interactions.
+
+Functions:
+    __init__(self): Initializes the application, creates the UI, and sets up the database.
+    get_database_connection(self): Returns a connection to the SQLite database.
+    setup_database(self): Creates the database tables if they don't exist, with the row version columns used
+        for optimistic updates (see concurrency.py).
+    setup_views(self): Creates the indexes, enrollment counts table, triggers and views used by "View All".
+    create_student_widgets(self): Creates and sets up the UI elements for adding students, including a
+        batch entry grid for adding many students at once.
+    create_instructor_widgets(self): Creates and sets up the UI elements for adding instructors.
+    create_course_widgets(self): Creates and sets up the UI elements for adding courses.
+    create_registration_widgets(self): Creates and sets up the UI elements for registering students to courses.
+    create_view_all_widgets(self): Creates and sets up the UI elements for viewing, sorting, filtering and paging
+        students, instructors and courses.
+    on_view_selected(self): Offers the sort keys of the selected view and shows its first page.
+    sort_by_column(self, header): Sorts by a clicked column header, toggling the direction on a second click.
+    view_all_filters(self): Reads the filter entries into the filters understood by view_query.
+    add_student_record(self): Adds a new student record to the database.
+    show_batch_rows(self, rows): Fills the batch entry grid with rows and validates them.
+    paste_batch_rows(self, event): Appends rows pasted from the clipboard (spreadsheet or CSV) to the grid.
+    add_batch_row(self), clear_batch(self): Add an empty row to the grid, or empty it.
+    edit_batch_cell(self, event): Opens an entry over the double-clicked cell of the grid.
+    validate_batch(self): Validates every cell with the OOP.py validators and lists the problems of each row.
+    commit_batch(self): Adds the valid rows in one transaction and refreshes the dependent views once.
+    update_comboboxes(self): Reloads the values in the student and course dropdown menus.
+    on_student_added(self, event): Appends a new student to the student dropdown.
+    on_course_added(self, event): Appends a new course to the course dropdown.
+    poll_changes(self): Publishes rows committed by other processes, then schedules the next poll.
+    add_instructor_record(self): Adds a new instructor record to the database.
+    add_course_record(self): Adds a new course record to the database.
+    register_student_course(self): Registers a student for a course.
+    refresh_view_all_records(self): Displays the first page of the view selected in the "View All" tab.
+    load_view_all_page(self): Displays the page starting after the last key on the page stack.
+    next_view_all_page(self), previous_view_all_page(self): Move between pages.
+    on_view_all_change(self, event): Re-reads the records of the displayed view that a change event affects,
+        updating them in place, or re-reading the page when a record is new or may have moved in the sort order.
+    schedule_view_all_reload(self), reload_view_all_page(self): Re-read the displayed page once for a burst of changes.
+    show_view_all_record(self, record): Replaces the displayed record with the same ID, or appends it.
+    clear_student_entries(self): Clears the student input fields after submission.
+    clear_instructor_entries(self): Clears the instructor input fields after submission.
+    clear_course_entries(self): Clears the course input fields after submission.
+    on_closing(self): Handles the application close event, stops the scheduled backups and closes the
+        database connection.
+
+Writes stage change events on self.event_bus and publish them after committing, and a
+DataVersionWatcher polled once a second publishes rows committed by other processes, so
+the dropdowns and the "View All" tree apply new rows instead of reloading. The events of
+a batch entry are collected and applied once, after the whole batch.
+
+Several copies of the application can share school.db: the connection is in autocommit
+mode with a BUSY_TIMEOUT busy timeout, and every write runs in one short transaction
+that is retried with jittered backoff while another copy holds the write lock (see
+concurrency.py).
+
+Sorting and filtering in "View All" are done by SQLite (ORDER BY/WHERE on indexed columns)
+and pages are read with keyset pagination, so only the displayed page is ever loaded.
+
+school.db is backed up every BACKUP_INTERVAL seconds on a background thread (see backup.py).
+"""
+
+# Tables watched for changes made by other processes; the columns match the staged events
+WATCHED_TABLES = [
+    TableSpec("students", ["student_name", "student_age", "student_email", "unique_student_id"], StudentAdded, rowid="student_id"),
+    TableSpec("instructors", ["instructor_name", "instructor_age", "instructor_email", "unique_instructor_id"], InstructorAdded, rowid="instructor_id"),
+    TableSpec("courses", ["unique_course_id", "course_title", "course_instructor_id"], CourseAdded, rowid="course_id"),
+    TableSpec("registrations", ["student_ref_id", "course_ref_id"], RegistrationCreated, rowid="registration_id"),
+]
+
+# The views offered by the "View All" tab, in the spec format of view_query. The first
+# column is the row id used as the tree item id; each sort key is backed by an index.
+VIEW_ALL = {
+    "Students": {
+        "headers": ["ID", "Name", "Age", "Email", "Additional Info"],
+        "columns": "student_id AS id, student_name, student_age, student_email, unique_student_id",
+        "source": "students",
+        "id": "student_id",
+        "sorts": {"ID": ["student_id"], "Name": ["student_name", "student_id"], "Age": ["student_age", "student_id"],
+                  "Additional Info": ["unique_student_id", "student_id"]},
+        "default_sort": ("ID", False),
+        "filters": {"name": "student_name", "age": "student_age", "email": "student_email", "id": "unique_student_id"},
+    },
+    "Instructors": {
+        "headers": ["ID", "Name", "Age", "Email", "Instructor ID", "Courses Taught"],
+        "columns": "id, instructor_name, instructor_age, instructor_email, unique_instructor_id, course_count",
+        "source": "instructor_view",
+        "sorts": {"ID": ["id"], "Name": ["instructor_name", "id"], "Age": ["instructor_age", "id"],
+                  "Instructor ID": ["unique_instructor_id", "id"]},
+        "default_sort": ("ID", False),
+        "filters": {"name": "instructor_name", "age": "instructor_age", "email": "instructor_email", "id": "unique_instructor_id"},
+    },
+    "Courses": {
+        "headers": ["ID", "Course ID", "Course Name", "Instructor ID", "Instructor", "Enrolled"],
+        "columns": "id, unique_course_id, course_title, course_instructor_id, instructor_name, enrollment_count",
+        "source": "course_enrollment_view",
+        "sorts": {"ID": ["id"], "Course ID": ["unique_course_id"], "Enrolled": ["enrollment_count", "unique_course_id"]},
+        "default_sort": ("Enrolled", True),
+        "filters": {"name": "course_title", "id": "unique_course_id"},
+    },
+    "Student Courses": {
+        "headers": ["ID", "Name", "Student ID", "Courses"],
+        "columns": "id, student_name, unique_student_id, courses",
+        "source": "student_courses_view",
+        "sorts": {"ID": ["id"], "Name": ["student_name", "id"], "Student ID": ["unique_student_id"]},
+        "default_sort": ("ID", False),
+        "filters": {"name": "student_name", "id": "unique_student_id"},
+    },
+}
+
+VIEW_ALL_LIMIT = 1000
+
+# Seconds between scheduled backups of school.db (see backup.py)
+BACKUP_INTERVAL = 3600
+
+# Seconds a write waits for another copy of the application before retrying (see concurrency.py)
+BUSY_TIMEOUT = 5.0
+
+import tkinter as tk
+class SchoolManagementApp(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("School Management System")
+        self.geometry("600x400")
+        self.database_connection = None
+        self.database_cursor = None
+        self.event_bus = EventBus()
+        self.batch_student_names = None  # Collects the names of a batch while it is published
+        self.setup_database()
+        
+        self.tab_control = ttk.Notebook(self)
+        self.tab_control.pack(expand=1, fill="both")
+
+        self.add_student_frame = ttk.Frame(self.tab_control)
+        self.add_instructor_frame = ttk.Frame(self.tab_control)
+        self.add_course_frame = ttk.Frame(self.tab_control)
+        self.register_course_frame = ttk.Frame(self.tab_control)
+        self.view_all_frame = ttk.Frame(self.tab_control)
+
+        self.tab_control.add(self.add_student_frame, text="Add Student")
+        self.tab_control.add(self.add_instructor_frame, text="Add Instructor")
+        self.tab_control.add(self.add_course_frame, text="Add Course")
+        self.tab_control.add(self.register_course_frame, text="Register for Course")
+        self.tab_control.add(self.view_all_frame, text="View All")
+
+        self.create_student_widgets()
+        self.create_instructor_widgets()
+        self.create_course_widgets()
+        self.create_registration_widgets()
+        self.create_view_all_widgets()
+
+        # Views apply row-level changes published by this window or detected on disk
+        self.event_bus.subscribe(StudentAdded, self.on_student_added)
+        self.event_bus.subscribe(CourseAdded, self.on_course_added)
+        self.event_bus.subscribe(ChangeEvent, self.on_view_all_change)
+        self.change_watcher = DataVersionWatcher(self.database_connection, self.event_bus, WATCHED_TABLES)
+        self.after(1000, self.poll_changes)
+
+        # Online backups on a background thread; see backup.py
+        self.backups = BackupManager('school.db')
+        self.backups.start(BACKUP_INTERVAL)
+
+    def get_database_connection(self):
+        if not self.database_connection:
+            self.database_connection = concurrency.connect('school.db', busy_timeout=BUSY_TIMEOUT)
+            self.database_cursor = self.database_connection.cursor()
+        return self.database_connection
+
+    def setup_database(self):
+        conn = self.get_database_connection()
+        # One transaction, so copies starting together do not both migrate the schema;
+        # run_transaction rolls it back if a statement fails, releasing the write lock
+        def create_schema(cursor):
+            self.database_cursor.execute(""" 
+                CREATE TABLE IF NOT EXISTS students (
+                    student_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    student_name TEXT NOT NULL,
+                    student_age INTEGER NOT NULL,
+                    student_email TEXT NOT NULL,
+                    unique_student_id TEXT NOT NULL UNIQUE
+                )
+            """)
+            self.database_cursor.execute("""
+                CREATE TABLE IF NOT EXISTS instructors (
+                    instructor_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    instructor_name TEXT NOT NULL,
+                    instructor_age INTEGER NOT NULL,
+                    instructor_email TEXT NOT NULL,
+                    unique_instructor_id TEXT NOT NULL UNIQUE
+                )
+            """)
+            self.database_cursor.execute("""
+                CREATE TABLE IF NOT EXISTS courses (
+                    course_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    unique_course_id TEXT NOT NULL UNIQUE,
+                    course_title TEXT NOT NULL,
+                    course_instructor_id TEXT NOT NULL,
+                    FOREIGN KEY (course_instructor_id) REFERENCES instructors (unique_instructor_id)
+                )
+            """)
+            self.database_cursor.execute("""
+                CREATE TABLE IF NOT EXISTS registrations (
+                    registration_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    student_ref_id TEXT NOT NULL,
+                    course_ref_id TEXT NOT NULL,
+                    FOREIGN KEY (student_ref_id) REFERENCES students (unique_student_id),
+                    FOREIGN KEY (course_ref_id) REFERENCES courses (unique_course_id)
+                )
+            """)
+            concurrency.add_version_columns(self.database_cursor, [
+                ("students", "student_id"), ("instructors", "instructor_id"), ("courses", "course_id")])
+            self.setup_views()
+
+        concurrency.run_transaction(conn, create_schema)
+
+    def setup_views(self):
+        # Enrollment counts are kept by triggers so "View All" never aggregates the registrations table
+        cursor = self.database_cursor
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrations_student ON registrations (student_ref_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrations_course ON registrations (course_ref_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_courses_instructor ON courses (course_instructor_id)")
+        # Composite indexes for the sort keys and filters offered by "View All" (see VIEW_ALL)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students (student_name, student_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_age ON students (student_age, student_id)")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_students_email_domain ON students ({view_query.email_domain('student_email')}, student_age, student_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_instructors_name ON instructors (instructor_name, instructor_id)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_instructors_age ON instructors (instructor_age, instructor_id)")
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'course_enrollment_counts'").fetchone()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS course_enrollment_counts (
+                course_ref_id TEXT PRIMARY KEY,
+                enrollment_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_course_enrollment_counts_count
+            ON course_enrollment_counts (enrollment_count, course_ref_id)
+        """)
+        if not exists:
+            cursor.execute("""
+                INSERT INTO course_enrollment_counts (course_ref_id, enrollment_count)
+                SELECT unique_course_id, (SELECT COUNT(*) FROM registrations WHERE course_ref_id = unique_course_id)
+                FROM courses
+            """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_courses_insert_count AFTER INSERT ON courses
+            BEGIN
+                INSERT OR IGNORE INTO course_enrollment_counts (course_ref_id, enrollment_count) VALUES (NEW.unique_course_id, 0);
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_courses_delete_count AFTER DELETE ON courses
+            BEGIN
+                DELETE FROM course_enrollment_counts WHERE course_ref_id = OLD.unique_course_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_registrations_insert_count AFTER INSERT ON registrations
+            BEGIN
+                INSERT OR IGNORE INTO course_enrollment_counts (course_ref_id, enrollment_count) VALUES (NEW.course_ref_id, 0);
+                UPDATE course_enrollment_counts SET enrollment_count = enrollment_count + 1 WHERE course_ref_id = NEW.course_ref_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_registrations_delete_count AFTER DELETE ON registrations
+            BEGIN
+                UPDATE course_enrollment_counts SET enrollment_count = enrollment_count - 1 WHERE course_ref_id = OLD.course_ref_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_registrations_update_count AFTER UPDATE OF course_ref_id ON registrations
+            BEGIN
+                UPDATE course_enrollment_counts SET enrollment_count = enrollment_count - 1 WHERE course_ref_id = OLD.course_ref_id;
+                INSERT OR IGNORE INTO course_enrollment_counts (course_ref_id, enrollment_count) VALUES (NEW.course_ref_id, 0);
+                UPDATE course_enrollment_counts SET enrollment_count = enrollment_count + 1 WHERE course_ref_id = NEW.course_ref_id;
+            END
+        """)
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS instructor_view AS
+            SELECT instructor_id AS id, instructor_name, instructor_age, instructor_email, unique_instructor_id,
+                   (SELECT COUNT(*) FROM courses WHERE course_instructor_id = unique_instructor_id) AS course_count
+            FROM instructors
+        """)
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS course_enrollment_view AS
+            SELECT courses.course_id AS id, course_enrollment_counts.course_ref_id AS unique_course_id, courses.course_title,
+                   courses.course_instructor_id, instructors.instructor_name, course_enrollment_counts.enrollment_count
+            FROM course_enrollment_counts
+            JOIN courses ON courses.unique_course_id = course_enrollment_counts.course_ref_id
+            LEFT JOIN instructors ON instructors.unique_instructor_id = courses.course_instructor_id
+        """)
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS student_courses_view AS
+            SELECT student_id AS id, student_name, unique_student_id,
+                   (SELECT group_concat(course_ref_id, ', ') FROM registrations
+                    WHERE student_ref_id = unique_student_id) AS courses
+            FROM students
+        """)
+
+    def create_student_widgets(self):
+        tk.Label(self.add_student_frame, text="Name:").pack()
+        self.student_name_entry = tk.Entry(self.add_student_frame)
+        self.student_name_entry.pack()
+
+        tk.Label(self.add_student_frame, text="Age:").pack()
+        self.student_age_entry = tk.Entry(self.add_student_frame)
+        self.student_age_entry.pack()
+
+        tk.Label(self.add_student_frame, text="Email:").pack()
+        self.student_email_entry = tk.Entry(self.add_student_frame)
+        self.student_email_entry.pack()
+
+        tk.Label(self.add_student_frame, text="Student ID:").pack()
+        self.student_id_entry = tk.Entry(self.add_student_frame)
+        self.student_id_entry.pack()
+
+        tk.Button(self.add_student_frame, text="Add Student", command=self.add_student_record).pack()
+
+        # Batch entry: rows typed or pasted into the grid are validated as they change
+        self.student_batch = StudentBatch(self.database_cursor, WATCHED_TABLES[0])
+        self.batch_cells = {}  # Tree item -> cell texts; the tree may hand numeric text back as numbers
+        tk.Label(self.add_student_frame, text="Batch Entry (double-click a cell to edit, Ctrl+V to paste rows):").pack()
+        self.batch_tree = ttk.Treeview(self.add_student_frame, columns=STUDENT_COLUMNS + ["Problems"],
+                                       show="headings", height=8)
+        for column in STUDENT_COLUMNS + ["Problems"]:
+            self.batch_tree.heading(column, text=column)
+            self.batch_tree.column(column, width=100)
+        self.batch_tree.tag_configure("invalid", background="#f8d7da")
+        self.batch_tree.bind("<Double-1>", self.edit_batch_cell)
+        self.batch_tree.bind("<Control-v>", self.paste_batch_rows)
+        self.batch_tree.pack(expand=1, fill="both")
+        self.batch_status = tk.Label(self.add_student_frame, text="")
+        self.batch_status.pack()
+        batch_buttons = tk.Frame(self.add_student_frame)
+        batch_buttons.pack()
+        tk.Button(batch_buttons, text="Paste Rows", command=self.paste_batch_rows).pack(side="left")
+        tk.Button(batch_buttons, text="Add Row", command=self.add_batch_row).pack(side="left")
+        tk.Button(batch_buttons, text="Clear", command=self.clear_batch).pack(side="left")
+        tk.Button(batch_buttons, text="Add Valid Students", command=self.commit_batch).pack(side="left")
+
+    def create_instructor_widgets(self):
+        tk.Label(self.add_instructor_frame, text="Name:").pack()
+        self.instructor_name_entry = tk.Entry(self.add_instructor_frame)
+        self.instructor_name_entry.pack()
+
+        tk.Label(self.add_instructor_frame, text="Age:").pack()
+        self.instructor_age_entry = tk.Entry(self.add_instructor_frame)
+        self.instructor_age_entry.pack()
+
+        tk.Label(self.add_instructor_frame, text="Email:").pack()
+        self.instructor_email_entry = tk.Entry(self.add_instructor_frame)
+        self.instructor_email_entry.pack()
+
+        tk.Label(self.add_instructor_frame, text="Instructor ID:").pack()
+        self.instructor_id_entry = tk.Entry(self.add_instructor_frame)
+        self.instructor_id_entry.pack()
+
+        tk.Button(self.add_instructor_frame, text="Add Instructor", command=self.add_instructor_record).pack()
+
+    def create_course_widgets(self):
+        tk.Label(self.add_course_frame, text="Course ID:").pack()
+        self.course_id_entry = tk.Entry(self.add_course_frame)
+        self.course_id_entry.pack()
+
+        tk.Label(self.add_course_frame, text="Course Name:").pack()
+        self.course_name_entry = tk.Entry(self.add_course_frame)
+        self.course_name_entry.pack()
+
+        tk.Label(self.add_course_frame, text="Instructor ID:").pack()
+        self.course_instructor_id_entry = tk.Entry(self.add_course_frame)
+        self.course_instructor_id_entry.pack()
+
+        tk.Button(self.add_course_frame, text="Add Course", command=self.add_course_record).pack()
+
+    def create_registration_widgets(self):
+        tk.Label(self.register_course_frame, text="Select Student:").pack()
+        self.student_combobox = ttk.Combobox(self.register_course_frame)
+        self.student_combobox.pack()
+        
+        tk.Label(self.register_course_frame, text="Select Course:").pack()
+        self.course_combobox = ttk.Combobox(self.register_course_frame)
+        self.course_combobox.pack()
+        self.update_comboboxes()
+        tk.Button(self.register_course_frame, text="Register", command=self.register_student_course).pack()
+        
+    def create_view_all_widgets(self):
+        self.view_all_page_keys = [None]  # Keyset of each page visited; None is the first page
+        self.view_all_next_key = None
+        self.view_all_current_filters = {}
+        self.view_all_reload_pending = False
+
+        controls = tk.Frame(self.view_all_frame)
+        controls.pack()
+        tk.Label(controls, text="View:").pack(side="left")
+        self.view_combobox = ttk.Combobox(controls, values=list(VIEW_ALL), state="readonly")
+        self.view_combobox.set("Students")
+        self.view_combobox.bind("<<ComboboxSelected>>", lambda event: self.on_view_selected())
+        self.view_combobox.pack(side="left")
+        tk.Label(controls, text="Sort by:").pack(side="left")
+        self.sort_combobox = ttk.Combobox(controls, state="readonly")
+        self.sort_combobox.bind("<<ComboboxSelected>>", lambda event: self.refresh_view_all_records())
+        self.sort_combobox.pack(side="left")
+        self.descending_var = tk.BooleanVar()
+        tk.Checkbutton(controls, text="Descending", variable=self.descending_var,
+                       command=self.refresh_view_all_records).pack(side="left")
+
+        # Filter name (see view_query.where_clause) -> (entry, filter supported by the view)
+        filters = tk.Frame(self.view_all_frame)
+        filters.pack()
+        self.filter_entries = {}
+        for key, label, supported in (("name", "Name starts with:", "name"), ("age_min", "Min age:", "age"),
+                                      ("age_max", "Max age:", "age"), ("email_domain", "Email domain:", "email"),
+                                      ("id", "ID starts with:", "id")):
+            tk.Label(filters, text=label).pack(side="left")
+            entry = tk.Entry(filters, width=10)
+            entry.bind("<Return>", lambda event: self.refresh_view_all_records())
+            entry.pack(side="left")
+            self.filter_entries[key] = (entry, supported)
+        tk.Button(filters, text="Apply", command=self.refresh_view_all_records).pack(side="left")
+
+        self.view_all_tree = ttk.Treeview(self.view_all_frame, show="headings")
+        self.view_all_tree.pack(expand=1, fill="both")
+
+        pages = tk.Frame(self.view_all_frame)
+        pages.pack()
+        self.previous_page_button = tk.Button(pages, text="Previous Page", command=self.previous_view_all_page)
+        self.previous_page_button.pack(side="left")
+        self.next_page_button = tk.Button(pages, text="Next Page", command=self.next_view_all_page)
+        self.next_page_button.pack(side="left")
+
+        tk.Button(self.view_all_frame, text="Refresh", command=self.refresh_view_all_records).pack()
+        self.on_view_selected()
+
+    def on_view_selected(self):
+        view = VIEW_ALL[self.view_combobox.get()]
+        sort, descending = view["default_sort"]
+        self.sort_combobox["values"] = list(view["sorts"])
+        self.sort_combobox.set(sort)
+        self.descending_var.set(descending)
+        for entry, supported in self.filter_entries.values():
+            entry.configure(state="normal" if supported in view["filters"] else "disabled")
+        self.refresh_view_all_records()
+
+    def sort_by_column(self, header):
+        if header not in VIEW_ALL[self.view_combobox.get()]["sorts"]:
+            return  # Not an indexed sort key
+        if self.sort_combobox.get() == header:
+            self.descending_var.set(not self.descending_var.get())
+        else:
+            self.sort_combobox.set(header)
+            self.descending_var.set(False)
+        self.refresh_view_all_records()
+
+    def view_all_filters(self):
+        filters = {}
+        for key, (entry, _) in self.filter_entries.items():
+            text = entry.get().strip()
+            if str(entry["state"]) == "disabled" or not text:
+                continue
+            filters[key] = int(text) if key in ("age_min", "age_max") else text
+        return filters
+     
+    def add_student_record(self):
+        name = self.student_name_entry.get()
+        age = int(self.student_age_entry.get())
+        email = self.student_email_entry.get()
+        unique_id = self.student_id_entry.get()
+        
+        def insert(cursor):
+            cursor.execute(""" 
+                INSERT INTO students (student_name, student_age, student_email, unique_student_id)
+                VALUES (?, ?, ?, ?)
+            """, (name, age, email, unique_id))
+            self.event_bus.stage(StudentAdded(cursor.lastrowid, (name, age, email, unique_id)))
+
+        try:
+            # The dropdown and the "View All" tree append the new student once it commits
+            concurrency.run_transaction(self.get_database_connection(), insert, bus=self.event_bus)
+            messagebox.showinfo("Success", "Student added successfully")
+            self.clear_student_entries()
+        except Exception as e:
+            self.event_bus.discard()
+            messagebox.showerror("Error", f"Error adding student: {e}")
+
+    def show_batch_rows(self, rows):
+        self.batch_tree.delete(*self.batch_tree.get_children())
+        self.batch_cells = {}
+        for cells in rows:
+            item = self.batch_tree.insert("", "end", values=list(cells) + [""])
+            self.batch_cells[item] = list(cells)
+        self.validate_batch()
+
+    def paste_batch_rows(self, event=None):
+        try:
+            text = self.clipboard_get()
+        except tk.TclError:
+            return "break"  # Nothing on the clipboard
+        rows = [cells for cells in self.batch_cells.values() if any(cell.strip() for cell in cells)]
+        self.show_batch_rows(rows + parse_clipboard(text))
+        return "break"
+
+    def add_batch_row(self):
+        cells = [""] * len(STUDENT_COLUMNS)
+        item = self.batch_tree.insert("", "end", values=cells + [""])
+        self.batch_cells[item] = cells
+
+    def clear_batch(self):
+        self.show_batch_rows([])
+
+    def edit_batch_cell(self, event):
+        item = self.batch_tree.identify_row(event.y)
+        column_id = self.batch_tree.identify_column(event.x)
+        if not item or not column_id:
+            return  # Not on a cell
+        column = int(column_id[1:]) - 1
+        if not 0 <= column < len(STUDENT_COLUMNS) or not self.batch_tree.bbox(item, column):
+            return
+        x, y, width, height = self.batch_tree.bbox(item, column)
+        entry = tk.Entry(self.batch_tree)
+        entry.insert(0, self.batch_cells[item][column])
+        entry.select_range(0, tk.END)
+        entry.place(x=x, y=y, width=width, height=height)
+        entry.focus_set()
+
+        def save(event=None):
+            if entry.winfo_exists():
+                self.batch_cells[item][column] = entry.get()
+                entry.destroy()
+                self.validate_batch()
+
+        entry.bind("<Return>", save)
+        entry.bind("<FocusOut>", save)
+        entry.bind("<Escape>", lambda event: entry.destroy())
+
+    def validate_batch(self):
+        items = list(self.batch_cells)
+        self.student_batch.set_rows(self.batch_cells.values())
+        errors = self.student_batch.validate()
+        invalid = 0
+        for item, cells, row_errors in zip(items, self.student_batch.rows, errors):
+            blank = not any(cells)  # Empty rows are ignored rather than flagged
+            problems = "" if blank else "; ".join(
+                f"{column}: {error}" for column, error in zip(STUDENT_COLUMNS, row_errors) if error)
+            self.batch_tree.item(item, values=self.batch_cells[item] + [problems],
+                                 tags=("invalid",) if problems else ())
+            invalid += bool(problems)
+        valid = sum(not any(row_errors) for row_errors in errors)
+        self.batch_status.config(text=f"{valid} valid rows, {invalid} rows with errors")
+
+    def commit_batch(self):
+        self.student_batch.set_rows(self.batch_cells.values())
+        try:
+            inserted = concurrency.retry(lambda: self.student_batch.commit(self.get_database_connection(), self.event_bus))
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Error adding students: {e}")
+            return
+        # The dropdown and the "View All" page are updated once for the whole batch
+        self.batch_student_names = []
+        try:
+            self.event_bus.flush()
+        finally:
+            names, self.batch_student_names = self.batch_student_names, None
+        self.student_combobox['values'] = (*self.student_combobox['values'], *names)
+        self.load_view_all_page()
+        self.show_batch_rows(self.student_batch.rows)
+        self.batch_status.config(text=f"Added {len(inserted)} students; {len(self.student_batch.rows)} rows left")
+
+    def update_comboboxes(self):
+        self.student_combobox['values'] = [row[0] for row in self.database_cursor.execute("SELECT student_name FROM students").fetchall()]
+        self.course_combobox['values'] = [row[0] for row in self.database_cursor.execute("SELECT course_title FROM courses").fetchall()]
+
+    def on_student_added(self, event):
+        name, age, email, unique_id = event.row
+        if self.batch_student_names is not None:
+            self.batch_student_names.append(name)
+        else:
+            self.student_combobox['values'] = (*self.student_combobox['values'], name)
+
+    def on_course_added(self, event):
+        unique_id, title, instructor_id = event.row
+        self.course_combobox['values'] = (*self.course_combobox['values'], title)
+
+    def poll_changes(self):
+        self.change_watcher.poll()
+        self.after(1000, self.poll_changes)
+
+    def add_instructor_record(self):
+        name = self.instructor_name_entry.get()
+        age = int(self.instructor_age_entry.get())
+        email = self.instructor_email_entry.get()
+        unique_id = self.instructor_id_entry.get()
+        
+        def insert(cursor):
+            cursor.execute(""" 
+                INSERT INTO instructors (instructor_name, instructor_age, instructor_email, unique_instructor_id)
+                VALUES (?, ?, ?, ?)
+            """, (name, age, email, unique_id))
+            self.event_bus.stage(InstructorAdded(cursor.lastrowid, (name, age, email, unique_id)))
+
+        try:
+            concurrency.run_transaction(self.get_database_connection(), insert, bus=self.event_bus)
+            messagebox.showinfo("Success", "Instructor added successfully")
+            self.clear_instructor_entries()
+        except Exception as e:
+            self.event_bus.discard()
+            messagebox.showerror("Error", f"Error adding instructor: {e}")
+
+    def add_course_record(self):
+        unique_id = self.course_id_entry.get()
+        title = self.course_name_entry.get()
+        instructor_id = self.course_instructor_id_entry.get()
+        
+        def insert(cursor):
+            cursor.execute(""" 
+                INSERT INTO courses (unique_course_id, course_title, course_instructor_id)
+                VALUES (?, ?, ?)
+            """, (unique_id, title, instructor_id))
+            self.event_bus.stage(CourseAdded(cursor.lastrowid, (unique_id, title, instructor_id)))
+
+        try:
+            # The course dropdown appends the new course once it commits
+            concurrency.run_transaction(self.get_database_connection(), insert, bus=self.event_bus)
+            messagebox.showinfo("Success", "Course added successfully")
+            self.clear_course_entries()
+        except Exception as e:
+            self.event_bus.discard()
+            messagebox.showerror("Error", f"Error adding course: {e}")
+
+    def register_student_course(self):
+        selected_student_name = self.student_combobox.get()
+        selected_course_name = self.course_combobox.get()
+        
+        def register(cursor):
+            cursor.execute("SELECT unique_student_id FROM students WHERE student_name = ?", (selected_student_name,))
+            student_ref_id = cursor.fetchone()[0]
+            cursor.execute("SELECT unique_course_id FROM courses WHERE course_title = ?", (selected_course_name,))
+            course_ref_id = cursor.fetchone()[0]
+            cursor.execute(""" 
+                INSERT INTO registrations (student_ref_id, course_ref_id)
+                VALUES (?, ?)
+            """, (student_ref_id, course_ref_id))
+            self.event_bus.stage(RegistrationCreated(cursor.lastrowid, (student_ref_id, course_ref_id)))
+
+        try:
+            concurrency.run_transaction(self.get_database_connection(), register, bus=self.event_bus)
+            messagebox.showinfo("Success", "Student registered for course successfully")
+        except Exception as e:
+            self.event_bus.discard()
+            messagebox.showerror("Error", f"Error registering student for course: {e}")
+
+    def refresh_view_all_records(self):
+        try:
+            self.view_all_current_filters = self.view_all_filters()
+        except ValueError:
+            messagebox.showerror("Error", "Age filters must be whole numbers")
+            return
+        self.view_all_page_keys = [None]
+        self.load_view_all_page()
+
+    def load_view_all_page(self):
+        view = VIEW_ALL[self.view_combobox.get()]
+        self.view_all_tree.delete(*self.view_all_tree.get_children())
+        self.view_all_tree["columns"] = view["headers"]
+        for header in view["headers"]:
+            self.view_all_tree.heading(header, text=header, command=lambda header=header: self.sort_by_column(header))
+        # SQLite sorts, filters and pages using the indexes created in setup_views
+        records, self.view_all_next_key = view_query.fetch_page(
+            self.database_cursor, view, self.sort_combobox.get(), self.descending_var.get(),
+            self.view_all_current_filters, self.view_all_page_keys[-1], VIEW_ALL_LIMIT)
+        for record in records:
+            self.show_view_all_record(record)
+        self.previous_page_button.configure(state="normal" if len(self.view_all_page_keys) > 1 else "disabled")
+        self.next_page_button.configure(state="normal" if self.view_all_next_key is not None else "disabled")
+
+    def next_view_all_page(self):
+        if self.view_all_next_key is not None:
+            self.view_all_page_keys.append(self.view_all_next_key)
+            self.load_view_all_page()
+
+    def previous_view_all_page(self):
+        if len(self.view_all_page_keys) > 1:
+            self.view_all_page_keys.pop()
+            self.load_view_all_page()
+
+    def on_view_all_change(self, event):
+        if self.batch_student_names is not None:
+            return  # commit_batch reloads the page once instead
+        name = self.view_combobox.get()
+        view = VIEW_ALL[name]
+        row_ids = []
+        if isinstance(event, StudentAdded) and name in ("Students", "Student Courses"):
+            row_ids = [event.row_id]
+        elif isinstance(event, InstructorAdded) and name == "Instructors":
+            row_ids = [event.row_id]
+        elif isinstance(event, CourseAdded) and name == "Courses":
+            row_ids = [event.row_id]
+        elif isinstance(event, CourseAdded) and name == "Instructors":
+            row_ids = [row[0] for row in self.database_cursor.execute(
+                "SELECT instructor_id FROM instructors WHERE unique_instructor_id = ?", (event.row[2],)).fetchall()]
+        elif isinstance(event, RegistrationCreated) and name == "Courses":
+            row_ids = [row[0] for row in self.database_cursor.execute(
+                "SELECT course_id FROM courses WHERE unique_course_id = ?", (event.row[1],)).fetchall()]
+        elif isinstance(event, RegistrationCreated) and name == "Student Courses":
+            row_ids = [row[0] for row in self.database_cursor.execute(
+                "SELECT student_id FROM students WHERE unique_student_id = ?", (event.row[0],)).fetchall()]
+        # A changed record keeps its place only when the page is sorted by row id alone
+        by_row_id = view["sorts"].get(self.sort_combobox.get()) == [view.get("id", "id")]
+        for row_id in row_ids:
+            record = view_query.fetch_row(self.database_cursor, view, row_id, self.view_all_current_filters)
+            if self.view_all_tree.exists(row_id):
+                if record is not None and not self.view_all_record_changed(record):
+                    continue
+                if record is not None and by_row_id:
+                    self.show_view_all_record(record)
+                    continue
+            elif record is None:
+                continue
+            # A new record, or one whose sort key may have moved: re-read the page in sorted order
+            self.schedule_view_all_reload()
+
+    def view_all_record_changed(self, record):
+        shown = self.view_all_tree.item(record[0], "values")
+        return [str(value) for value in shown] != ["" if value is None else str(value) for value in record]
+
+    def schedule_view_all_reload(self):
+        # Events arriving together (a batch committed by another copy) cost one reload
+        if not self.view_all_reload_pending:
+            self.view_all_reload_pending = True
+            self.after_idle(self.reload_view_all_page)
+
+    def reload_view_all_page(self):
+        self.view_all_reload_pending = False
+        self.load_view_all_page()
+
+    def show_view_all_record(self, record):
+        values = ["" if value is None else value for value in record]
+        if self.view_all_tree.exists(record[0]):
+            self.view_all_tree.item(record[0], values=values)
+        else:
+            self.view_all_tree.insert("", "end", iid=record[0], values=values)
+
+    def clear_student_entries(self):
+        self.student_name_entry.delete(0, tk.END)
+        self.student_age_entry.delete(0, tk.END)
+        self.student_email_entry.delete(0, tk.END)
+        self.student_id_entry.delete(0, tk.END)
+
+    def clear_instructor_entries(self):
+        self.instructor_name_entry.delete(0, tk.END)
+        self.instructor_age_entry.delete(0, tk.END)
+        self.instructor_email_entry.delete(0, tk.END)
+        self.instructor_id_entry.delete(0, tk.END)
+
+    def clear_course_entries(self):
+        self.course_id_entry.delete(0, tk.END)
+        self.course_name_entry.delete(0, tk.END)
+        self.course_instructor_id_entry.delete(0, tk.END)
+
+    def on_closing(self):
+        self.backups.stop()
+        if self.database_connection:
+            self.database_connection.close()
+        self.destroy()
+
+if __name__ == "__main__":
+    app = SchoolManagementApp()
+    app.protocol("WM_DELETE_WINDOW", app.on_closing)
+    app.mainloop()
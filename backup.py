@@ -0,0 +1,309 @@
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import school_db
+
+"""Online Backups of the School Management System Database
+
+Backs the live database up while the applications keep using it, with SQLite's online
+backup API (sqlite3.Connection.backup) copying a few pages per step on a background
+thread, so the GUI thread never waits for a backup.
+
+The database is switched to WAL journaling and every step of a backup runs inside one
+read transaction on the source. The backup is therefore a consistent snapshot of the
+moment it started, and commits made by the applications meanwhile neither block on the
+backup nor make it start over (without WAL, a reader holds off writers, and each write
+by another connection restarts the copy).
+
+Each backup is written under a temporary name, checked with PRAGMA integrity_check (or
+quick_check) and only then renamed to `<database>-<YYYYmmdd-HHMMSS>-<n>.db`, where `n`
+numbers the backups made in the same second; the oldest backups beyond `keep` (ordered by
+timestamp, then `n`) are deleted. restore() checks a backup the same way, saves the
+current database first, then copies the backup over the live database, again with the
+backup API so connections that are open see the restored data.
+
+Classes:
+    BackupResult: Outcome and throughput of one backup.
+    BackupManager: Runs, schedules, rotates and restores backups of one database.
+
+Usage:
+    python backup.py --database school_management.db backup
+    python backup.py --database school.db list
+    python backup.py --database school_management.db restore backups/school_management-20240101-120000-0.db
+"""
+
+
+class BackupResult:
+    """
+    The outcome of one backup.
+
+    Args:
+        path (str): The backup file (None if the backup failed its integrity check).
+        pages (int): The number of database pages copied.
+        seconds (float): The time the copy and the check took.
+        check (str): The result of the integrity check, "ok" when it passed.
+    """
+    def __init__(self, path, pages, seconds, check):
+        self.path = path
+        self.pages = pages
+        self.seconds = seconds
+        self.check = check
+
+    @property
+    def ok(self):
+        return self.check == "ok"
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.seconds if self.seconds else float("inf")
+
+    def __repr__(self):
+        return f"BackupResult({self.path!r}, pages={self.pages}, seconds={self.seconds:.3f}, check={self.check!r})"
+
+
+class BackupManager:
+    """
+    Makes online backups of a database.
+
+    Args:
+        database (str): The database file to back up.
+        directory (str): Where backups are kept; defaults to a 'backups' directory next to
+            the database.
+        keep (int): The number of backups kept; older ones are deleted after each backup.
+        pages_per_step (int): Pages copied per backup step.
+        pause (float): Seconds slept between steps, leaving the disk to the applications.
+        sync_pages (int): Pages copied between flushes of the backup file to disk.
+        full_check (bool): Use PRAGMA integrity_check instead of the faster quick_check.
+        on_complete (function): Called as on_complete(result) after each scheduled backup,
+            on the backup thread; a backup that raised sqlite3.Error or OSError is reported
+            as a result with path None and the error as its check.
+    """
+    def __init__(self, database=school_db.DATABASE_FILE, directory=None, keep=7, pages_per_step=64, pause=0.001,
+                 sync_pages=1024, full_check=False, on_complete=None):
+        self.database = database
+        self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(database)), "backups")
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.pause = pause
+        self.sync_pages = sync_pages
+        self.full_check = full_check
+        self.on_complete = on_complete
+        self.stem = os.path.splitext(os.path.basename(database))[0]
+        self.last_result = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def backups(self):
+        """Returns the paths of the existing backups, newest first."""
+        return [path for key, path in self._backups()]
+
+    def _backups(self):
+        # By (timestamp, number) rather than by name: "-10" sorts before "-2" as a string.
+        # Backups named before the number was always added count as number 0.
+        pattern = re.compile(rf"{re.escape(self.stem)}-(\d{{8}}-\d{{6}})(?:-(\d+))?\.db")
+        found = []
+        for path in glob.glob(os.path.join(self.directory, f"{glob.escape(self.stem)}-*.db")):
+            match = pattern.fullmatch(os.path.basename(path))
+            if match:
+                found.append(((match[1], int(match[2] or 0)), path))
+        return sorted(found, reverse=True)
+
+    def check(self, path):
+        """Returns "ok" if the database file passes the integrity check, else the first problem found."""
+        connection = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+        try:
+            pragma = "integrity_check" if self.full_check else "quick_check"
+            return connection.execute(f"PRAGMA {pragma}").fetchone()[0]
+        except sqlite3.DatabaseError as e:
+            return str(e)
+        finally:
+            connection.close()
+
+    def backup(self):
+        """
+        Backs the database up now, on the calling thread.
+
+        Returns:
+            BackupResult: The new backup; if it failed the integrity check, the file is
+            deleted and the result's path is None.
+
+        Raises:
+            sqlite3.Error, OSError: If the copy fails; no partial file is left behind.
+        """
+        return self._backup()
+
+    def _backup(self, protect=None):
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            # One past the highest number of this second, never a number freed by rotation,
+            # so the new backup always sorts as the newest
+            suffix = 1 + max((number for (other, number), _ in self._backups() if other == stamp), default=-1)
+            path = os.path.join(self.directory, f"{self.stem}-{stamp}-{suffix}.db")
+            partial = path + ".partial"
+            pages = [0]
+            synced = [0]
+
+            def progress(status, remaining, total):
+                pages[0] = total
+                # Flushing as the copy goes spreads the writes out, instead of one large
+                # fsync at the end that every commit of the GUI would queue behind
+                if total - remaining - synced[0] >= self.sync_pages:
+                    synced[0] = total - remaining
+                    os.fsync(sync_file.fileno())
+                # backup() itself only sleeps after SQLITE_BUSY; pause between steps here
+                if remaining and self.pause:
+                    time.sleep(self.pause)
+
+            start = time.perf_counter()
+            try:
+                source = sqlite3.connect(self.database, isolation_level=None)
+                target = sqlite3.connect(partial)
+                sync_file = None
+                try:
+                    # The partial file is checked before it is used, so it needs no journal, and
+                    # is flushed in slices by progress() rather than by SQLite all at once at the end
+                    target.execute("PRAGMA journal_mode = OFF")
+                    target.execute("PRAGMA synchronous = OFF")
+                    target.execute("PRAGMA user_version").fetchone()  # Creates the file
+                    sync_file = open(partial, "rb")
+                    source.execute("PRAGMA journal_mode = WAL")
+                    # One read transaction for every step: the copy is a snapshot and never restarts
+                    source.execute("BEGIN")
+                    source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                    source.backup(target, pages=self.pages_per_step, progress=progress)
+                    source.execute("COMMIT")
+                    # The copy carries the source's WAL flag; a backup is a single file
+                    target.execute("PRAGMA journal_mode = DELETE")
+                finally:
+                    target.close()
+                    source.close()
+                    if sync_file is not None:
+                        os.fsync(sync_file.fileno())
+                        sync_file.close()
+                result = self.check(partial)
+                if result == "ok":
+                    os.replace(partial, path)
+                else:
+                    os.remove(partial)
+                    path = None
+            except BaseException:
+                # A failed copy must not leave its partial file behind; rotation never sees it
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+            if path is not None:
+                self._rotate(protect)
+            self.last_result = BackupResult(path, pages[0], time.perf_counter() - start, result)
+            return self.last_result
+
+    def _rotate(self, protect=None):
+        for path in self.backups()[self.keep:]:
+            # Never the backup being restored, which may be the oldest
+            if protect is None or os.path.realpath(path) != os.path.realpath(protect):
+                os.remove(path)
+
+    def start(self, interval, first_delay=None):
+        """
+        Starts making a backup every `interval` seconds on a daemon thread.
+
+        Args:
+            interval (float): Seconds between the start of one backup and the next.
+            first_delay (float): Seconds before the first backup; `interval` if None.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval, first_delay), daemon=True,
+                                        name="database-backup")
+        self._thread.start()
+
+    def _run(self, interval, first_delay):
+        delay = interval if first_delay is None else first_delay
+        while not self._stop.wait(delay):
+            started = time.monotonic()
+            try:
+                result = self.backup()
+            except (sqlite3.Error, OSError) as e:
+                # Reported like a failed check, and the schedule goes on (a full disk may clear)
+                result = BackupResult(None, 0, time.monotonic() - started, str(e))
+                self.last_result = result
+            if self.on_complete is not None:
+                self.on_complete(result)
+            delay = max(0.0, interval - (time.monotonic() - started))
+
+    def stop(self, wait=True):
+        """Stops scheduled backups, waiting for a backup in progress to finish if `wait`."""
+        self._stop.set()
+        if self._thread is not None and wait:
+            self._thread.join()
+        self._thread = None
+
+    def restore(self, path):
+        """
+        Replaces the contents of the database with a backup.
+
+        The backup is checked first, and the current database is backed up before it is
+        overwritten, so a restore can itself be undone.
+
+        Args:
+            path (str): The backup to restore.
+
+        Returns:
+            BackupResult: The backup of the database as it was before the restore.
+
+        Raises:
+            ValueError: If the backup, or the backup of the current database, fails its
+                integrity check; the database is left unchanged.
+        """
+        result = self.check(path)
+        if result != "ok":
+            raise ValueError(f"{path} failed its integrity check: {result}")
+        before = self._backup(protect=path)
+        if not before.ok:
+            raise ValueError(f"The current database could not be backed up before the restore: {before.check}")
+        with self._lock:
+            source = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+            target = sqlite3.connect(self.database, timeout=30)
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+        return before
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up and restore a School Management System database.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("--directory", default=None)
+    parser.add_argument("--keep", type=int, default=7)
+    parser.add_argument("--full-check", action="store_true", help="Use integrity_check instead of quick_check")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backup", help="Back the database up now")
+    commands.add_parser("list", help="List the backups, newest first")
+    restore = commands.add_parser("restore", help="Restore a backup over the database")
+    restore.add_argument("path")
+    args = parser.parse_args()
+
+    manager = BackupManager(args.database, args.directory, args.keep, full_check=args.full_check)
+    if args.command == "backup":
+        result = manager.backup()
+        print(f"{result.path or 'Backup failed'}: {result.pages} pages in {result.seconds:.2f}s "
+              f"({result.pages_per_second:.0f} pages/s), check {result.check}")
+    elif args.command == "list":
+        for path in manager.backups():
+            print(path)
+    else:
+        before = manager.restore(args.path)
+        print(f"Restored {args.path}; the previous database was saved as {before.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+import csv
+import io
+from collections import Counter
+
+from OOP import validate_name, validate_age, validate_email, validate_studentID
+from events import StudentAdded
+
+"""Batch Entry of Students
+
+The model behind the batch entry grids of Part3.py and Tkinter.py: rows of text cells,
+typed or pasted from a spreadsheet, are validated cell by cell with the OOP.py
+validators, and the valid rows are inserted with one executemany in one transaction.
+
+Student IDs are also checked against the other rows of the batch and against the
+database. IDs already looked up are remembered, so re-validating the grid after every
+edit only queries the IDs that changed.
+
+Classes:
+    StudentBatch: The rows of a batch, their validation and their insertion.
+
+Functions:
+    parse_clipboard(text, columns): Splits pasted text into rows of cells.
+"""
+
+STUDENT_COLUMNS = ["Name", "Age", "Email", "Student ID"]
+LOOKUP_CHUNK = 500  # Student IDs per existence query, below SQLite's variable limit
+
+
+def _validate_age(text):
+    try:
+        age = int(text)
+    except ValueError:
+        raise ValueError("Age must be a non-negative integer.") from None
+    return validate_age(age)
+
+
+VALIDATORS = [validate_name, _validate_age, validate_email, validate_studentID]
+
+
+def parse_clipboard(text, columns=STUDENT_COLUMNS):
+    """
+    Splits pasted text into rows of cells.
+
+    Rows copied from a spreadsheet are tab-separated; text without tabs is read as CSV.
+    Blank lines and a header row naming the columns are skipped, and every row is cut or
+    padded to the number of columns.
+
+    Returns:
+        list of list of str: The rows.
+    """
+    if "\t" in text:
+        rows = [line.split("\t") for line in text.splitlines()]
+    else:
+        rows = list(csv.reader(io.StringIO(text)))
+    rows = [[cell.strip() for cell in row] for row in rows if any(cell.strip() for cell in row)]
+    if rows and [cell.lower() for cell in rows[0]] == [column.lower() for column in columns]:
+        rows = rows[1:]
+    return [(row + [""] * len(columns))[:len(columns)] for row in rows]
+
+
+class StudentBatch:
+    """
+    Rows of new students.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on the application's database.
+        spec (events.TableSpec): The students table of the application's WATCHED_TABLES,
+            whose columns are the name, age, email and student ID.
+    """
+    def __init__(self, cursor, spec):
+        self.cursor = cursor
+        self.spec = spec
+        self.rows = []
+        self._exists = {}  # Student ID -> whether the database already has it
+
+    def set_rows(self, rows):
+        """Replaces the rows of the batch."""
+        self.rows = [[str(cell).strip() for cell in row] for row in rows]
+
+    def _lookup(self, student_ids):
+        # Returns the IDs of student_ids found in the database
+        id_column = self.spec.columns[3]
+        missing = list(set(student_ids) - self._exists.keys())
+        for start in range(0, len(missing), LOOKUP_CHUNK):
+            chunk = missing[start:start + LOOKUP_CHUNK]
+            found = {row[0] for row in self.cursor.execute(
+                f"SELECT {id_column} FROM {self.spec.table} WHERE {id_column} IN ({', '.join('?' * len(chunk))})", chunk)}
+            self._exists.update((student_id, student_id in found) for student_id in chunk)
+        return {student_id for student_id in student_ids if self._exists.get(student_id)}
+
+    def validate(self):
+        """
+        Validates every cell.
+
+        Returns:
+            list of list: For each row, one entry per column: None if the cell is valid,
+            else the error message.
+        """
+        errors = []
+        for row in self.rows:
+            row_errors = []
+            for validator, text in zip(VALIDATORS, row):
+                try:
+                    validator(text)
+                    row_errors.append(None)
+                except ValueError as e:
+                    row_errors.append(str(e))
+            errors.append(row_errors)
+        valid_ids = [row[3] for row, row_errors in zip(self.rows, errors) if row_errors[3] is None]
+        repeated = {student_id for student_id, count in Counter(valid_ids).items() if count > 1}
+        existing = self._lookup(valid_ids)
+        for row, row_errors in zip(self.rows, errors):
+            if row_errors[3] is None and row[3] in existing:
+                row_errors[3] = "Student ID already exists."
+            elif row_errors[3] is None and row[3] in repeated:
+                row_errors[3] = "Student ID appears more than once in the batch."
+        return errors
+
+    def commit(self, connection, bus=None):
+        """
+        Inserts the valid rows in one transaction.
+
+        The rows are validated again inside the transaction, which holds the write lock,
+        so an ID added meanwhile by another process is not inserted twice. New students
+        get a StudentAdded event staged on `bus`; publish them with bus.flush().
+
+        Args:
+            connection (sqlite3.Connection): The connection `cursor` belongs to.
+            bus (events.EventBus, optional): The bus events are staged on.
+
+        Returns:
+            list of int: The indexes of the rows that were inserted; they are removed
+            from the batch.
+        """
+        spec = self.spec
+        self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            self._exists.clear()
+            errors = self.validate()
+            inserted = [index for index, row_errors in enumerate(errors) if not any(row_errors)]
+            values = [(row[0], int(row[1]), row[2], row[3]) for row in (self.rows[index] for index in inserted)]
+            mark = self.cursor.execute(f"SELECT COALESCE(MAX({spec.rowid}), 0) FROM {spec.table}").fetchone()[0]
+            self.cursor.executemany(f"INSERT INTO {spec.table} ({', '.join(spec.columns)}) VALUES (?, ?, ?, ?)",
+                                    values)
+            if bus is not None:
+                # The write lock is held, so every row past the mark is one of ours
+                for row in self.cursor.execute(spec.select_after(), (mark,)).fetchall():
+                    bus.stage(StudentAdded(row[0], row[1:]))
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            if bus is not None:
+                bus.discard()
+            raise
+        self._exists.update((row[3], True) for row in values)
+        kept = set(range(len(self.rows))) - set(inserted)
+        self.rows = [row for index, row in enumerate(self.rows) if index in kept]
+        return inserted
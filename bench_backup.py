@@ -0,0 +1,83 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import school_db
+from backup import BackupManager
+
+"""Benchmark for backup.BackupManager
+
+Fills a School Management System database, then backs it up on a background thread while
+the main thread plays the GUI: every few milliseconds it adds a student and commits, as
+Part3.py does. Reports the backup throughput and the longest time a simulated GUI write
+took during the backup, next to the longest one without a backup running.
+
+Usage:
+    python bench_backup.py --students 1000000 --pages-per-step 64
+"""
+
+
+def fill(database, student_count):
+    connection = sqlite3.connect(database)
+    cursor = connection.cursor()
+    school_db.create_tables(cursor)
+    cursor.executemany("INSERT INTO students (name, age, email, unique_id) VALUES (?, ?, ?, ?)",
+                       ((f"Student {i}", 18 + i % 10, f"student{i}@aub.edu", f"{i:09d}") for i in range(student_count)))
+    connection.commit()
+    connection.close()
+
+
+def gui_writes(database, until, interval=0.005):
+    """Adds a student every `interval` seconds until until() is true; returns the longest write in seconds."""
+    connection = sqlite3.connect(database)
+    cursor = connection.cursor()
+    longest = 0.0
+    count = 0
+    while not until():
+        start = time.perf_counter()
+        school_db.add_student(cursor, "GUI Student", 20, "gui@aub.edu", f"9{count:08d}")
+        connection.commit()
+        longest = max(longest, time.perf_counter() - start)
+        count += 1
+        time.sleep(interval)
+    connection.close()
+    return longest, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark online backups.")
+    parser.add_argument("--students", type=int, default=1000000)
+    parser.add_argument("--pages-per-step", type=int, default=64)
+    parser.add_argument("--pause", type=float, default=0.001)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "school_management.db")
+        fill(database, args.students)
+        manager = BackupManager(database, os.path.join(directory, "backups"),
+                                pages_per_step=args.pages_per_step, pause=args.pause)
+        manager.backup()  # Switches the database to WAL before the measurements
+
+        deadline = time.perf_counter() + 2
+        baseline, _ = gui_writes(database, lambda: time.perf_counter() > deadline)
+
+        done = threading.Event()
+        results = []
+        thread = threading.Thread(target=lambda: (results.append(manager.backup()), done.set()))
+        thread.start()
+        stall, writes = gui_writes(database, done.is_set)
+        thread.join()
+        result = results[0]
+
+        print(f"{args.students} students, {os.path.getsize(database) / 2 ** 20:.1f} MiB")
+        print(f"backup: {result.pages} pages in {result.seconds:.2f}s ({result.pages_per_second:.0f} pages/s), "
+              f"check {result.check}")
+        print(f"longest GUI write: {stall * 1000:.1f} ms during backup ({writes} writes), "
+              f"{baseline * 1000:.1f} ms without")
+
+
+if __name__ == "__main__":
+    main()
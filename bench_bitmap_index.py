@@ -0,0 +1,102 @@
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import school_db
+from bitmap_index import EnrollmentIndex
+from events import EventBus, RegistrationCreated
+
+"""Benchmark for bitmap_index
+
+Fills a School Management System database with students taking a few courses each,
+builds an EnrollmentIndex from it, and times set-algebra queries on the bitmaps against
+the same queries in SQL, the incremental update made for each RegistrationCreated event,
+and the memory taken by the bitmaps.
+
+Usage:
+    python bench_bitmap_index.py --students 1000000 --courses 5000 --instructors 200
+"""
+
+
+def fill(database, student_count, course_count, instructor_count, per_student=3, seed=1):
+    rng = random.Random(seed)
+    connection = sqlite3.connect(database)
+    cursor = connection.cursor()
+    school_db.create_tables(cursor)
+    cursor.executemany("INSERT INTO instructors (name, age, email, unique_id) VALUES (?, ?, ?, ?)",
+                       ((f"Instructor {i}", 40, f"instructor{i}@aub.edu", str(1000 + i)) for i in range(instructor_count)))
+    cursor.executemany("INSERT INTO courses (course_id, course_name, instructor_id) VALUES (?, ?, ?)",
+                       ((f"C{i:03d}", f"Course {i}", str(1000 + i % instructor_count)) for i in range(course_count)))
+    cursor.executemany("INSERT INTO students (name, age, email, unique_id) VALUES (?, ?, ?, ?)",
+                       ((f"Student {i}", 20, f"student{i}@aub.edu", f"{i:09d}") for i in range(student_count)))
+    cursor.executemany("INSERT INTO registrations (student_id, course_id) VALUES (?, ?)",
+                       ((student, course) for student in range(1, student_count + 1)
+                        for course in rng.sample(range(1, course_count + 1), per_student)))
+    connection.commit()
+    return connection
+
+
+def timed(function, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = function()
+    return result, (time.perf_counter() - start) / repeat
+
+
+SQL_COURSE = "SELECT registrations.student_id FROM registrations JOIN courses ON courses.id = registrations.course_id WHERE courses.course_id = ?"
+SQL_INSTRUCTOR = "SELECT registrations.student_id FROM registrations JOIN courses ON courses.id = registrations.course_id WHERE courses.instructor_id = ?"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the bitmap enrollment index.")
+    parser.add_argument("--students", type=int, default=1000000)
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--instructors", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        connection = fill(os.path.join(directory, "school_management.db"), args.students, args.courses, args.instructors)
+        start = time.perf_counter()
+        index = EnrollmentIndex.from_database(connection)
+        print(f"{args.students} students, {args.courses} courses, {args.instructors} instructors: "
+              f"index built in {time.perf_counter() - start:.2f}s, "
+              f"{sum(bitmap.nbytes for bitmap in index.courses.values()) / 2 ** 20:.1f} MiB of course bitmaps, "
+              f"{sum(bitmap.nbytes for bitmap in index.instructors.values()) / 2 ** 20:.1f} MiB of instructor bitmaps")
+
+        a, b, c = index.course("C000"), index.course("C001"), index.course("C002")
+        x, y = index.instructor("1000"), index.instructor("1001")
+        queries = [
+            ("C000 & C001", lambda: len(a & b),
+             f"SELECT COUNT(*) FROM ({SQL_COURSE} INTERSECT {SQL_COURSE})", ("C000", "C001")),
+            ("C000 | C001 - C002", lambda: len((a | b) - c),
+             f"SELECT COUNT(*) FROM ({SQL_COURSE} UNION {SQL_COURSE} EXCEPT {SQL_COURSE})", ("C000", "C001", "C002")),
+            ("i:1000 & i:1001", lambda: len(x & y),
+             f"SELECT COUNT(*) FROM ({SQL_INSTRUCTOR} INTERSECT {SQL_INSTRUCTOR})", ("1000", "1001")),
+            ("i:1000 - i:1001", lambda: len(x - y),
+             f"SELECT COUNT(*) FROM ({SQL_INSTRUCTOR} EXCEPT {SQL_INSTRUCTOR})", ("1000", "1001")),
+        ]
+        print(f"{'query':<22}{'count':>8}{'bitmap µs':>12}{'SQL µs':>12}")
+        for name, query, sql, parameters in queries:
+            count, bitmap_time = timed(query, args.repeat)
+            (sql_count,), sql_time = timed(lambda: connection.execute(sql, parameters).fetchone(), 5)
+            check = "" if count == sql_count else f"  MISMATCH (SQL {sql_count})"
+            print(f"{name:<22}{count:>8}{bitmap_time * 1e6:>12.1f}{sql_time * 1e6:>12.0f}{check}")
+
+        bus = EventBus()
+        index.subscribe(bus)
+        course_row_ids = list(index._course_ids)
+        events = [RegistrationCreated(0, (args.students + i, course_row_ids[i % len(course_row_ids)]))
+                  for i in range(10000)]
+        start = time.perf_counter()
+        for event in events:
+            bus.publish(event)
+        print(f"incremental update: {(time.perf_counter() - start) / len(events) * 1e6:.1f} µs per registration")
+        connection.close()
+
+
+if __name__ == "__main__":
+    main()
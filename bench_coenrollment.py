@@ -0,0 +1,72 @@
+import argparse
+import random
+import time
+
+import coenrollment
+from coenrollment import Incidence, co_enrollment, exam_slots, slot_conflicts
+
+"""Benchmark for coenrollment
+
+Generates a clustered enrollment like a university's: courses are grouped into programs,
+and each student takes a few courses of their own program plus electives from anywhere.
+Reports the time to build the incidence matrix, compute the co-enrollment matrix (with
+SciPy if installed and with the pure Python product) and assign exam slots, and checks
+that both products agree and that the slots have no conflicts.
+
+Usage:
+    python bench_coenrollment.py --courses 5000 --students 1000000
+"""
+
+
+def generate_rows(student_count, course_count, program_size=50, program_courses=4, electives=1, seed=1):
+    """Returns one list of course numbers per student."""
+    rng = random.Random(seed)
+    programs = max(1, course_count // program_size)
+    rows = []
+    for _ in range(student_count):
+        base = rng.randrange(programs) * program_size
+        row = rng.sample(range(base, min(base + program_size, course_count)), program_courses)
+        row.extend(rng.randrange(course_count) for _ in range(electives))
+        rows.append(row)
+    return rows
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark co-enrollment and exam slot assignment.")
+    parser.add_argument("--courses", type=int, default=5000)
+    parser.add_argument("--students", type=int, default=1000000)
+    parser.add_argument("--program-courses", type=int, default=4)
+    parser.add_argument("--electives", type=int, default=1)
+    args = parser.parse_args()
+
+    rows = generate_rows(args.students, args.courses, program_courses=args.program_courses, electives=args.electives)
+    incidence, build_time = timed(Incidence.from_rows, rows, range(args.courses))
+    del rows
+    print(f"{args.students} students, {args.courses} courses, {len(incidence.indices)} registrations")
+    print(f"{'incidence matrix':<24}{build_time:>8.2f}s")
+
+    products = []
+    for use_scipy in ([True, False] if coenrollment.sparse is not None else [False]):
+        matrix, product_time = timed(co_enrollment, incidence, use_scipy=use_scipy)
+        products.append(matrix)
+        label = "co-enrollment (SciPy)" if use_scipy else "co-enrollment (Python)"
+        print(f"{label:<24}{product_time:>8.2f}s  {len(matrix.indices) // 2} conflicting pairs")
+    if len(products) == 2:
+        same = all(getattr(products[0], name) == getattr(products[1], name)
+                   for name in ("enrollment", "indptr", "indices", "data"))
+        print(f"products agree: {same}")
+
+    matrix = products[0]
+    slots, slot_time = timed(exam_slots, matrix)
+    print(f"{'exam slots':<24}{slot_time:>8.2f}s  {max(slots.values()) + 1} slots, "
+          f"{len(slot_conflicts(matrix, slots))} conflicts")
+
+
+if __name__ == "__main__":
+    main()
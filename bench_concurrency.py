@@ -0,0 +1,193 @@
+import argparse
+import asyncio
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import concurrency
+import school_db
+import server
+from concurrency import ConflictError, RetryPolicy
+
+"""Stress test for concurrency
+
+Starts several processes that share one School Management System database, the way
+several copies of the applications would. Each process adds students and increments the
+age of a few "hot" students that every process keeps updating, with optimistic updates
+(read the row and its version, write it back only if the version is unchanged, read
+again on ConflictError). Reports the writes per second, the busy retries and the
+conflicts, and checks that no update was lost: every hot student's age and version must
+have grown by exactly the number of increments the processes reported.
+
+With --naive the increments write the value read back without the version check, which
+shows the lost updates the version column prevents.
+
+A server.py process shares the database too, and --server-clients processes add
+students through its POST /students endpoint meanwhile; every request must be answered
+201, never 500 "database is locked".
+
+Usage:
+    python bench_concurrency.py --processes 8 --operations 500 --hot 4 --server-clients 2
+"""
+
+
+def setup(database, hot_count):
+    connection = concurrency.connect(database)
+    concurrency.run_transaction(connection, school_db.create_tables)
+    concurrency.run_transaction(connection, lambda cursor: cursor.executemany(
+        "INSERT INTO students (name, age, email, unique_id) VALUES (?, ?, ?, ?)",
+        ((f"Hot {i}", 0, f"hot{i}@aub.edu", f"9{i:08d}") for i in range(hot_count))))
+    hot = [row[0] for row in connection.execute("SELECT id FROM students ORDER BY id")]
+    connection.close()
+    return hot
+
+
+def worker(database, number, operations, hot, naive, busy_timeout, results):
+    rng = random.Random(number)
+    retries = 0
+
+    def count_retry(attempt, error):
+        nonlocal retries
+        retries += 1
+
+    policy = RetryPolicy(attempts=50)
+    connection = concurrency.connect(database, busy_timeout=busy_timeout)
+    cursor = connection.cursor()
+    increments = dict.fromkeys(hot, 0)
+    inserts = conflicts = 0
+
+    def insert(cursor, index):
+        cursor.execute("INSERT INTO students (name, age, email, unique_id) VALUES (?, ?, ?, ?)",
+                       (f"Student {number}-{index}", 20, f"s{number}x{index}@aub.edu", f"{number:03d}{index:06d}"))
+
+    def increment(cursor, student):
+        nonlocal conflicts
+        while True:
+            (age,), version = concurrency.read_row(cursor, "students", "id", student, ["age"])
+            try:
+                if naive:
+                    cursor.execute("UPDATE students SET age = ? WHERE id = ?", (age + 1, student))
+                else:
+                    concurrency.run_transaction(connection, lambda c: concurrency.update_row(
+                        c, "students", "id", student, version, {"age": age + 1}), policy, on_retry=count_retry)
+                return
+            except ConflictError:
+                conflicts += 1
+
+    start = time.perf_counter()
+    for index in range(operations):
+        if rng.random() < 0.5:
+            concurrency.run_transaction(connection, lambda c: insert(c, index), policy, on_retry=count_retry)
+            inserts += 1
+        else:
+            student = rng.choice(hot)
+            concurrency.retry(lambda: increment(cursor, student), policy, count_retry)
+            increments[student] += 1
+    elapsed = time.perf_counter() - start
+    connection.close()
+    results.put((inserts, increments, retries, conflicts, elapsed))
+
+
+def serve(database, ports):
+    school_server = server.SchoolServer(database)
+
+    async def run():
+        listener = await asyncio.start_server(school_server.handle_connection, "127.0.0.1", 0)
+        ports.put(listener.sockets[0].getsockname()[1])
+        async with listener:
+            await listener.serve_forever()
+
+    asyncio.run(run())
+
+
+def http_worker(port, number, operations, results):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    statuses = {}
+    start = time.perf_counter()
+    for index in range(operations):
+        student_id = f"8{number:02d}{index:06d}"
+        body = json.dumps({"name": f"Client {number}-{index}", "age": 20, "email": f"c{student_id}@aub.edu",
+                           "student_id": student_id})
+        connection.request("POST", "/students", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        response.read()
+        statuses[response.status] = statuses.get(response.status, 0) + 1
+    connection.close()
+    results.put((statuses, time.perf_counter() - start))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress test concurrent writers on one database.")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--operations", type=int, default=500, help="writes per process")
+    parser.add_argument("--hot", type=int, default=4, help="students every process increments")
+    parser.add_argument("--busy-timeout", type=float, default=concurrency.BUSY_TIMEOUT)
+    parser.add_argument("--naive", action="store_true", help="increment without the version check")
+    parser.add_argument("--server-clients", type=int, default=2,
+                        help="processes adding students through server.py (0 runs no server)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "school_management.db")
+        hot = setup(database, args.hot)
+        results = multiprocessing.Queue()
+        http_results = multiprocessing.Queue()
+        processes = [multiprocessing.Process(target=worker, args=(database, number, args.operations, hot,
+                                                                  args.naive, args.busy_timeout, results))
+                     for number in range(args.processes)]
+        clients = []
+        server_process = None
+        if args.server_clients:
+            ports = multiprocessing.Queue()
+            server_process = multiprocessing.Process(target=serve, args=(database, ports), daemon=True)
+            server_process.start()
+            port = ports.get()
+            clients = [multiprocessing.Process(target=http_worker, args=(port, number, args.operations, http_results))
+                       for number in range(args.server_clients)]
+        start = time.perf_counter()
+        for process in processes + clients:
+            process.start()
+        reports = [results.get() for _ in processes]
+        http_reports = [http_results.get() for _ in clients]
+        for process in processes + clients:
+            process.join()
+        elapsed = time.perf_counter() - start
+        if server_process is not None:
+            server_process.terminate()
+            server_process.join()
+
+        inserts = sum(report[0] for report in reports)
+        increments = {student: sum(report[1][student] for report in reports) for student in hot}
+        retries = sum(report[2] for report in reports)
+        conflicts = sum(report[3] for report in reports)
+        writes = inserts + sum(increments.values())
+        print(f"{args.processes} processes, {writes} writes ({inserts} inserts, {writes - inserts} increments) "
+              f"in {elapsed:.2f}s: {writes / elapsed:.0f} writes/s")
+        print(f"busy retries: {retries}, version conflicts: {conflicts}")
+        statuses = {}
+        for report, _ in http_reports:
+            for status, count in report.items():
+                statuses[status] = statuses.get(status, 0) + count
+        created = statuses.get(201, 0)
+        if clients:
+            print(f"server: {sum(statuses.values())} POST /students by {len(clients)} clients, "
+                  f"statuses {dict(sorted(statuses.items()))}")
+
+        connection = sqlite3.connect(database)
+        rows = connection.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+        lost = 0
+        for student in hot:
+            age, version = connection.execute("SELECT age, version FROM students WHERE id = ?", (student,)).fetchone()
+            lost += increments[student] - age
+            print(f"student {student}: {increments[student]} increments, age {age}, version {version}")
+        connection.close()
+        print(f"students: {rows} (expected {inserts + created + len(hot)}); lost updates: {lost}")
+
+
+if __name__ == "__main__":
+    main()
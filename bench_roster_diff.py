@@ -0,0 +1,88 @@
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from OOP import Student, save_to_file
+from bench_serialization import build_roster
+from roster_diff import diff_rosters, apply_patch
+
+"""Benchmark for roster_diff
+
+Saves a roster, changes a fraction of it (modified emails, added and removed students,
+changed registrations), saves it again and reports the time and peak Python memory of
+diff_rosters and apply_patch, the size of the change set against the size of the roster,
+and checks that applying the change set reproduces the new roster (a second diff is empty).
+
+Peak memory is measured with tracemalloc in a separate run from the timing, since tracing
+slows allocation down.
+
+Usage:
+    python bench_roster_diff.py --students 100000 1000000 --change 0.01
+"""
+
+
+def change_roster(roster, fraction, seed=1):
+    """Changes about `fraction` of the students in place; returns the new student list."""
+    instructors, courses, students = roster
+    rng = random.Random(seed)
+    count = max(1, int(len(students) * fraction / 4))
+    for student in rng.sample(students, count):
+        student._Person__email = "changed." + student._Person__email
+    removed = set(id(student) for student in rng.sample(students, count))
+    for course in courses:
+        course.enrolled_students = [student for student in course.enrolled_students if id(student) not in removed]
+    students = [student for student in students if id(student) not in removed]
+    for student in rng.sample(students, count):
+        dropped = student.registered_courses.pop()
+        dropped.enrolled_students.remove(student)
+        student.register_course(courses[rng.randrange(len(courses))])
+    for index in range(count):
+        student = Student(f"New Student {index}", 20, f"new{index}@aub.edu", f"{900000000 + index}")
+        student.register_course(courses[index % len(courses)])
+        students.append(student)
+    return instructors, courses, students
+
+
+def measure(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark roster diff and patch.")
+    parser.add_argument("--students", type=int, nargs="+", default=[100000, 1000000])
+    parser.add_argument("--change", type=float, default=0.01, help="Fraction of students changed")
+    parser.add_argument("--partitions", type=int, default=64)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        old, new, patch, patched = (os.path.join(directory, name) for name in ("old.json", "new.json", "patch", "patched.json"))
+        for count in args.students:
+            roster = build_roster(count)
+            save_to_file(*roster, old, compact=True)
+            save_to_file(*change_roster(roster, args.change), new, compact=True)
+            del roster
+
+            counts, diff_time, diff_peak = measure(diff_rosters, old, new, patch, args.partitions)
+            _, patch_time, patch_peak = measure(apply_patch, old, patch, patched)
+            check = diff_rosters(new, patched, os.path.join(directory, "check"), args.partitions)
+
+            print(f"\n{count} students, {args.change:.1%} changed: {counts}")
+            print(f"{'':<14}{'time (s)':>10}{'peak MiB':>10}")
+            print(f"{'diff':<14}{diff_time:>10.2f}{diff_peak / 2 ** 20:>10.1f}")
+            print(f"{'apply_patch':<14}{patch_time:>10.2f}{patch_peak / 2 ** 20:>10.1f}")
+            print(f"roster {os.path.getsize(new) / 2 ** 20:.1f} MiB, change set {os.path.getsize(patch) / 2 ** 20:.2f} MiB, "
+                  f"round trip {'ok' if not check else f'differs: {check}'}")
+
+
+if __name__ == "__main__":
+    main()
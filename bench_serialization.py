@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import OOP
+from OOP import Instructor, Course, Student, save_to_file
+
+"""Benchmark for save_to_file
+
+Builds a roster of students spread over courses and instructors, then saves it with the
+original approach (build the whole document, json.dump with indent=4) and with each
+mode of the streaming writer, reporting write time, peak Python memory during the save
+and file size.
+
+Peak memory is measured with tracemalloc in a separate run from the timing, since
+tracing slows allocation down.
+
+Usage:
+    python bench_serialization.py --students 100000 1000000
+"""
+
+
+def build_roster(student_count, course_count=500, instructor_count=100, courses_per_student=4):
+    instructors = [Instructor(f"Instructor {i}", 40, f"instructor{i}@aub.edu", f"{1000 + i}")
+                   for i in range(instructor_count)]
+    courses = [Course(f"CSE{i:03d}", f"Course {i}", instructors[i % instructor_count]) for i in range(course_count)]
+    for course in courses:
+        course.instructor.assign_course(course)
+    students = []
+    for i in range(student_count):
+        student = Student(f"Student {i}", 18 + i % 10, f"student{i}@aub.edu", f"{i:09d}")
+        for offset in range(courses_per_student):
+            student.register_course(courses[(i * 7 + offset * 131) % course_count])
+        students.append(student)
+    return instructors, courses, students
+
+
+def legacy_save(instructors, courses, students, fileName):
+    """The original save_to_file: the whole document in memory, then json.dump(indent=4)."""
+    data = {
+        "Instructor": [OOP._instructor_entry(instructor) for instructor in instructors],
+        "Courses": [OOP._course_entry(course) for course in courses],
+        "Students": [OOP._student_entry(student) for student in students],
+    }
+    with open(fileName, 'w') as json_file:
+        json.dump(data, json_file, indent=4)
+
+
+MODES = [
+    ("legacy indent=4", legacy_save, {}),
+    ("stream indent=4", save_to_file, {}),
+    ("stream compact", save_to_file, {"compact": True, "use_fast_encoder": False}),
+    ("stream compact+orjson", save_to_file, {"compact": True, "use_fast_encoder": True}),
+    ("stream compact+gzip", save_to_file, {"compact": True, "compression": "gzip"}),
+    ("stream compact+lzma", save_to_file, {"compact": True, "compression": "lzma"}),
+]
+
+
+def measure(function, roster, path, options):
+    start = time.perf_counter()
+    function(*roster, path, **options)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    function(*roster, path, **options)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, os.path.getsize(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark save_to_file modes.")
+    parser.add_argument("--students", type=int, nargs="+", default=[100000, 1000000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        for count in args.students:
+            roster = build_roster(count)
+            print(f"\n{count} students")
+            print(f"{'mode':<24}{'time (s)':>10}{'peak MiB':>10}{'size MiB':>10}")
+            for label, function, options in MODES:
+                if "use_fast_encoder" in options and options["use_fast_encoder"] and OOP.orjson is None:
+                    print(f"{label:<24}{'orjson not installed':>30}")
+                    continue
+                path = os.path.join(directory, "roster.json")
+                elapsed, peak, size = measure(function, roster, path, options)
+                print(f"{label:<24}{elapsed:>10.2f}{peak / 2 ** 20:>10.1f}{size / 2 ** 20:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+import argparse
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left
+
+try:
+    import numpy  # Optional: speeds up building the index from the database
+except ImportError:
+    numpy = None
+
+import school_db
+from events import CourseAdded, RegistrationCreated, StudentAdded
+
+"""Compressed Bitmap Enrollment Index
+
+Maps every course and every instructor to the set of students taking it (or one of their
+courses), as a compressed bitmap of dense student ordinals, so questions such as
+"students in CSE101 and CSE102 but not EECE435L" or "students of instructor 1000 who also
+take a course from 1001" are answered with a few set operations instead of joins:
+
+    index = EnrollmentIndex.from_database(connection)
+    both = index.course("CSE101") & index.course("CSE102") - index.course("EECE435L")
+    len(both), index.students_of(both)
+
+Bitmaps are roaring-style: the ordinals are split into chunks of 65536 by their high 16
+bits, and each chunk is stored as a sorted array of its low 16 bits while it holds at most
+ARRAY_LIMIT students, or as a 65536-bit bitset (a Python int) once it holds more. Sparse
+sets cost 2 bytes per student and dense ones 1 bit, and operations work chunk by chunk,
+only on chunks present in both operands (AND) or either (OR).
+
+The index is built from the database (with NumPy, when installed, sorting and splitting
+the registrations in bulk) or from OOP.py objects, and kept current by add_registration(),
+which subscribe() calls for every RegistrationCreated event of an events.EventBus. The
+GUIs do not build an index; a program that keeps one subscribes it to its own bus.
+
+Classes:
+    Bitmap: A compressed set of non-negative integers supporting &, |, - and len().
+    EnrollmentIndex: Course and instructor bitmaps over dense student ordinals.
+
+Usage:
+    python bitmap_index.py --database school_management.db "CSE101 & CSE102 - EECE435L"
+"""
+
+# Chunks holding more values than this are stored as bitsets. Roaring's limit is 4096,
+# where both forms take 8 KiB; here bitset operations run in C over the whole int while
+# array operations go value by value in Python, so bitsets pay off much earlier.
+ARRAY_LIMIT = 512
+CHUNK_BYTES = 8192
+
+# The positions of the set bits of every byte value, for iterating bitsets
+_BYTE_BITS = [tuple(bit for bit in range(8) if value >> bit & 1) for value in range(256)]
+
+
+def _bits_to_array(bits):
+    values = array("H")
+    for position, byte in enumerate(bits.to_bytes(CHUNK_BYTES, "little")):
+        if byte:
+            base = position << 3
+            values.extend([base + bit for bit in _BYTE_BITS[byte]])
+    return values
+
+
+def _array_to_bits(values):
+    buffer = bytearray(CHUNK_BYTES)
+    for value in values:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def _container(values):
+    # Sorted distinct low bits -> the smaller representation
+    if len(values) > ARRAY_LIMIT:
+        return _array_to_bits(values)
+    return values if isinstance(values, array) else array("H", values)
+
+
+def _and(a, b):
+    if type(a) is int and type(b) is int:
+        return a & b
+    if type(a) is int:
+        a, b = b, a
+    if type(b) is int:
+        bits = b.to_bytes(CHUNK_BYTES, "little")
+        return array("H", [value for value in a if bits[value >> 3] >> (value & 7) & 1])
+    if len(a) > len(b):
+        a, b = b, a
+    return array("H", sorted(set(a).intersection(b)))
+
+
+def _or(a, b):
+    if type(a) is int or type(b) is int:
+        return (a if type(a) is int else _array_to_bits(a)) | (b if type(b) is int else _array_to_bits(b))
+    return _container(sorted(set(a).union(b)))
+
+
+def _and_not(a, b):
+    if type(a) is int:
+        return a & ~(b if type(b) is int else _array_to_bits(b))
+    if type(b) is int:
+        bits = b.to_bytes(CHUNK_BYTES, "little")
+        return array("H", [value for value in a if not bits[value >> 3] >> (value & 7) & 1])
+    return array("H", sorted(set(a).difference(b)))
+
+
+def _count(container):
+    return container.bit_count() if type(container) is int else len(container)
+
+
+class Bitmap:
+    """
+    A compressed set of non-negative integers.
+
+    Supports `in`, len(), iteration in ascending order, and the set operations & (AND),
+    | (OR) and - (AND NOT), which return new bitmaps. Results may share chunks with their
+    operands, so add() and discard() replace a chunk rather than change it in place.
+
+    Args:
+        values (iterable of int): The initial members.
+    """
+    __slots__ = ("chunks",)
+
+    def __init__(self, values=()):
+        self.chunks = {}  # High 16 bits -> sorted array("H") of low 16 bits, or an int bitset
+        values = sorted(set(values))
+        start = 0
+        while start < len(values):
+            high = values[start] >> 16
+            end = bisect_left(values, (high + 1) << 16, start)
+            self.chunks[high] = _container(array("H", [value & 0xFFFF for value in values[start:end]]))
+            start = end
+
+    @classmethod
+    def _from_chunks(cls, chunks):
+        bitmap = cls()
+        bitmap.chunks = {high: chunk for high, chunk in chunks.items() if chunk}
+        return bitmap
+
+    def add(self, value):
+        """Adds `value` to the set."""
+        high, low = value >> 16, value & 0xFFFF
+        chunk = self.chunks.get(high)
+        if chunk is None:
+            self.chunks[high] = array("H", [low])
+        elif type(chunk) is int:
+            self.chunks[high] = chunk | 1 << low
+        else:
+            position = bisect_left(chunk, low)
+            if position == len(chunk) or chunk[position] != low:
+                # Copied, since results of the set operations may share arrays with their operands
+                chunk = array("H", chunk)
+                chunk.insert(position, low)
+                self.chunks[high] = _array_to_bits(chunk) if len(chunk) > ARRAY_LIMIT else chunk
+
+    def discard(self, value):
+        """Removes `value` from the set if present."""
+        high, low = value >> 16, value & 0xFFFF
+        chunk = self.chunks.get(high)
+        if chunk is None:
+            return
+        if type(chunk) is int:
+            chunk &= ~(1 << low)
+            if chunk.bit_count() <= ARRAY_LIMIT:
+                chunk = _bits_to_array(chunk)
+            self.chunks[high] = chunk
+        else:
+            position = bisect_left(chunk, low)
+            if position < len(chunk) and chunk[position] == low:
+                chunk = array("H", chunk)  # Copied, as in add()
+                del chunk[position]
+                self.chunks[high] = chunk
+        if not chunk:
+            del self.chunks[high]
+
+    def __contains__(self, value):
+        chunk = self.chunks.get(value >> 16)
+        if chunk is None:
+            return False
+        low = value & 0xFFFF
+        if type(chunk) is int:
+            return bool(chunk >> low & 1)
+        position = bisect_left(chunk, low)
+        return position < len(chunk) and chunk[position] == low
+
+    def __len__(self):
+        return sum(_count(chunk) for chunk in self.chunks.values())
+
+    def __iter__(self):
+        for high in sorted(self.chunks):
+            chunk = self.chunks[high]
+            base = high << 16
+            for low in (_bits_to_array(chunk) if type(chunk) is int else chunk):
+                yield base + low
+
+    def __and__(self, other):
+        small, large = (self.chunks, other.chunks) if len(self.chunks) <= len(other.chunks) else (other.chunks, self.chunks)
+        return Bitmap._from_chunks({high: _and(chunk, large[high]) for high, chunk in small.items() if high in large})
+
+    def __or__(self, other):
+        chunks = dict(self.chunks)
+        for high, chunk in other.chunks.items():
+            chunks[high] = _or(chunks[high], chunk) if high in chunks else chunk
+        return Bitmap._from_chunks(chunks)
+
+    def __sub__(self, other):
+        return Bitmap._from_chunks({high: _and_not(chunk, other.chunks[high]) if high in other.chunks else chunk
+                                    for high, chunk in self.chunks.items()})
+
+    def __eq__(self, other):
+        return isinstance(other, Bitmap) and list(self) == list(other)
+
+    def __repr__(self):
+        return f"Bitmap(<{len(self)} values>)"
+
+    @property
+    def nbytes(self):
+        """The approximate size of the stored chunks in bytes."""
+        return sum(CHUNK_BYTES if type(chunk) is int else 2 * len(chunk) for chunk in self.chunks.values())
+
+
+def _union(bitmaps):
+    result = Bitmap()
+    for bitmap in bitmaps:
+        result = result | bitmap
+    return result
+
+
+class EnrollmentIndex:
+    """
+    Course and instructor bitmaps over dense student ordinals.
+
+    Students are numbered 0, 1, 2, ... in the order they are first seen; `students` maps
+    ordinals back to student keys: what the registrations hold for an index built from
+    the database (student row ids in the school_db schema, unique student IDs in the
+    Tkinter.py schema), OOP.Student objects for one built from objects. Courses are keyed
+    by course ID and instructors by instructor ID; sections sharing a course ID share a
+    bitmap.
+    """
+    def __init__(self):
+        self.students = []
+        self.ordinals = {}
+        self.courses = {}
+        self.instructors = {}
+        self.course_instructors = {}  # Course ID -> instructor ID
+        self.instructor_courses = {}  # Instructor ID -> set of course IDs
+        self._course_ids = {}  # What registrations hold for a course -> course ID, for events
+        self._refs_by_course_id = False  # Registrations hold course IDs (Tkinter.py) rather than course row ids
+
+    def _ordinal(self, student):
+        ordinal = self.ordinals.get(student)
+        if ordinal is None:
+            ordinal = self.ordinals[student] = len(self.students)
+            self.students.append(student)
+        return ordinal
+
+    def course(self, course_id):
+        """Returns the bitmap of the students taking the course (empty if unknown)."""
+        return self.courses.get(course_id) or Bitmap()
+
+    def instructor(self, instructor_id):
+        """Returns the bitmap of the students taking any course of the instructor (empty if unknown)."""
+        return self.instructors.get(instructor_id) or Bitmap()
+
+    def students_of(self, bitmap):
+        """Returns the student keys of the ordinals in `bitmap`, in ordinal order."""
+        return [self.students[ordinal] for ordinal in bitmap]
+
+    def add_course(self, course_id, instructor_id, row_id=None):
+        """Records which instructor teaches a course (and the course's row id, for events)."""
+        if row_id is not None:
+            self._course_ids[course_id if self._refs_by_course_id else row_id] = course_id
+        previous = self.course_instructors.get(course_id)
+        if previous is not None and previous != instructor_id:
+            return  # Sections sharing a course ID keep the first instructor seen
+        self.course_instructors[course_id] = instructor_id
+        self.instructor_courses.setdefault(instructor_id, set()).add(course_id)
+
+    def add_registration(self, student, course_id):
+        """Adds a registration of `student` (a student key) to a course."""
+        ordinal = self._ordinal(student)
+        self.courses.setdefault(course_id, Bitmap()).add(ordinal)
+        instructor_id = self.course_instructors.get(course_id)
+        if instructor_id is not None:
+            self.instructors.setdefault(instructor_id, Bitmap()).add(ordinal)
+
+    def remove_registration(self, student, course_id):
+        """Removes a registration; the student stays in the instructor's bitmap if they take another of their courses."""
+        ordinal = self.ordinals.get(student)
+        if ordinal is None or course_id not in self.courses:
+            return
+        self.courses[course_id].discard(ordinal)
+        instructor_id = self.course_instructors.get(course_id)
+        if instructor_id in self.instructors and not any(
+                ordinal in self.course(other) for other in self.instructor_courses[instructor_id]):
+            self.instructors[instructor_id].discard(ordinal)
+
+    def subscribe(self, bus):
+        """
+        Keeps the index current with the CourseAdded and RegistrationCreated events of an
+        events.EventBus, as staged by school_db and Tkinter.py (course rows start with the
+        course ID, title and instructor ID; registration rows are (student, course) as
+        stored in the registrations table the index was built from).
+
+        Returns:
+            function: A function that removes both subscriptions when called.
+        """
+        def on_course(event):
+            self.add_course(event.row[0], event.row[2], event.row_id)
+
+        def on_registration(event):
+            course_id = self._course_ids.get(event.row[1])
+            if course_id is not None:
+                self.add_registration(event.row[0], course_id)
+
+        unsubscribers = [bus.subscribe(CourseAdded, on_course), bus.subscribe(RegistrationCreated, on_registration)]
+        return lambda: [unsubscribe() for unsubscribe in unsubscribers]
+
+    @classmethod
+    def from_objects(cls, students, courses=()):
+        """
+        Builds the index from OOP.Student objects and their registered courses.
+
+        Args:
+            students (iterable of OOP.Student): The students; they are the student keys.
+            courses (iterable of OOP.Course): Courses to include even if nobody takes them.
+        """
+        index = cls()
+        members = {}
+        for course in courses:
+            index.add_course(course.course_id, course.instructor.instructor_id)
+            members.setdefault(course.course_id, [])
+        for student in students:
+            ordinal = index._ordinal(student)
+            for course in student.registered_courses:
+                index.add_course(course.course_id, course.instructor.instructor_id)
+                members.setdefault(course.course_id, []).append(ordinal)
+        index.courses = {course_id: Bitmap(ordinals) for course_id, ordinals in members.items()}
+        index._build_instructors()
+        return index
+
+    @classmethod
+    def from_database(cls, connection, tables=school_db.WATCHED_TABLES):
+        """
+        Builds the index from the courses and registrations of a database.
+
+        Args:
+            connection (sqlite3.Connection): The database.
+            tables (list of events.TableSpec): The watched tables of the application whose
+                schema the database has: school_db.WATCHED_TABLES or Tkinter.WATCHED_TABLES.
+        """
+        specs = {spec.event_type: spec for spec in tables}
+        student_spec, course_spec, registration_spec = specs[StudentAdded], specs[CourseAdded], specs[RegistrationCreated]
+        student_column, course_column = registration_spec.columns[:2]
+        index = cls()
+        # school_db registrations refer to course row ids, Tkinter.py ones to course IDs
+        references = {row[3]: row[4] for row in connection.execute(
+            f"PRAGMA foreign_key_list({registration_spec.table})")}
+        index._refs_by_course_id = references.get(course_column) == course_spec.columns[0]
+        for row_id, course_id, instructor_id in connection.execute(
+                f"SELECT {course_spec.rowid}, {course_spec.columns[0]}, {course_spec.columns[2]} "
+                f"FROM {course_spec.table} ORDER BY {course_spec.rowid}"):
+            index.add_course(course_id, instructor_id, row_id)
+        keys = list(dict.fromkeys(index._course_ids.values()))
+        key_numbers = {course_id: number for number, course_id in enumerate(keys)}
+        course_numbers = {reference: key_numbers[course_id] for reference, course_id in index._course_ids.items()}
+
+        # Students are numbered in the order of their keys, so ordinals follow the table
+        student_numbers = array("q")
+        course_numbers_column = array("i")
+        previous = None
+        # Registrations without a student row (a NULL or dangling reference) are left out
+        student_key = references.get(student_column, student_spec.rowid)
+        cursor = connection.execute(f"SELECT {student_column}, {course_column} FROM {registration_spec.table} "
+                                    f"WHERE {student_column} IN (SELECT {student_key} FROM {student_spec.table}) "
+                                    f"ORDER BY {student_column}")
+        while True:
+            batch = cursor.fetchmany(100000)
+            if not batch:
+                break
+            for student, course in batch:
+                number = course_numbers.get(course)
+                if number is None:
+                    continue  # Orphan registration
+                if student != previous:
+                    ordinal = index._ordinal(student)
+                    previous = student
+                student_numbers.append(ordinal)
+                course_numbers_column.append(number)
+
+        if numpy is not None:
+            members = _split_numpy(student_numbers, course_numbers_column, len(keys))
+        else:
+            lists = [[] for _ in keys]
+            for ordinal, number in zip(student_numbers, course_numbers_column):
+                lists[number].append(ordinal)
+            members = [Bitmap(ordinals) for ordinals in lists]
+        index.courses = dict(zip(keys, members))
+        index._build_instructors()
+        return index
+
+    def _build_instructors(self):
+        self.instructors = {instructor_id: _union(self.course(course_id) for course_id in sorted(course_ids))
+                            for instructor_id, course_ids in self.instructor_courses.items()}
+
+
+def _split_numpy(ordinals, numbers, key_count):
+    # Sorts the (course, student) pairs once and cuts them into the chunks of every bitmap
+    ordinals = numpy.frombuffer(ordinals, dtype=numpy.int64)
+    numbers = numpy.frombuffer(numbers, dtype=numpy.int32).astype(numpy.int64)
+    groups = numbers * ((int(ordinals.max()) >> 16) + 1 if len(ordinals) else 1) + (ordinals >> 16)
+    order = numpy.lexsort((ordinals, groups))
+    groups, ordinals, numbers = groups[order], ordinals[order], numbers[order]
+    distinct = numpy.ones(len(ordinals), dtype=bool)
+    distinct[1:] = (groups[1:] != groups[:-1]) | (ordinals[1:] != ordinals[:-1])
+    groups, ordinals, numbers = groups[distinct], ordinals[distinct], numbers[distinct]
+    lows = (ordinals & 0xFFFF).astype(numpy.uint16)
+    starts = numpy.flatnonzero(numpy.r_[True, groups[1:] != groups[:-1]]).tolist()
+    bitmaps = [Bitmap() for _ in range(key_count)]
+    bits = numpy.zeros(65536, dtype=bool)
+    for start, end in zip(starts, starts[1:] + [len(lows)]):
+        low = lows[start:end]
+        if end - start > ARRAY_LIMIT:
+            bits[:] = False
+            bits[low] = True
+            chunk = int.from_bytes(numpy.packbits(bits, bitorder="little").tobytes(), "little")
+        else:
+            chunk = array("H", low.tobytes())
+        bitmaps[int(numbers[start])].chunks[int(ordinals[start]) >> 16] = chunk
+    return bitmaps
+
+
+def evaluate(index, expression):
+    """
+    Evaluates a query such as "CSE101 & CSE102 - EECE435L" or "i:1000 & i:1001" left to
+    right; names are course IDs, or instructor IDs when prefixed with "i:".
+    """
+    tokens = expression.replace("&", " & ").replace("|", " | ").replace("-", " - ").split()
+    if not tokens:
+        raise ValueError("Empty query")
+
+    def operand(token):
+        return index.instructor(token[2:]) if token.startswith("i:") else index.course(token)
+
+    result = operand(tokens[0])
+    for operator, token in zip(tokens[1::2], tokens[2::2]):
+        if operator == "&":
+            result = result & operand(token)
+        elif operator == "|":
+            result = result | operand(token)
+        elif operator == "-":
+            result = result - operand(token)
+        else:
+            raise ValueError(f"Unknown operator {operator!r}")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query course and instructor enrollment with bitmaps.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("query", nargs="+", help='e.g. "CSE101 & CSE102 - EECE435L" or "i:1000 & i:1001"')
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    start = time.perf_counter()
+    index = EnrollmentIndex.from_database(connection)
+    connection.close()
+    print(f"Indexed {len(index.students)} students, {len(index.courses)} courses, "
+          f"{len(index.instructors)} instructors in {time.perf_counter() - start:.2f}s")
+    for query in args.query:
+        start = time.perf_counter()
+        result = evaluate(index, query)
+        count = len(result)
+        print(f"{query}: {count} students ({(time.perf_counter() - start) * 1e6:.0f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import heapq
+import sqlite3
+import time
+from array import array
+from collections import Counter
+from itertools import combinations
+
+try:
+    import numpy  # Optional: co_enrollment() uses one SciPy sparse product when available
+    from scipy import sparse
+except ImportError:
+    numpy = sparse = None
+
+import school_db
+
+"""Co-enrollment Matrix and Exam Conflict Detection
+
+Builds the sparse student x course incidence matrix A of a roster (from OOP.py objects or
+from the registrations table) and the course co-enrollment matrix C = A^T A, whose entry
+(a, b) is the number of students taking both course a and course b. Two courses whose
+exams share a slot conflict when C[a, b] > 0, so a conflict-free exam timetable is a
+coloring of the graph of C, computed here with the DSatur heuristic.
+
+With NumPy and SciPy installed, C is computed by one sparse matrix product. Without them
+the same product is accumulated row by row: each student contributes one count to every
+pair of their courses, and the pairs are counted in batches by collections.Counter, so
+the work grows with the number of (student, course pair) entries rather than with
+courses x courses x students.
+
+Classes:
+    Incidence: The incidence matrix A in compressed sparse row form.
+    CoEnrollment: The co-enrollment matrix C, with lookups by course.
+
+Functions:
+    co_enrollment(incidence, use_scipy): Computes C from A.
+    exam_slots(matrix, min_shared): Assigns courses to exam slots so no student has two exams in a slot.
+    slot_conflicts(matrix, slots, min_shared): Lists the course pairs that share a slot and a student.
+
+Usage:
+    python coenrollment.py --database school_management.db
+"""
+
+BATCH_SIZE = 100000
+
+
+class Incidence:
+    """
+    The student x course incidence matrix, in compressed sparse row form.
+
+    The courses of student s are course ordinals indices[indptr[s]:indptr[s + 1]], each
+    listed once.
+
+    Args:
+        courses (list): The course keys (e.g. course IDs), indexed by ordinal.
+        indptr (array): Row offsets into `indices`, one more than the number of students.
+        indices (array): Course ordinals.
+    """
+    def __init__(self, courses, indptr, indices):
+        self.courses = courses
+        self.indptr = indptr
+        self.indices = indices
+
+    @property
+    def student_count(self):
+        return len(self.indptr) - 1
+
+    @classmethod
+    def from_rows(cls, rows, courses=()):
+        """
+        Builds the matrix from one iterable of course keys per student.
+
+        Args:
+            rows (iterable): For each student, the keys of their courses.
+            courses (iterable): Course keys to include even if nobody takes them.
+        """
+        ordinals = {}
+        for course in courses:
+            ordinals.setdefault(course, len(ordinals))
+        indptr = array("q", [0])
+        indices = array("i")
+        for row in rows:
+            seen = set()
+            for course in row:
+                ordinal = ordinals.get(course)
+                if ordinal is None:
+                    ordinal = ordinals[course] = len(ordinals)
+                if ordinal not in seen:
+                    seen.add(ordinal)
+                    indices.append(ordinal)
+            indptr.append(len(indices))
+        return cls(list(ordinals), indptr, indices)
+
+    @classmethod
+    def from_objects(cls, students, courses=()):
+        """Builds the matrix from OOP.Student objects, keyed by OOP.Course object (course IDs may repeat)."""
+        return cls.from_rows((student.registered_courses for student in students), courses)
+
+    @classmethod
+    def from_database(cls, connection):
+        """
+        Builds the matrix from the registrations of a School Management System database,
+        keyed by the row id of each course, since course codes may repeat. Registrations are
+        read in (student, course) index order.
+        """
+        row_ids = [row_id for (row_id,) in connection.execute("SELECT id FROM courses ORDER BY id")]
+        ordinals = {row_id: ordinal for ordinal, row_id in enumerate(row_ids)}
+        indptr = array("q", [0])
+        indices = array("i")
+        current = None
+        last = None
+        cursor = connection.execute("""
+            SELECT student_id, course_id FROM registrations
+            WHERE course_id IN (SELECT id FROM courses) AND student_id IN (SELECT id FROM students)
+            ORDER BY student_id, course_id
+        """)
+        while True:
+            batch = cursor.fetchmany(BATCH_SIZE)
+            if not batch:
+                break
+            for student, course in batch:
+                if student != current:
+                    if current is not None:
+                        indptr.append(len(indices))
+                    current, last = student, None
+                if course != last:  # Duplicate registrations count once
+                    indices.append(ordinals[course])
+                    last = course
+        if current is not None:
+            indptr.append(len(indices))
+        return cls(row_ids, indptr, indices)
+
+
+class CoEnrollment:
+    """
+    The course co-enrollment matrix, symmetric and in compressed sparse row form without
+    its diagonal, which is kept as `enrollment`.
+
+    Args:
+        courses (list): The course keys, indexed by ordinal.
+        enrollment (list of int): The number of students of each course.
+        indptr, indices, data (list of int): Row r lists the courses sharing students with
+            course r (indices[indptr[r]:indptr[r + 1]], ascending) and how many (data).
+    """
+    def __init__(self, courses, enrollment, indptr, indices, data):
+        self.courses = courses
+        self.enrollment = enrollment
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.ordinals = {course: ordinal for ordinal, course in enumerate(courses)}
+
+    def neighbors(self, course):
+        """Returns (course, shared students) for every course sharing students with `course`."""
+        ordinal = self.ordinals[course]
+        start, end = self.indptr[ordinal], self.indptr[ordinal + 1]
+        return [(self.courses[other], shared) for other, shared in zip(self.indices[start:end], self.data[start:end])]
+
+    def shared(self, course_a, course_b):
+        """Returns the number of students taking both courses."""
+        a, b = self.ordinals[course_a], self.ordinals[course_b]
+        if a == b:
+            return self.enrollment[a]
+        start, end = self.indptr[a], self.indptr[a + 1]
+        position = _bisect(self.indices, b, start, end)
+        return self.data[position] if position < end and self.indices[position] == b else 0
+
+    def pairs(self, min_shared=1):
+        """Yields (course_a, course_b, shared) for every pair of courses sharing at least `min_shared` students."""
+        for a in range(len(self.courses)):
+            for position in range(self.indptr[a], self.indptr[a + 1]):
+                b = self.indices[position]
+                if b > a and self.data[position] >= min_shared:
+                    yield self.courses[a], self.courses[b], self.data[position]
+
+
+def _bisect(values, target, low, high):
+    while low < high:
+        middle = (low + high) // 2
+        if values[middle] < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+def _co_enrollment_scipy(incidence):
+    course_count = len(incidence.courses)
+    indices = numpy.frombuffer(incidence.indices, dtype=numpy.int32)
+    indptr = numpy.frombuffer(incidence.indptr, dtype=numpy.int64)
+    matrix = sparse.csr_matrix((numpy.ones(len(indices), dtype=numpy.int32), indices, indptr),
+                               shape=(incidence.student_count, course_count))
+    product = (matrix.T @ matrix).tocsr()
+    enrollment = product.diagonal().tolist()
+    product.setdiag(0)
+    product.eliminate_zeros()
+    product.sort_indices()
+    return CoEnrollment(incidence.courses, enrollment, product.indptr.tolist(), product.indices.tolist(),
+                        product.data.tolist())
+
+
+def _co_enrollment_python(incidence):
+    course_count = len(incidence.courses)
+    indptr, indices = incidence.indptr, incidence.indices
+    enrollment = [0] * course_count
+    for ordinal in indices:
+        enrollment[ordinal] += 1
+    # Each pair (a, b), a < b, is counted under the key a * course_count + b
+    counts = Counter()
+    for start in range(0, incidence.student_count, BATCH_SIZE):
+        keys = []
+        for student in range(start, min(start + BATCH_SIZE, incidence.student_count)):
+            row = sorted(indices[indptr[student]:indptr[student + 1]])
+            if len(row) > 1:
+                keys.extend([a * course_count + b for a, b in combinations(row, 2)])
+        counts.update(keys)
+    rows = [[] for _ in range(course_count)]
+    for key, shared in counts.items():
+        a, b = divmod(key, course_count)
+        rows[a].append((b, shared))
+        rows[b].append((a, shared))
+    matrix_indptr, matrix_indices, data = [0], [], []
+    for row in rows:
+        row.sort()
+        matrix_indices.extend(other for other, _ in row)
+        data.extend(shared for _, shared in row)
+        matrix_indptr.append(len(matrix_indices))
+    return CoEnrollment(incidence.courses, enrollment, matrix_indptr, matrix_indices, data)
+
+
+def co_enrollment(incidence, use_scipy=None):
+    """
+    Computes the co-enrollment matrix A^T A of an incidence matrix.
+
+    Args:
+        incidence (Incidence): The student x course incidence matrix.
+        use_scipy (bool): Use SciPy's sparse product; by default, whenever SciPy is installed.
+
+    Returns:
+        CoEnrollment: The co-enrollment matrix.
+
+    Raises:
+        ImportError: If use_scipy is True and SciPy is not installed.
+    """
+    if use_scipy is None:
+        use_scipy = sparse is not None
+    if use_scipy:
+        if sparse is None:
+            raise ImportError("NumPy and SciPy are required for use_scipy=True")
+        return _co_enrollment_scipy(incidence)
+    return _co_enrollment_python(incidence)
+
+
+def exam_slots(matrix, min_shared=1):
+    """
+    Assigns every course an exam slot so that courses sharing students get different slots.
+
+    Uses DSatur: the next course colored is the one whose neighbors already use the most
+    distinct slots (ties broken by number of neighbors), and it gets the lowest slot none
+    of them uses. This is a heuristic; it typically needs few more slots than the minimum.
+
+    Args:
+        matrix (CoEnrollment): The co-enrollment matrix.
+        min_shared (int): Courses sharing fewer students than this may share a slot.
+
+    Returns:
+        dict: Course key -> slot number, starting at 0.
+    """
+    count = len(matrix.courses)
+    indptr, indices, data = matrix.indptr, matrix.indices, matrix.data
+    neighbors = [[indices[position] for position in range(indptr[course], indptr[course + 1])
+                  if data[position] >= min_shared] for course in range(count)]
+    slots = [-1] * count
+    used = [set() for _ in range(count)]  # Slots taken by each course's neighbors
+    heap = [(0, -len(neighbors[course]), course) for course in range(count)]
+    heapq.heapify(heap)
+    while heap:
+        saturation, _, course = heapq.heappop(heap)
+        if slots[course] != -1 or -saturation != len(used[course]):
+            continue  # Already colored, or a stale entry superseded by a later push
+        slot = 0
+        taken = used[course]
+        while slot in taken:
+            slot += 1
+        slots[course] = slot
+        for other in neighbors[course]:
+            if slots[other] == -1 and slot not in used[other]:
+                used[other].add(slot)
+                heapq.heappush(heap, (-len(used[other]), -len(neighbors[other]), other))
+    return {matrix.courses[course]: slot for course, slot in enumerate(slots)}
+
+
+def slot_conflicts(matrix, slots, min_shared=1):
+    """Returns (course_a, course_b, shared) for every pair of courses in the same slot sharing students."""
+    return [(a, b, shared) for a, b, shared in matrix.pairs(min_shared) if slots[a] == slots[b]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compute co-enrollment and conflict-free exam slots.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("--min-shared", type=int, default=1)
+    parser.add_argument("--no-scipy", action="store_true", help="Use the pure Python product")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database)
+    start = time.perf_counter()
+    incidence = Incidence.from_database(connection)
+    codes = dict(connection.execute("SELECT id, course_id FROM courses"))
+    connection.close()
+    loaded = time.perf_counter()
+    matrix = co_enrollment(incidence, use_scipy=False if args.no_scipy else None)
+    multiplied = time.perf_counter()
+    slots = exam_slots(matrix, args.min_shared)
+    colored = time.perf_counter()
+    print(f"{incidence.student_count} students, {len(incidence.courses)} courses, "
+          f"{len(matrix.indices) // 2} conflicting pairs")
+    print(f"load {loaded - start:.2f}s, co-enrollment {multiplied - loaded:.2f}s, slots {colored - multiplied:.2f}s")
+    print(f"{max(slots.values(), default=-1) + 1} exam slots; "
+          f"{len(slot_conflicts(matrix, slots, args.min_shared))} conflicts")
+    for slot in range(max(slots.values(), default=-1) + 1):
+        print(f"Slot {slot + 1}: {', '.join(codes[course] for course, value in slots.items() if value == slot)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+import random
+import sqlite3
+import time
+
+"""Concurrent Access to a Shared Database File
+
+Several copies of Part3.py and Tkinter.py (and server.py) may use the same database
+file at once. SQLite lets one connection write at a time; the others get SQLITE_BUSY
+("database is locked"). This module keeps that contention short and invisible:
+
+- connect() opens connections in autocommit mode, with WAL journaling (readers never
+  block the writer or each other) and a configurable busy timeout, so no connection sits
+  in a long implicit transaction holding locks between user actions.
+- run_transaction() runs a unit of work in one short BEGIN IMMEDIATE ... COMMIT, which
+  takes the write lock up front, and retry() runs it again after a jittered exponential
+  backoff if SQLite still reports the database busy or locked, so competing writers do
+  not wake up and collide in lockstep.
+- Rows of the main tables carry a `version` column, added by add_version_columns(), and
+  update_row() only applies an update when the row still has the version that was read
+  (optimistic concurrency). An update based on a stale read raises ConflictError instead
+  of silently overwriting the other writer's change. A trigger bumps the version of rows
+  updated by any other statement, so those changes are detected too.
+
+Classes:
+    RetryPolicy: How many times, and after what delays, busy work is retried.
+    ConflictError: A row changed since the version the update was based on.
+
+Functions:
+    connect(database, busy_timeout, wal): Opens a connection set up for shared use.
+    is_busy(error): Tells whether an exception is SQLITE_BUSY or SQLITE_LOCKED.
+    retry(function, policy, on_retry): Calls function(), retrying while the database is busy.
+    run_transaction(connection, work, policy, bus, on_retry): Runs work(cursor) in a short write transaction.
+    add_version_columns(cursor, tables): Adds the version columns and triggers (a migration).
+    read_row(cursor, table, rowid, row_id, columns): Reads columns of a row together with its version.
+    update_row(cursor, table, rowid, row_id, version, changes): Updates a row if its version is unchanged.
+"""
+
+BUSY_TIMEOUT = 5.0
+VERSION_COLUMN = "version"
+
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+class RetryPolicy:
+    """
+    Retries with "full jitter" exponential backoff: before retry n the caller sleeps a
+    random time between 0 and min(max_delay, base_delay * 2 ** n).
+
+    Args:
+        attempts (int): The number of attempts in total, the first one included.
+        base_delay (float): Seconds; the cap of the first backoff.
+        max_delay (float): Seconds; the largest backoff.
+    """
+    def __init__(self, attempts=10, base_delay=0.01, max_delay=1.0):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt):
+        """Returns the seconds to wait after the failed attempt number `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+
+class ConflictError(Exception):
+    """
+    An optimistic update found the row changed (or deleted) since it was read.
+
+    Args:
+        table (str): The table.
+        row_id (int): The row id.
+        expected (int): The version the update was based on.
+        actual (int): The version found, or None if the row no longer exists.
+    """
+    def __init__(self, table, row_id, expected, actual):
+        state = "was deleted" if actual is None else f"is at version {actual}"
+        super().__init__(f"{table} row {row_id} {state}, not {expected}; read it again and retry")
+        self.table = table
+        self.row_id = row_id
+        self.expected = expected
+        self.actual = actual
+
+
+def connect(database, busy_timeout=BUSY_TIMEOUT, wal=True, **kwargs):
+    """
+    Opens a connection for use alongside other processes.
+
+    The connection is in autocommit mode (isolation_level=None): each statement commits
+    on its own unless run inside run_transaction(), so no implicit transaction is left
+    open between user actions.
+
+    Args:
+        database (str): The database file.
+        busy_timeout (float): Seconds a statement waits for a lock before SQLITE_BUSY.
+        wal (bool): Switch the database to WAL journaling (it stays in WAL for every
+            connection once switched).
+        **kwargs: Passed on to sqlite3.connect.
+    """
+    connection = sqlite3.connect(database, timeout=busy_timeout, isolation_level=None, **kwargs)
+    if wal:
+        retry(lambda: connection.execute("PRAGMA journal_mode = WAL").fetchone())
+    return connection
+
+
+def is_busy(error):
+    """Returns True if `error` means another connection holds a lock the statement needed."""
+    if not isinstance(error, sqlite3.OperationalError):
+        return False
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return (code & 0xFF) in (SQLITE_BUSY, SQLITE_LOCKED)  # Extended codes keep the primary code in the low byte
+    message = str(error)
+    return "locked" in message or "busy" in message
+
+
+def retry(function, policy=DEFAULT_RETRY, on_retry=None):
+    """
+    Calls function() and returns its result, calling it again after a backoff while it
+    raises a busy or locked error. Other errors are raised at once.
+
+    Args:
+        function (function): The work; it must leave no transaction open when it fails.
+        policy (RetryPolicy): Attempts and delays.
+        on_retry (function): Called as on_retry(attempt, error) before each backoff.
+
+    Raises:
+        sqlite3.OperationalError: The last busy error, once the attempts run out.
+    """
+    for attempt in range(policy.attempts):
+        try:
+            return function()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == policy.attempts - 1:
+                raise
+            if on_retry is not None:
+                on_retry(attempt, e)
+            time.sleep(policy.delay(attempt))
+
+
+def run_transaction(connection, work, policy=DEFAULT_RETRY, bus=None, on_retry=None):
+    """
+    Runs work(cursor) inside BEGIN IMMEDIATE ... COMMIT, retrying on busy errors.
+
+    Keep the work short and free of user interaction: the write lock is held from BEGIN
+    to COMMIT. The work may run more than once, so it must not have effects outside the
+    database other than staging events.
+
+    Args:
+        connection (sqlite3.Connection): A connection from connect().
+        work (function): Called as work(cursor); its result is returned.
+        policy (RetryPolicy): Attempts and delays.
+        bus (events.EventBus, optional): Events the work stages on it are published after
+            the commit, and dropped when an attempt rolls back.
+        on_retry (function): Called as on_retry(attempt, error) before each backoff.
+    """
+    def attempt():
+        cursor = connection.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            result = work(cursor)
+            cursor.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.rollback()
+            if bus is not None:
+                bus.discard()
+            raise
+        return result
+
+    result = retry(attempt, policy, on_retry)
+    if bus is not None:
+        bus.flush()
+    return result
+
+
+def add_version_columns(cursor, tables):
+    """
+    Adds a `version` column (0 for existing rows) to each table that lacks one, and a
+    trigger that increments it when a row is updated without changing it.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on the database.
+        tables (list of tuple): (table, rowid column) pairs.
+    """
+    for table, rowid in tables:
+        columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+        if VERSION_COLUMN not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {VERSION_COLUMN} INTEGER NOT NULL DEFAULT 0")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_version AFTER UPDATE ON {table}
+            WHEN NEW.{VERSION_COLUMN} = OLD.{VERSION_COLUMN}
+            BEGIN
+                UPDATE {table} SET {VERSION_COLUMN} = OLD.{VERSION_COLUMN} + 1 WHERE {rowid} = NEW.{rowid};
+            END
+        """)
+
+
+def read_row(cursor, table, rowid, row_id, columns):
+    """
+    Returns (values, version) of a row, or None if it does not exist. Pass the version to
+    update_row() when saving changes made from these values.
+    """
+    row = cursor.execute(f"SELECT {', '.join(columns)}, {VERSION_COLUMN} FROM {table} WHERE {rowid} = ?",
+                         (row_id,)).fetchone()
+    return None if row is None else (row[:-1], row[-1])
+
+
+def update_row(cursor, table, rowid, row_id, version, changes):
+    """
+    Updates a row only if it is still at `version`.
+
+    Args:
+        cursor (sqlite3.Cursor): A cursor on the database.
+        table (str), rowid (str): The table and its row id column.
+        row_id (int): The row to update.
+        version (int): The version the changes are based on, as returned by read_row().
+        changes (dict): Column -> new value.
+
+    Returns:
+        int: The row's new version.
+
+    Raises:
+        ConflictError: If another writer changed or deleted the row since it was read.
+    """
+    assignments = ", ".join(f"{column} = ?" for column in changes)
+    cursor.execute(f"UPDATE {table} SET {assignments}, {VERSION_COLUMN} = {VERSION_COLUMN} + 1 "
+                   f"WHERE {rowid} = ? AND {VERSION_COLUMN} = ?", (*changes.values(), row_id, version))
+    if cursor.rowcount == 1:
+        return version + 1
+    row = cursor.execute(f"SELECT {VERSION_COLUMN} FROM {table} WHERE {rowid} = ?", (row_id,)).fetchone()
+    raise ConflictError(table, row_id, version, None if row is None else row[0])
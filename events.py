@@ -0,0 +1,200 @@
+"""Change Notification Bus for the School Management System
+
+Writers publish typed change events (a student, instructor or course was added, a
+registration was created) and views subscribe to the event types they display, so a
+view applies the new rows instead of re-querying whole tables.
+
+Writes made by other processes (another copy of the application, server.py, ...) are
+picked up by DataVersionWatcher, which polls SQLite's `PRAGMA data_version` and, when
+it changes, reads only the rows past a per-table high-water mark.
+
+Classes:
+    ChangeEvent: Base class of every event; carries the row id and the row values.
+    StudentAdded, InstructorAdded, CourseAdded, RegistrationCreated: The typed events.
+    EventBus: Delivers published events to the subscribers of their type.
+    TableSpec: Describes how to read new rows of one table and which event they produce.
+    DataVersionWatcher: Detects commits from other connections and publishes their rows.
+"""
+
+
+class ChangeEvent:
+    """
+    A row was added to the database.
+
+    Args:
+        row_id (int): The SQLite rowid of the new row.
+        row (tuple): The row values, in the column order of the table's TableSpec.
+        external (bool): True if the row was written by another connection or process.
+    """
+    def __init__(self, row_id, row, external=False):
+        self.row_id = row_id
+        self.row = tuple(row)
+        self.external = external
+
+    def __repr__(self):
+        return f"{type(self).__name__}(row_id={self.row_id!r}, row={self.row!r}, external={self.external!r})"
+
+
+class StudentAdded(ChangeEvent):
+    pass
+
+
+class InstructorAdded(ChangeEvent):
+    pass
+
+
+class CourseAdded(ChangeEvent):
+    pass
+
+
+class RegistrationCreated(ChangeEvent):
+    pass
+
+
+class EventBus:
+    """
+    An in-process publish/subscribe bus.
+
+    Subscribers registered for a class also receive events of its subclasses, so
+    subscribing to ChangeEvent receives everything. Events can be staged while a
+    transaction is open and published with flush() once it commits, or dropped with
+    discard() if it rolls back.
+    """
+    def __init__(self):
+        self._subscribers = {}
+        self._staged = []
+
+    def subscribe(self, event_type, callback):
+        """
+        Registers `callback(event)` for events of `event_type`.
+
+        Returns:
+            function: A function that removes the subscription when called.
+        """
+        self._subscribers.setdefault(event_type, []).append(callback)
+
+        def unsubscribe():
+            callbacks = self._subscribers.get(event_type, [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+        return unsubscribe
+
+    def publish(self, event):
+        """Delivers the event to every subscriber of its type or one of its base classes."""
+        for event_type in type(event).__mro__:
+            for callback in list(self._subscribers.get(event_type, ())):
+                callback(event)
+
+    def stage(self, event):
+        """Holds the event until flush() is called."""
+        self._staged.append(event)
+
+    def flush(self):
+        """Publishes the staged events in the order they were staged."""
+        staged, self._staged = self._staged, []
+        for event in staged:
+            self.publish(event)
+
+    def discard(self):
+        """Drops the staged events without publishing them."""
+        self._staged = []
+
+
+class TableSpec:
+    """
+    Describes a watched table.
+
+    Args:
+        table (str): The table name.
+        columns (list of str): The columns placed in ChangeEvent.row, in order.
+        event_type (type): The ChangeEvent subclass published for new rows.
+        rowid (str): The column holding the row id ("rowid" if the table has no id column).
+    """
+    def __init__(self, table, columns, event_type, rowid="rowid"):
+        self.table = table
+        self.columns = columns
+        self.event_type = event_type
+        self.rowid = rowid
+
+    def select_after(self):
+        """Returns the query reading rows whose id is above a high-water mark, oldest first."""
+        return (f"SELECT {self.rowid}, {', '.join(self.columns)} FROM {self.table} "
+                f"WHERE {self.rowid} > ? ORDER BY {self.rowid}")
+
+
+class DataVersionWatcher:
+    """
+    Publishes rows committed by other connections.
+
+    `PRAGMA data_version` only changes when another connection commits, so a poll that
+    finds it unchanged costs a single pragma. When it has changed, each watched table is
+    read from its high-water mark onwards using the rowid index, so the cost of a poll
+    grows with the number of new rows rather than with the size of the tables. The
+    tables are append-only in both applications, which is what makes a high-water mark
+    sufficient.
+
+    Rows this process published itself are subscribed to and skipped, so subscribers
+    never see the same row twice.
+
+    Args:
+        connection (sqlite3.Connection): The connection to poll (normally the GUI's own).
+        bus (EventBus): The bus external events are published on.
+        specs (list of TableSpec): The tables to watch.
+    """
+    def __init__(self, connection, bus, specs):
+        self.connection = connection
+        self.bus = bus
+        self.specs = specs
+        self.marks = {}
+        self._published = {spec.event_type: set() for spec in specs}
+        for spec in specs:
+            row = connection.execute(f"SELECT MAX({spec.rowid}) FROM {spec.table}").fetchone()
+            self.marks[spec.table] = row[0] or 0
+            bus.subscribe(spec.event_type, self._remember)
+        self.data_version = self._read_data_version()
+
+    def _read_data_version(self):
+        return self.connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _remember(self, event):
+        if not event.external:
+            self._published[type(event)].add(event.row_id)
+
+    def poll(self):
+        """
+        Checks for commits made by other connections and publishes their new rows.
+
+        Returns:
+            int: The number of events published.
+        """
+        if self.connection.in_transaction:
+            return 0  # Our own write is in progress; look again on the next poll
+        version = self._read_data_version()
+        if version == self.data_version:
+            # Nobody else committed since the last poll, so every row above a mark is ours
+            for spec in self.specs:
+                own = self._published[spec.event_type]
+                if own:
+                    self.marks[spec.table] = max(self.marks[spec.table], max(own))
+                    own.clear()
+            return 0
+        self.data_version = version
+        published = 0
+        for spec in self.specs:
+            own = self._published[spec.event_type]
+            mark = self.marks[spec.table]
+            for row in self.connection.execute(spec.select_after(), (mark,)).fetchall():
+                mark = row[0]
+                if row[0] in own:
+                    continue
+                self.bus.publish(spec.event_type(row[0], row[1:], external=True))
+                published += 1
+            self.marks[spec.table] = mark
+            self._forget_below_mark(spec)
+        return published
+
+    def _forget_below_mark(self, spec):
+        own = self._published[spec.event_type]
+        if own:
+            mark = self.marks[spec.table]
+            own.difference_update([row_id for row_id in own if row_id <= mark])
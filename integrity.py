@@ -0,0 +1,335 @@
+import argparse
+import math
+import sqlite3
+import time
+
+import school_db
+
+"""Integrity Verifier and Repair Tool for the School Management System Database
+
+The Part3.py schema has no UNIQUE constraints and no enforced foreign keys, so nothing
+stops duplicate students, instructors, courses or registrations, registrations pointing
+at deleted rows, or courses naming an instructor that does not exist. This tool finds
+them with set-based SQL (GROUP BY and anti-joins answered from the existing indexes),
+never with a Python loop over rows, and can repair them in one transaction.
+
+Checks:
+    duplicate_students, duplicate_instructors: Rows sharing a unique_id (exact duplicates).
+    duplicate_courses: Rows sharing a course_id.
+    duplicate_registrations: The same student registered for the same course more than once.
+    orphan_registrations: Registrations whose student or course row does not exist.
+    non_integer_registrations: Registrations whose student_id or course_id is stored as
+        TEXT, REAL or BLOB (SQLite's typing is loose), so it can refer to no row.
+    dangling_instructors: Courses whose instructor_id matches no instructor.
+    same_email_students, same_email_instructors: Different people (unique_ids) with the
+        same email after trimming and lowercasing.
+    same_name_students, same_name_instructors: Different people with the same name after
+        trimming and lowercasing.
+
+Registrations are scanned in chunks of student and course id ranges along their indexes,
+so progress can be reported, and each distinct id is looked up once rather than once per
+registration.
+
+Repair merges duplicates into the row with the lowest id, rewriting the references to
+the removed rows (registrations for students and courses, courses.instructor_id for
+instructors), then deletes duplicate, orphan and non-integer registrations. Same-email
+and same-name groups are only merged on request (`merge_on`), since two people may
+share a name.
+Dangling instructor references are reported but not changed: there is no instructor to
+point them at.
+
+Functions:
+    verify(connection, samples, chunk_size, progress): Runs every check and returns the findings.
+    repair(connection, merge_on, chunk_size): Merges duplicates and removes orphans in one transaction.
+
+Usage:
+    python integrity.py --database school_management.db
+    python integrity.py --repair --merge-on email
+"""
+
+CHUNK_SIZE = 500000
+
+# Identity keys of the entities that can be merged; "email" and "name" are normalized
+NORMALIZED = {
+    "email": "lower(trim(email))",
+    "name": "lower(trim(name))",
+}
+
+
+class Finding:
+    """
+    The result of one check.
+
+    Args:
+        check (str): The name of the check.
+        count (int): The number of offending rows (or groups, for duplicate checks).
+        samples (list of tuple): Up to `samples` example rows.
+    """
+    def __init__(self, check, count, samples):
+        self.check = check
+        self.count = count
+        self.samples = samples
+
+    def __repr__(self):
+        return f"Finding({self.check!r}, count={self.count!r})"
+
+
+def _groups(cursor, query, samples):
+    # Materializes the groups once, so counting them and sampling them do not both sort the table
+    cursor.execute("DROP TABLE IF EXISTS temp.integrity_groups")
+    cursor.execute("CREATE TEMP TABLE integrity_groups AS " + query)
+    count = cursor.execute("SELECT COUNT(*) FROM temp.integrity_groups").fetchone()[0]
+    rows = cursor.execute("SELECT * FROM temp.integrity_groups LIMIT ?", (samples,)).fetchall()
+    cursor.execute("DROP TABLE temp.integrity_groups")
+    return count, rows
+
+
+def _duplicate_groups(cursor, table, key, samples, distinct=None):
+    # Groups of rows sharing `key`; with `distinct`, only groups where that column differs
+    having = f"COUNT(DISTINCT {distinct}) > 1" if distinct else "COUNT(*) > 1"
+    return _groups(cursor, f"""
+        SELECT {key} AS merge_key, COUNT(*) AS row_count, group_concat(id) AS ids FROM {table}
+        GROUP BY {key} HAVING {having}
+    """, samples)
+
+
+def _chunks(cursor, table, column, chunk_size):
+    # Integer ranges over the column's integer values; TEXT and BLOB sort after every number,
+    # and REAL values between the bounds are skipped by the typeof() filter of each chunk
+    # Separate queries: SQLite answers a lone MIN or MAX from one end of the index
+    bounds = (-2 ** 63, 2 ** 63 - 1)
+    low = cursor.execute(f"SELECT MIN({column}) FROM {table} WHERE {column} BETWEEN ? AND ?", bounds).fetchone()[0]
+    high = cursor.execute(f"SELECT MAX({column}) FROM {table} WHERE {column} BETWEEN ? AND ?", bounds).fetchone()[0]
+    if low is None:
+        return
+    low, high = math.floor(low), math.ceil(high)
+    for start in range(low, high + 1, chunk_size):
+        yield start, min(start + chunk_size - 1, high), high
+
+
+# Orphan registrations are found by key rather than by row: each chunk of distinct student
+# (or course) ids is read in order from its index and looked up once, and the ids with no
+# row go into a temp table the registrations are then selected (or deleted) by.
+ORPHAN_KEYS = [("student_id", "students", "orphan_students"), ("course_id", "courses", "orphan_courses")]
+ORPHAN_CONDITION = """
+    student_id IS NULL OR course_id IS NULL
+    OR student_id IN temp.orphan_students OR course_id IN temp.orphan_courses
+"""
+NON_INTEGER_CONDITION = """
+    typeof(student_id) IN ('text', 'real', 'blob') OR typeof(course_id) IN ('text', 'real', 'blob')
+"""
+
+
+def _find_orphan_keys(cursor, chunk_size, progress):
+    for column, table, orphans in ORPHAN_KEYS:
+        cursor.execute(f"DROP TABLE IF EXISTS temp.{orphans}")
+        cursor.execute(f"CREATE TEMP TABLE {orphans} (id INTEGER PRIMARY KEY)")
+        for start, end, high in _chunks(cursor, "registrations", column, chunk_size):
+            cursor.execute(f"""
+                INSERT INTO temp.{orphans} (id)
+                SELECT keys.{column} FROM (
+                    SELECT DISTINCT {column} FROM registrations
+                    WHERE {column} BETWEEN ? AND ? AND typeof({column}) = 'integer'
+                ) AS keys
+                WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {table}.id = keys.{column})
+            """, (start, end))
+            if progress is not None:
+                progress(f"orphan_registrations ({column})", end, high)
+
+
+def _drop_orphan_keys(cursor):
+    for _, _, orphans in ORPHAN_KEYS:
+        cursor.execute(f"DROP TABLE temp.{orphans}")
+
+
+def _orphan_registrations(cursor, samples, chunk_size, progress):
+    _find_orphan_keys(cursor, chunk_size, progress)
+    count = cursor.execute(f"SELECT COUNT(*) FROM registrations WHERE {ORPHAN_CONDITION}").fetchone()[0]
+    rows = cursor.execute(f"SELECT rowid, student_id, course_id FROM registrations WHERE {ORPHAN_CONDITION} LIMIT ?",
+                          (samples,)).fetchall()
+    _drop_orphan_keys(cursor)
+    return count, rows
+
+
+def verify(connection, samples=10, chunk_size=CHUNK_SIZE, progress=None):
+    """
+    Runs every integrity check.
+
+    Args:
+        connection (sqlite3.Connection): A connection to the School Management System database.
+        samples (int): The maximum number of example rows kept per check.
+        chunk_size (int): The width of the student and course id ranges scanned per statement.
+        progress (function): Called as progress(check, id, max_id) after each chunk.
+
+    Returns:
+        list of Finding: One finding per check, in the order listed in the module docstring.
+    """
+    cursor = connection.cursor()
+    # Only temp tables are written, but in the default sqlite3 mode their INSERTs open an
+    # implicit transaction; it is ended here so repair() can start its own afterwards
+    outside_transaction = not connection.in_transaction
+    try:
+        findings = []
+        for check, table, key in [("duplicate_students", "students", "unique_id"),
+                                  ("duplicate_instructors", "instructors", "unique_id"),
+                                  ("duplicate_courses", "courses", "course_id")]:
+            findings.append(Finding(check, *_duplicate_groups(cursor, table, key, samples)))
+
+        findings.append(Finding("duplicate_registrations", *_groups(cursor, """
+            SELECT student_id, course_id, COUNT(*) AS row_count FROM registrations
+            GROUP BY student_id, course_id HAVING COUNT(*) > 1
+        """, samples)))
+
+        findings.append(Finding("orphan_registrations", *_orphan_registrations(cursor, samples, chunk_size, progress)))
+        findings.append(Finding(
+            "non_integer_registrations",
+            cursor.execute(f"SELECT COUNT(*) FROM registrations WHERE {NON_INTEGER_CONDITION}").fetchone()[0],
+            cursor.execute(f"SELECT rowid, student_id, course_id FROM registrations WHERE {NON_INTEGER_CONDITION} LIMIT ?",
+                           (samples,)).fetchall()))
+
+        dangling = """
+            FROM courses WHERE NOT EXISTS (SELECT 1 FROM instructors WHERE instructors.unique_id = courses.instructor_id)
+        """
+        findings.append(Finding(
+            "dangling_instructors",
+            cursor.execute("SELECT COUNT(*) " + dangling).fetchone()[0],
+            cursor.execute("SELECT id, course_id, instructor_id " + dangling + " LIMIT ?", (samples,)).fetchall()))
+
+        for field in ("email", "name"):
+            for table in ("students", "instructors"):
+                findings.append(Finding(f"same_{field}_{table}",
+                                        *_duplicate_groups(cursor, table, NORMALIZED[field], samples, distinct="unique_id")))
+    finally:
+        if outside_transaction and connection.in_transaction:
+            connection.rollback()
+    return findings
+
+
+def _merge(cursor, table, key):
+    # temp.merge_map(old_id -> new_id) for every row of a duplicate group except the lowest id
+    cursor.execute("DROP TABLE IF EXISTS temp.merge_map")
+    cursor.execute("CREATE TEMP TABLE merge_map (old_id INTEGER PRIMARY KEY, new_id INTEGER NOT NULL)")
+    cursor.execute(f"""
+        INSERT INTO temp.merge_map (old_id, new_id)
+        SELECT {table}.id, keep.id FROM {table}
+        JOIN (SELECT {key} AS merge_key, MIN(id) AS id FROM {table} GROUP BY {key} HAVING COUNT(*) > 1) AS keep
+            ON {key} = keep.merge_key
+        WHERE {table}.id <> keep.id
+    """)
+
+    if table == "students":
+        cursor.execute("""
+            UPDATE registrations SET student_id = (SELECT new_id FROM temp.merge_map WHERE old_id = student_id)
+            WHERE student_id IN (SELECT old_id FROM temp.merge_map)
+        """)
+    elif table == "courses":
+        cursor.execute("""
+            UPDATE registrations SET course_id = (SELECT new_id FROM temp.merge_map WHERE old_id = course_id)
+            WHERE course_id IN (SELECT old_id FROM temp.merge_map)
+        """)
+    else:
+        # Courses refer to instructors by unique_id, which changes only when merging on email or name
+        cursor.execute("""
+            UPDATE courses SET instructor_id = (
+                SELECT keep.unique_id FROM temp.merge_map
+                JOIN instructors AS old ON old.id = merge_map.old_id
+                JOIN instructors AS keep ON keep.id = merge_map.new_id
+                WHERE old.unique_id = courses.instructor_id AND keep.unique_id <> old.unique_id
+                LIMIT 1)
+            WHERE instructor_id IN (
+                SELECT old.unique_id FROM temp.merge_map
+                JOIN instructors AS old ON old.id = merge_map.old_id
+                JOIN instructors AS keep ON keep.id = merge_map.new_id
+                WHERE keep.unique_id <> old.unique_id)
+        """)
+    merged = cursor.execute(f"DELETE FROM {table} WHERE id IN (SELECT old_id FROM temp.merge_map)").rowcount
+    cursor.execute("DROP TABLE temp.merge_map")
+    return merged
+
+
+def repair(connection, merge_on=(), chunk_size=CHUNK_SIZE):
+    """
+    Merges duplicates and removes duplicate and orphan registrations in one transaction.
+
+    Students and instructors are always merged on unique_id and courses on course_id;
+    `merge_on` adds normalized "email" and/or "name" as merge keys for students and
+    instructors. Either every change is committed or, on error, none is.
+
+    Args:
+        connection (sqlite3.Connection): A connection to the School Management System database.
+        merge_on (iterable of str): Additional merge keys, any of "email" and "name".
+        chunk_size (int): The width of the student and course id ranges scanned per statement.
+
+    Returns:
+        dict: The number of rows merged or deleted, by check name.
+
+    Raises:
+        ValueError: If `merge_on` contains an unknown key.
+    """
+    unknown = set(merge_on) - set(NORMALIZED)
+    if unknown:
+        raise ValueError(f"Cannot merge on {', '.join(sorted(unknown))}")
+    extra = [NORMALIZED[key] for key in merge_on]
+    cursor = connection.cursor()
+    counts = {}
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        # Keys are merged one after the other, each over the rows the previous one kept
+        counts["duplicate_students"] = sum(_merge(cursor, "students", key) for key in ["unique_id"] + extra)
+        counts["duplicate_instructors"] = sum(_merge(cursor, "instructors", key) for key in ["unique_id"] + extra)
+        counts["duplicate_courses"] = _merge(cursor, "courses", "course_id")
+
+        # Registrations are checked after the merges, which can create new duplicates
+        _find_orphan_keys(cursor, chunk_size, None)
+        counts["orphan_registrations"] = cursor.execute(
+            f"DELETE FROM registrations WHERE {ORPHAN_CONDITION}").rowcount
+        _drop_orphan_keys(cursor)
+        counts["non_integer_registrations"] = cursor.execute(
+            f"DELETE FROM registrations WHERE {NON_INTEGER_CONDITION}").rowcount
+        counts["duplicate_registrations"] = cursor.execute("""
+            DELETE FROM registrations WHERE rowid IN (
+                SELECT registrations.rowid FROM registrations
+                JOIN (SELECT student_id, course_id, MIN(rowid) AS keep FROM registrations
+                      GROUP BY student_id, course_id HAVING COUNT(*) > 1) AS duplicates
+                    USING (student_id, course_id)
+                WHERE registrations.rowid <> duplicates.keep)
+        """).rowcount
+        # Orphan registrations left enrollment counts behind for courses that do not exist
+        cursor.execute("""
+            DELETE FROM course_enrollment_counts
+            WHERE NOT EXISTS (SELECT 1 FROM courses WHERE courses.id = course_enrollment_counts.course_id)
+        """)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check (and repair) the School Management System database.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("--samples", type=int, default=5, help="Example rows shown per check")
+    parser.add_argument("--repair", action="store_true", help="Merge duplicates and delete orphan registrations")
+    parser.add_argument("--merge-on", nargs="*", default=[], choices=sorted(NORMALIZED),
+                        help="Also merge students and instructors with the same normalized email or name")
+    args = parser.parse_args()
+
+    connection = sqlite3.connect(args.database, isolation_level=None)
+    school_db.create_tables(connection.cursor())
+    start = time.perf_counter()
+    for finding in verify(connection, args.samples):
+        print(f"{finding.check:<26}{finding.count:>10}")
+        for row in finding.samples:
+            print(f"{'':<26}{row}")
+    print(f"Checked in {time.perf_counter() - start:.2f}s")
+    if args.repair:
+        start = time.perf_counter()
+        for check, count in repair(connection, args.merge_on).items():
+            print(f"{check:<26}{count:>10} removed")
+        print(f"Repaired in {time.perf_counter() - start:.2f}s")
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+"""Load Testing Script for server.py
+
+Opens a number of keep-alive connections to a running School Management HTTP service
+and issues requests as fast as the server answers them, then reports throughput and
+latency percentiles.
+
+Usage:
+    python server.py --port 8080 &
+    python load_test.py --port 8080 --connections 32 --duration 10 --write-ratio 0.1
+"""
+
+
+async def _request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: localhost\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(data)}\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + data)
+    await writer.drain()
+    status_line = await reader.readline()
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        key, _, value = line.decode("latin-1").partition(":")
+        if key.strip().lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+def _random_student():
+    student_id = f"{random.randrange(10 ** 9):09d}"
+    return {"name": f"Student {student_id}", "age": random.randint(17, 30),
+            "email": f"s{student_id}@aub.edu", "student_id": student_id}
+
+
+async def _client(host, port, deadline, write_ratio, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            if random.random() < write_ratio:
+                method, path, body = "POST", "/students", _random_student()
+            else:
+                method, path, body = "GET", "/students?limit=20", None
+            start = time.perf_counter()
+            status = await _request(reader, writer, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+def percentile(values, fraction):
+    """Returns the value at the given fraction (0-1) of the sorted values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run(host, port, connections, duration, write_ratio):
+    latencies = []
+    statuses = {}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client(host, port, deadline, write_ratio, latencies, statuses)
+                           for _ in range(connections)))
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the School Management HTTP service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.1,
+                        help="Fraction of requests that add a student instead of listing students")
+    args = parser.parse_args()
+
+    latencies, statuses, elapsed = asyncio.run(
+        run(args.host, args.port, args.connections, args.duration, args.write_ratio))
+    print(f"Requests:     {len(latencies)} in {elapsed:.2f}s")
+    print(f"Requests/sec: {len(latencies) / elapsed:.1f}")
+    print(f"p50 latency:  {percentile(latencies, 0.50) * 1000:.2f} ms")
+    print(f"p99 latency:  {percentile(latencies, 0.99) * 1000:.2f} ms")
+    print(f"Statuses:     {dict(sorted(statuses.items()))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+import weakref
+
+import concurrency
+import school_db
+from OOP import Student, Instructor, Course
+
+"""SQLite Persistence Mapper for the OOP.py Model
+
+Hydrates the Student, Instructor and Course classes of OOP.py from the School Management
+System database (the schema in school_db.py) on demand, so OOP-level logic can run on
+the database without loading all of it into Python first.
+
+- Identity map: each mapper returns at most one object per primary key, holding them
+  weakly, so an object lives only as long as the caller uses it.
+- Lazy relations: `registered_courses`, `enrolled_students` and `assigned_courses` are
+  loaded the first time they are read.
+- Batch loading: when one object's relation is loaded, the same relation is loaded for
+  every other object in the identity map still waiting for it (up to `batch_size`) with
+  one query, instead of one query per object.
+- Unit of work: new objects (add()), changed attributes and new registrations are
+  written by flush() in a single transaction.
+- Optimistic concurrency: every object remembers the `version` of its row when loaded,
+  and flush() writes changed objects with concurrency.update_row(), so a change made from
+  a stale copy raises concurrency.ConflictError instead of overwriting a change another
+  connection made meanwhile. refresh() reloads the object so the change can be redone.
+
+Objects are hydrated from their rows as stored, without the OOP.py validators: the Part3.py
+forms do not validate, so one row with, say, a malformed email must not make the whole
+table unreadable. New objects are still validated by their constructors.
+
+A course whose instructor row is missing (the forms do not check it) is hydrated with
+`instructor` None instead of making every relation that contains it unreadable.
+
+Student.registered_courses is the owning side of a registration: adding to it (as
+Student.register_course does) creates a registration, while Course.enrolled_students and
+Instructor.assigned_courses are only read.
+
+Classes:
+    SchoolMapper: The identity map, loader and unit of work.
+    MappedStudent, MappedInstructor, MappedCourse: The OOP classes with lazy relations and
+        change tracking; every object returned by a SchoolMapper is one of these.
+"""
+
+_NOT_LOADED = object()
+
+
+class _LazyRelation:
+    """A list attribute loaded by the object's mapper the first time it is read."""
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        value = obj.__dict__.get(self.name, _NOT_LOADED)
+        if value is _NOT_LOADED:
+            obj._mapper._load_relation(type(obj), self.name, obj)
+            value = obj.__dict__[self.name]
+        return value
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.name] = value
+
+
+class _TrackedList(list):
+    """
+    A relation list that reports added items to its mapper.
+
+    Every way of adding items (append, extend, insert, +=, slice assignment) is reported.
+    The unit of work never deletes registrations, so removing or replacing items raises
+    TypeError instead of changing the list without the change being flushed.
+    """
+    def __init__(self, items, owner, name):
+        super().__init__(items)
+        self._owner = owner
+        self._name = name
+
+    def _added(self, items):
+        for item in items:
+            self._owner._mapper._relation_added(self._owner, self._name, item)
+
+    def _removed(self):
+        raise TypeError(f"Items cannot be removed from {self._name}; registrations are only ever added")
+
+    def append(self, item):
+        super().append(item)
+        self._added([item])
+
+    def extend(self, items):
+        for item in items:
+            self.append(item)
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._added([item])
+
+    def __iadd__(self, items):
+        self.extend(items)
+        return self
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, slice):
+            self._removed()
+        value = list(value)
+        if self[index]:
+            self._removed()
+        super().__setitem__(index, value)
+        self._added(value)
+
+    def __delitem__(self, index):
+        self._removed()
+
+    def __imul__(self, count):
+        self._removed()
+
+    def remove(self, item):
+        self._removed()
+
+    def pop(self, index=-1):
+        self._removed()
+
+    def clear(self):
+        self._removed()
+
+
+class _Mapped:
+    """Mix-in recording changes to the persisted attributes of a hydrated object."""
+    _tracked = ()
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name in self._tracked and self.__dict__.get("_mapper") is not None:
+            self._mapper._dirty.add(self)
+
+
+class MappedStudent(_Mapped, Student):
+    _tracked = ("name", "age", "_Person__email", "student_id")
+    registered_courses = _LazyRelation()
+
+
+class MappedInstructor(_Mapped, Instructor):
+    _tracked = ("name", "age", "_Person__email", "instructor_id")
+    assigned_courses = _LazyRelation()
+
+
+class MappedCourse(_Mapped, Course):
+    _tracked = ("course_id", "course_name", "instructor")
+    enrolled_students = _LazyRelation()
+
+
+MAPPED_CLASSES = {Student: MappedStudent, Instructor: MappedInstructor, Course: MappedCourse}
+
+
+def _chunks(items, size):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _placeholders(count):
+    return ", ".join("?" for _ in range(count))
+
+
+def _instructor_id_of(course):
+    """The instructor ID to store for a course, keeping a dangling one if it has no instructor."""
+    if course.instructor is None:
+        return getattr(course, "_instructor_id", None)
+    return course.instructor.instructor_id
+
+
+class SchoolMapper:
+    """
+    Loads and saves OOP.py objects from a School Management System database.
+
+    Args:
+        connection (sqlite3.Connection): A connection to a database created by
+            school_db.create_tables().
+        batch_size (int): Maximum number of objects whose relation is loaded by one query.
+    """
+    def __init__(self, connection, batch_size=500):
+        self.connection = connection
+        self.batch_size = batch_size
+        # Primary key -> object, per class; entries disappear with their objects
+        self._identity = {cls: weakref.WeakValueDictionary() for cls in MAPPED_CLASSES.values()}
+        # Objects whose relation has not been loaded yet, per (class, relation)
+        self._unloaded = {
+            (MappedStudent, "registered_courses"): weakref.WeakSet(),
+            (MappedCourse, "enrolled_students"): weakref.WeakSet(),
+            (MappedInstructor, "assigned_courses"): weakref.WeakSet(),
+        }
+        self._dirty = set()
+        self._new = []
+        self._new_registrations = []
+
+    # Loading
+
+    def get_student(self, student_id):
+        """Returns the student with the given 9-digit ID, or None."""
+        return self.get_students([student_id]).get(student_id)
+
+    def get_instructor(self, instructor_id):
+        """Returns the instructor with the given 4-digit ID, or None."""
+        return self.get_instructors([instructor_id]).get(instructor_id)
+
+    def get_course(self, course_id):
+        """Returns the course with the given course ID, or None."""
+        return self.get_courses([course_id]).get(course_id)
+
+    def get_students(self, student_ids):
+        """Returns {student ID: student} for the given IDs that exist, using one query per batch."""
+        return self._get_by_key(MappedStudent, "students", student_ids)
+
+    def get_instructors(self, instructor_ids):
+        """Returns {instructor ID: instructor} for the given IDs that exist."""
+        return self._get_by_key(MappedInstructor, "instructors", instructor_ids)
+
+    def get_courses(self, course_ids):
+        """Returns {course ID: course} for the given IDs that exist."""
+        return self._get_by_key(MappedCourse, "courses", course_ids)
+
+    def iter_students(self, batch_size=None):
+        """
+        Yields every student, reading them from the database one batch at a time.
+
+        Only the current batch is held by the mapper, so iterating over a large table
+        needs memory for one batch (plus whatever the caller keeps).
+        """
+        batch_size = batch_size or self.batch_size
+        after = 0
+        while True:
+            rows = self.connection.execute(
+                "SELECT id, name, age, email, unique_id, version FROM students WHERE id > ? ORDER BY id LIMIT ?",
+                (after, batch_size)).fetchall()
+            if not rows:
+                return
+            students = [self._hydrate_student(row) for row in rows]
+            yield from students
+            after = rows[-1][0]
+
+    def _get_by_key(self, cls, table, keys):
+        key_column = "course_id" if cls is MappedCourse else "unique_id"
+        found = {}
+        for chunk in _chunks(dict.fromkeys(keys), self.batch_size):
+            if cls is MappedCourse:
+                rows = self.connection.execute(
+                    f"SELECT id, course_id, course_name, instructor_id, version FROM courses "
+                    f"WHERE course_id IN ({_placeholders(len(chunk))})", chunk).fetchall()
+                for obj in self._hydrate_courses(rows):
+                    found[obj.course_id] = obj
+            else:
+                rows = self.connection.execute(
+                    f"SELECT id, name, age, email, unique_id, version FROM {table} "
+                    f"WHERE {key_column} IN ({_placeholders(len(chunk))})", chunk).fetchall()
+                hydrate = self._hydrate_student if cls is MappedStudent else self._hydrate_instructor
+                for row in rows:
+                    obj = hydrate(row)
+                    found[row[4]] = obj
+        return found
+
+    def _hydrate(self, cls, row_id, version, *args):
+        existing = self._identity[cls].get(row_id)
+        if existing is not None:
+            return existing
+        obj = cls.__new__(cls)
+        # The constructor's arguments are the tracked attributes; set before tracking starts
+        obj.__dict__.update(zip(cls._tracked, args))
+        for (owner, relation), waiting in self._unloaded.items():
+            if owner is cls:
+                waiting.add(obj)
+        obj._row_id = row_id
+        obj._version = version
+        obj._mapper = self
+        self._identity[cls][row_id] = obj
+        return obj
+
+    def _hydrate_student(self, row):
+        row_id, name, age, email, unique_id, version = row
+        return self._hydrate(MappedStudent, row_id, version, name, age, email, unique_id)
+
+    def _hydrate_instructor(self, row):
+        row_id, name, age, email, unique_id, version = row
+        return self._hydrate(MappedInstructor, row_id, version, name, age, email, unique_id)
+
+    def _hydrate_courses(self, rows):
+        """Hydrates course rows, loading all of their instructors with one query per batch."""
+        missing = [row for row in rows if row[0] not in self._identity[MappedCourse]]
+        instructors = self.get_instructors({row[3] for row in missing}) if missing else {}
+        courses = []
+        for row_id, course_id, course_name, instructor_id, version in rows:
+            existing = self._identity[MappedCourse].get(row_id)
+            if existing is not None:
+                courses.append(existing)
+                continue
+            # A course whose instructor row is missing is hydrated with instructor None
+            course = self._hydrate(MappedCourse, row_id, version, course_id, course_name, instructors.get(instructor_id))
+            course._instructor_id = instructor_id
+            courses.append(course)
+        return courses
+
+    def _load_relation(self, cls, relation, obj):
+        """Loads `relation` for `obj` and for other objects waiting for it, in one query."""
+        waiting = self._unloaded[(cls, relation)]
+        batch = [obj]
+        for other in list(waiting):
+            if len(batch) >= self.batch_size:
+                break
+            if other is not obj:
+                batch.append(other)
+        by_row_id = {member._row_id: member for member in batch}
+        loaded = {row_id: [] for row_id in by_row_id}
+        params = list(by_row_id)
+
+        if relation == "registered_courses":
+            rows = self.connection.execute(f"""
+                SELECT registrations.student_id, courses.id, courses.course_id, courses.course_name, courses.instructor_id,
+                       courses.version
+                FROM registrations JOIN courses ON courses.id = registrations.course_id
+                WHERE registrations.student_id IN ({_placeholders(len(params))})
+                ORDER BY registrations.rowid
+            """, params).fetchall()
+            courses = self._hydrate_courses([row[1:] for row in rows])
+            for row, course in zip(rows, courses):
+                loaded[row[0]].append(course)
+        elif relation == "enrolled_students":
+            rows = self.connection.execute(f"""
+                SELECT registrations.course_id, students.id, students.name, students.age, students.email, students.unique_id,
+                       students.version
+                FROM registrations JOIN students ON students.id = registrations.student_id
+                WHERE registrations.course_id IN ({_placeholders(len(params))})
+                ORDER BY registrations.rowid
+            """, params).fetchall()
+            for row in rows:
+                loaded[row[0]].append(self._hydrate_student(row[1:]))
+        else:
+            # instructor_id is not unique (see integrity.py): every instructor sharing it gets the courses
+            by_unique_id = {}
+            for member in batch:
+                by_unique_id.setdefault(member.instructor_id, []).append(member._row_id)
+            rows = self.connection.execute(f"""
+                SELECT id, course_id, course_name, instructor_id, version FROM courses
+                WHERE instructor_id IN ({_placeholders(len(by_unique_id))}) ORDER BY id
+            """, list(by_unique_id)).fetchall()
+            for row, course in zip(rows, self._hydrate_courses(rows)):
+                for row_id in by_unique_id[row[3]]:
+                    loaded[row_id].append(course)
+
+        for row_id, member in by_row_id.items():
+            waiting.discard(member)
+            member.__dict__[relation] = _TrackedList(loaded[row_id], member, relation)
+
+    # Changes
+
+    def refresh(self, obj):
+        """
+        Reloads the attributes and version of a stored object from its row, dropping its
+        unsaved changes; used after flush() raised concurrency.ConflictError for it.
+
+        Raises:
+            LookupError: If the row was deleted.
+        """
+        if isinstance(obj, Course):
+            row = self.connection.execute(
+                "SELECT course_id, course_name, instructor_id, version FROM courses WHERE id = ?", (obj._row_id,)).fetchone()
+            values = row and (row[0], row[1], self.get_instructor(row[2]), row[3])
+            if row:
+                obj._instructor_id = row[2]
+        else:
+            table = "students" if isinstance(obj, Student) else "instructors"
+            values = self.connection.execute(
+                f"SELECT name, age, email, unique_id, version FROM {table} WHERE id = ?", (obj._row_id,)).fetchone()
+        if values is None:
+            raise LookupError(f"{obj!r} was deleted from the database")
+        obj.__dict__.update(zip(obj._tracked, values[:-1]))
+        obj._version = values[-1]
+        self._dirty.discard(obj)
+
+    def _relation_added(self, owner, relation, item):
+        if relation == "registered_courses":
+            self._new_registrations.append((owner, item))
+
+    def add(self, obj):
+        """
+        Schedules a new Student, Instructor or Course to be inserted by the next flush().
+
+        Courses registered by a new student are registered too; any instructor or course
+        they refer to must already be stored or be added as well.
+        """
+        if getattr(obj, "_mapper", None) is not None:
+            raise ValueError("Object is already stored")
+        if type(obj) not in MAPPED_CLASSES:
+            raise ValueError("Only Student, Instructor and Course objects can be added")
+        if not any(obj is new for new in self._new):
+            self._new.append(obj)
+
+    def flush(self):
+        """
+        Writes new objects, changed attributes and new registrations in one transaction.
+
+        The transaction is explicit (concurrency.run_transaction), so it is atomic on
+        autocommit connections such as the ones concurrency.connect() opens, and is retried
+        while another connection holds the write lock.
+
+        Raises:
+            concurrency.ConflictError: If the row of a changed object was updated or deleted
+                by another connection since the object was loaded; refresh() the object and
+                make the change again.
+            sqlite3.Error: If the transaction fails.
+
+            Either way the transaction is rolled back and the pending changes are kept, so
+            flush() can be retried.
+        """
+        new = sorted(self._new, key=lambda obj: [Instructor, Course, Student].index(type(obj)))
+
+        def write(cursor):
+            registrations = list(self._new_registrations)
+            inserted = []
+            for obj in new:
+                if isinstance(obj, Student):
+                    row_id = school_db.add_student(cursor, obj.name, obj.age, obj._Person__email, obj.student_id)
+                    registrations.extend((obj, course) for course in obj.registered_courses)
+                elif isinstance(obj, Instructor):
+                    row_id = school_db.add_instructor(cursor, obj.name, obj.age, obj._Person__email, obj.instructor_id)
+                else:
+                    row_id = school_db.add_course(cursor, obj.course_id, obj.course_name, obj.instructor.instructor_id)
+                inserted.append((obj, row_id))
+            row_ids = {id(obj): row_id for obj, row_id in inserted}
+
+            def row_id_of(obj):
+                if id(obj) in row_ids:
+                    return row_ids[id(obj)]
+                if getattr(obj, "_mapper", None) is self:
+                    return obj._row_id
+                raise ValueError(f"{obj!r} is not stored; add() it before flushing")
+
+            versions = []
+            for obj in self._dirty:
+                if isinstance(obj, Course):
+                    table, changes = "courses", {"course_id": obj.course_id, "course_name": obj.course_name,
+                                                 "instructor_id": _instructor_id_of(obj)}
+                else:
+                    table, unique_id = ("students", obj.student_id) if isinstance(obj, Student) else ("instructors", obj.instructor_id)
+                    changes = {"name": obj.name, "age": obj.age, "email": obj._Person__email, "unique_id": unique_id}
+                versions.append((obj, concurrency.update_row(cursor, table, "id", obj._row_id, obj._version, changes)))
+            cursor.executemany("INSERT INTO registrations (student_id, course_id) VALUES (?, ?)",
+                               [(row_id_of(student), row_id_of(course)) for student, course in registrations])
+            return inserted, versions
+
+        inserted, versions = concurrency.run_transaction(self.connection, write)
+
+        # Committed: the new objects become mapped objects tracked like loaded ones
+        for obj, row_id in inserted:
+            self._adopt(obj, row_id)
+        for obj, version in versions:
+            obj._version = version
+        self._new = []
+        self._dirty = set()
+        self._new_registrations = []
+
+    def _adopt(self, obj, row_id):
+        cls = MAPPED_CLASSES[type(obj)]
+        relation = next(name for owner, name in self._unloaded if owner is cls)
+        items = obj.__dict__.pop(relation)
+        obj.__class__ = cls
+        obj._row_id = row_id
+        obj._version = 0  # The column's default
+        obj._mapper = self
+        obj.__dict__[relation] = _TrackedList(items, obj, relation)
+        self._identity[cls][row_id] = obj
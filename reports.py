@@ -0,0 +1,263 @@
+import argparse
+import csv
+import html
+import json
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import school_db
+
+"""Parallel Roster Report Generation
+
+Writes one roster report per course (the students enrolled in it) and one per instructor
+(each of their courses with its students), as CSV and/or HTML, for the School Management
+System database.
+
+The parent process only reads course and instructor ids and splits them into batches.
+A pool of worker processes does the rest: each opens its own read-only connection,
+streams the rows of every report in its batch through indexed joins (registrations by
+course, students by id, courses by instructor) straight into the report files, and
+returns what it wrote. Nothing holds more than one row of a report in memory, and the
+throughput grows with the number of workers.
+
+Reports are written under a temporary name and renamed when complete, and each finished
+batch is appended to `manifest.jsonl` in the output directory, so a run that is
+interrupted picks up where it stopped when started again; pass `restart=True` to write
+every report again.
+
+Functions:
+    generate_reports(database, directory, formats, kinds, workers, batch_size, restart, progress):
+        Writes the reports and returns a summary.
+
+Usage:
+    python reports.py --output reports --formats csv html --workers 8
+"""
+
+FORMATS = ("csv", "html")
+KINDS = ("course", "instructor")
+MANIFEST = "manifest.jsonl"
+
+COURSE_HEADERS = ["Student ID", "Name", "Age", "Email"]
+INSTRUCTOR_HEADERS = ["Course ID", "Course Name", "Student ID", "Name", "Age", "Email"]
+
+_connection = None
+
+
+def _init_worker(database):
+    global _connection
+    _connection = sqlite3.connect(f"file:{os.path.abspath(database)}?mode=ro", uri=True)
+    _connection.execute("PRAGMA query_only = 1")
+
+
+def _file_name(*parts):
+    return "_".join(re.sub(r"[^A-Za-z0-9.-]+", "-", str(part)) for part in parts)
+
+
+class _CsvReport:
+    def __init__(self, file, title, headers):
+        self.writer = csv.writer(file)
+        self.writer.writerow(headers)
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+    def close(self):
+        pass
+
+
+class _HtmlReport:
+    def __init__(self, file, title, headers):
+        self.file = file
+        file.write(f"<!DOCTYPE html>\n<html>\n<head><meta charset=\"utf-8\"><title>{html.escape(title)}</title></head>\n"
+                   f"<body>\n<h1>{html.escape(title)}</h1>\n<table>\n<tr>"
+                   + "".join(f"<th>{html.escape(header)}</th>" for header in headers) + "</tr>\n")
+
+    def write(self, row):
+        self.file.write("<tr>" + "".join(f"<td>{html.escape(str(value))}</td>" for value in row) + "</tr>\n")
+
+    def close(self):
+        self.file.write("</table>\n</body>\n</html>\n")
+
+
+REPORT_WRITERS = {"csv": _CsvReport, "html": _HtmlReport}
+
+
+def _write_report(directory, name, title, headers, rows, formats):
+    # Every format is written in the same pass over the rows
+    paths = [os.path.join(directory, f"{name}.{extension}") for extension in formats]
+    files = [open(path + ".part", "w", newline="" if extension == "csv" else None, encoding="utf-8")
+             for path, extension in zip(paths, formats)]
+    count = 0
+    try:
+        reports = [REPORT_WRITERS[extension](file, title, headers) for file, extension in zip(files, formats)]
+        for row in rows:
+            for report in reports:
+                report.write(row)
+            count += 1
+        for report in reports:
+            report.close()
+    finally:
+        for file in files:
+            file.close()
+    for path in paths:
+        os.replace(path + ".part", path)
+    return paths, count
+
+
+def _course_report(directory, row_id, formats):
+    course = _connection.execute("""
+        SELECT courses.course_id, courses.course_name, instructors.name FROM courses
+        LEFT JOIN instructors ON instructors.unique_id = courses.instructor_id
+        WHERE courses.id = ?
+    """, (row_id,)).fetchone()
+    if course is None:
+        return [], 0
+    course_id, course_name, instructor = course
+    rows = _connection.execute("""
+        SELECT students.unique_id, students.name, students.age, students.email
+        FROM registrations JOIN students ON students.id = registrations.student_id
+        WHERE registrations.course_id = ?
+        ORDER BY students.name, students.id
+    """, (row_id,))
+    title = f"{course_id} {course_name} ({instructor or 'no instructor'})"
+    return _write_report(os.path.join(directory, "courses"), _file_name(row_id, course_id),
+                         title, COURSE_HEADERS, rows, formats)
+
+
+def _instructor_report(directory, row_id, formats):
+    instructor = _connection.execute("SELECT unique_id, name FROM instructors WHERE id = ?", (row_id,)).fetchone()
+    if instructor is None:
+        return [], 0
+    unique_id, name = instructor
+    rows = _connection.execute("""
+        SELECT courses.course_id, courses.course_name, students.unique_id, students.name, students.age, students.email
+        FROM courses
+        JOIN registrations ON registrations.course_id = courses.id
+        JOIN students ON students.id = registrations.student_id
+        WHERE courses.instructor_id = ?
+        ORDER BY courses.course_id, courses.id, students.name, students.id
+    """, (unique_id,))
+    return _write_report(os.path.join(directory, "instructors"), _file_name(row_id, unique_id),
+                         f"{name} ({unique_id})", INSTRUCTOR_HEADERS, rows, formats)
+
+
+REPORTS = {"course": _course_report, "instructor": _instructor_report}
+
+
+def _run_batch(directory, kind, row_ids, formats):
+    files = []
+    rows = 0
+    for row_id in row_ids:
+        paths, count = REPORTS[kind](directory, row_id, formats)
+        files.extend(os.path.relpath(path, directory) for path in paths)
+        rows += count
+    return {"kind": kind, "ids": row_ids, "formats": list(formats), "files": files, "rows": rows}
+
+
+def _completed(directory, formats):
+    # (kind, id) pairs whose reports in every requested format are recorded in the manifest
+    done = set()
+    path = os.path.join(directory, MANIFEST)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as manifest:
+            for line in manifest:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # A line cut short by an interruption
+                if set(formats) <= set(entry["formats"]):
+                    done.update((entry["kind"], row_id) for row_id in entry["ids"])
+    return done
+
+
+def generate_reports(database=school_db.DATABASE_FILE, directory="reports", formats=FORMATS, kinds=KINDS,
+                     workers=None, batch_size=50, restart=False, progress=None):
+    """
+    Writes the roster reports with a pool of worker processes.
+
+    Args:
+        database (str): Path to the School Management System database.
+        directory (str): The output directory; reports go to its 'courses' and
+            'instructors' subdirectories.
+        formats (iterable of str): Any of "csv" and "html".
+        kinds (iterable of str): Any of "course" and "instructor".
+        workers (int): The number of worker processes; defaults to the number of CPUs.
+        batch_size (int): The number of reports handed to a worker at a time.
+        restart (bool): Ignore the manifest of a previous run and write every report.
+        progress (function): Called as progress(done, total) as reports complete.
+
+    Returns:
+        dict: The numbers of reports written, reports skipped as already done, files and
+        rows written, and the elapsed time in seconds.
+
+    Raises:
+        ValueError: If a format or kind is not supported.
+    """
+    formats = list(formats)
+    kinds = list(kinds)
+    unknown = (set(formats) - set(FORMATS)) | (set(kinds) - set(KINDS))
+    if unknown:
+        raise ValueError(f"Unsupported report format or kind: {', '.join(sorted(unknown))}")
+    start = time.perf_counter()
+    for kind in kinds:
+        os.makedirs(os.path.join(directory, kind + "s"), exist_ok=True)
+    manifest_path = os.path.join(directory, MANIFEST)
+    if restart and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    done = _completed(directory, formats)
+
+    connection = sqlite3.connect(f"file:{os.path.abspath(database)}?mode=ro", uri=True)
+    batches = []
+    skipped = 0
+    for kind in kinds:
+        table = "courses" if kind == "course" else "instructors"
+        pending = []
+        for (row_id,) in connection.execute(f"SELECT id FROM {table} ORDER BY id"):
+            if (kind, row_id) in done:
+                skipped += 1
+            else:
+                pending.append(row_id)
+        batches.extend((kind, pending[index:index + batch_size]) for index in range(0, len(pending), batch_size))
+    connection.close()
+
+    total = sum(len(row_ids) for _, row_ids in batches)
+    summary = {"reports": 0, "skipped": skipped, "files": 0, "rows": 0}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(database,)) as pool, \
+            open(manifest_path, "a", encoding="utf-8") as manifest:
+        futures = [pool.submit(_run_batch, directory, kind, row_ids, formats) for kind, row_ids in batches]
+        for future in as_completed(futures):
+            entry = future.result()
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            summary["reports"] += len(entry["ids"])
+            summary["files"] += len(entry["files"])
+            summary["rows"] += entry["rows"]
+            if progress is not None:
+                progress(summary["reports"], total)
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write roster reports per course and per instructor.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("--output", default="reports")
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS), choices=FORMATS)
+    parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--restart", action="store_true", help="Ignore the manifest and write every report")
+    args = parser.parse_args()
+
+    summary = generate_reports(args.database, args.output, args.formats, args.kinds, args.workers,
+                               args.batch_size, args.restart,
+                               progress=lambda done, total: print(f"\r{done}/{total} reports", end="", flush=True))
+    print(f"\n{summary['reports']} reports ({summary['files']} files, {summary['rows']} rows) written in "
+          f"{summary['seconds']:.1f}s; {summary['skipped']} already done")
+
+
+if __name__ == "__main__":
+    main()
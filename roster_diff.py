@@ -0,0 +1,512 @@
+import argparse
+import json
+import os
+import pickle
+import re
+import sqlite3
+import tempfile
+import zlib
+from collections import defaultdict
+
+from OOP import COMPRESSION_MODULES, open_saved_file, save_entries_to_file
+
+"""Streaming Diff and Patch of Roster Snapshots
+
+Compares two roster snapshots, each either a file written by OOP.save_to_file (in any
+layout or compression) or a School Management System SQLite database, and writes the
+differences as a change set that apply_patch turns the old snapshot into the new one with.
+
+Both snapshots are read one entity at a time and hash-partitioned by entity ID into
+temporary spill files. Each partition of the old snapshot is then loaded into memory on
+its own and the matching partition of the new snapshot is streamed against it, so memory
+is bounded by the size of one partition, not of the roster: raise `partitions` for
+rosters larger than memory.
+
+The change set is a file of JSON lines, one operation per line:
+    {"op": "add", "type": "Student", "id": "...", "entry": {...}}
+    {"op": "remove", "type": "Student", "id": "...", "entry": {...}}
+    {"op": "modify", "type": "Student", "id": "...", "fields": {...}, "old": {...}}
+    {"op": "enroll", "student": "...", "course": "..."}
+    {"op": "unenroll", "student": "...", "course": "..."}
+
+`type` is "Instructor", "Course" or "Student" and `id` its InstructorID, CourseID or
+StudentID. Entries hold the entity fields without the relation lists ("Assigned Courses",
+"Enrolled Students", "Registered Courses"): enrollments are the (student, course) edges of
+the enroll/unenroll operations, and course assignments follow from a course's InstructorID.
+Removals and modifications carry the old values, so a change set can be checked against
+(or reversed from) the snapshot it applies to.
+
+Functions:
+    iter_roster(fileName): Yields the (section, entry) pairs of a saved roster file.
+    iter_database(database): Yields the (section, entry) pairs of a SQLite database.
+    iter_snapshot(path): Dispatches to iter_roster or iter_database.
+    diff_rosters(old, new, patch_file, partitions, compression): Writes the change set.
+    read_patch(patch_file): Yields the operations of a change set.
+    apply_patch(source, patch_file, fileName, compact, compression): Writes a patched roster file.
+    apply_patch_to_database(connection, patch_file): Applies a change set to a SQLite database.
+"""
+
+# Section of the saved file -> (entity type, ID field, relation list field)
+SECTIONS = {
+    "Instructor": ("Instructor", "InstructorID", "Assigned Courses"),
+    "Courses": ("Course", "CourseID", "Enrolled Students"),
+    "Students": ("Student", "StudentID", "Registered Courses"),
+}
+TYPES = {entity_type: section for section, (entity_type, _, _) in SECTIONS.items()}
+
+PARTITIONS = 64
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+_DECODER = json.JSONDecoder()
+_NON_SPACE = re.compile(r"\S")
+
+
+class _Reader:
+    """Reads JSON values one at a time from a text file without loading all of it."""
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+
+    def _fill(self):
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it ("" at the end)."""
+        while True:
+            match = _NON_SPACE.search(self.buffer, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buffer[self.pos]
+            self.pos = len(self.buffer)
+            if not self._fill():
+                return ""
+
+    def take(self, expected):
+        """Consumes the next non-whitespace character, which must be one of `expected`."""
+        char = self.peek()
+        if not char or char not in expected:
+            raise ValueError(f"Malformed roster file: expected one of {expected!r}, found {char!r}")
+        self.pos += 1
+        return char
+
+    def value(self):
+        """Decodes the next JSON value, reading more of the file while it is incomplete."""
+        self.peek()
+        while True:
+            try:
+                value, self.pos = _DECODER.raw_decode(self.buffer, self.pos)
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+
+def iter_roster(fileName, chunk_size=1 << 20):
+    """
+    Yields the entities of a file written by save_to_file, one at a time.
+
+    Args:
+        fileName (str): The roster file (plain or compressed).
+        chunk_size (int): The number of characters read from the file at a time.
+
+    Yields:
+        tuple: (section, entry), where section is "Instructor", "Courses" or "Students"
+        and entry the entity's dictionary.
+    """
+    with open_saved_file(fileName) as file:
+        reader = _Reader(file, chunk_size)
+        reader.take("{")
+        if reader.peek() == "}":
+            return
+        while True:
+            section = reader.value()
+            reader.take(":")
+            reader.take("[")
+            if reader.peek() == "]":
+                reader.take("]")
+            else:
+                while True:
+                    yield section, reader.value()
+                    if reader.take(",]") == "]":
+                        break
+            if reader.take(",}") == "}":
+                return
+
+
+def iter_database(database):
+    """
+    Yields the entities of a School Management System database (Part3.py schema) in the
+    form iter_roster yields them.
+
+    Rows are streamed from the database; registrations are read in student order from
+    their index and merged with the students. Registrations whose student or course row
+    does not exist (including a NULL student_id) are skipped.
+
+    Args:
+        database (str): Path to the SQLite database, opened read-only.
+    """
+    connection = sqlite3.connect(f"file:{os.path.abspath(database)}?mode=ro", uri=True)
+    try:
+        for name, age, email, unique_id in connection.execute(
+                "SELECT name, age, email, unique_id FROM instructors ORDER BY id"):
+            yield "Instructor", {"Name": name, "Age": age, "Email": email, "InstructorID": unique_id,
+                                 "Assigned Courses": []}
+        for course_id, course_name, instructor_id in connection.execute(
+                "SELECT course_id, course_name, instructor_id FROM courses ORDER BY id"):
+            yield "Courses", {"CourseID": course_id, "Course Name": course_name, "InstructorID": instructor_id,
+                              "Enrolled Students": []}
+        registrations = connection.execute("""
+            SELECT registrations.student_id, courses.course_id FROM registrations
+            JOIN courses ON courses.id = registrations.course_id
+            WHERE registrations.student_id IN (SELECT id FROM students)
+            ORDER BY registrations.student_id
+        """)
+        pending = next(registrations, None)
+        for row_id, name, age, email, unique_id in connection.execute(
+                "SELECT id, name, age, email, unique_id FROM students ORDER BY id"):
+            while pending is not None and pending[0] < row_id:
+                pending = next(registrations, None)
+            courses = []
+            while pending is not None and pending[0] == row_id:
+                courses.append(pending[1])
+                pending = next(registrations, None)
+            yield "Students", {"Name": name, "Age": age, "Email": email, "StudentID": unique_id,
+                               "Registered Courses": courses}
+    finally:
+        connection.close()
+
+
+def iter_snapshot(path):
+    """Yields the entities of a roster file or, if `path` is a SQLite database, of the database."""
+    with open(path, "rb") as file:
+        header = file.read(len(SQLITE_HEADER))
+    return iter_database(path) if header == SQLITE_HEADER else iter_roster(path)
+
+
+def _partition(key, partitions):
+    return zlib.crc32(key.encode("utf-8")) % partitions
+
+
+def _spill(snapshot, directory, prefix, partitions):
+    # Writes each entity to its partition's file as a pickled record (section, id, fields, relations)
+    files = [open(os.path.join(directory, f"{prefix}{index}"), "wb") for index in range(partitions)]
+    picklers = [pickle.Pickler(file, pickle.HIGHEST_PROTOCOL) for file in files]
+    for pickler in picklers:
+        pickler.fast = True  # No memo: records are independent, and a memo would keep every one alive
+    try:
+        for section, entry in iter_snapshot(snapshot):
+            if section not in SECTIONS:
+                raise ValueError(f"Unknown roster section: {section}")
+            _, id_field, relation = SECTIONS[section]
+            fields = dict(entry)
+            related = fields.pop(relation, [])
+            key = str(fields[id_field])
+            picklers[_partition(key, partitions)].dump((section, key, fields, related))
+    finally:
+        for file in files:
+            file.close()
+
+
+def _records(path):
+    with open(path, "rb") as file:
+        unpickler = pickle.Unpickler(file)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
+
+
+def _encode(operation):
+    return json.dumps(operation, separators=(",", ":")) + "\n"
+
+
+def diff_rosters(old, new, patch_file, partitions=PARTITIONS, compression=None):
+    """
+    Compares two roster snapshots and writes the change set turning `old` into `new`.
+
+    Args:
+        old (str): The older snapshot: a saved roster file or a SQLite database.
+        new (str): The newer snapshot, in either form.
+        patch_file (str): Where the change set is written.
+        partitions (int): The number of hash partitions; each holds about 1/partitions of
+            the old snapshot in memory at a time.
+        compression (str): None, "gzip", "bz2" or "lzma" for the change set file.
+
+    Returns:
+        dict: The number of operations written, by operation name.
+
+    Raises:
+        ValueError: If the compression is not supported or a snapshot is malformed.
+    """
+    if compression is not None and compression not in COMPRESSION_MODULES:
+        raise ValueError(f"Unsupported compression: {compression}")
+    counts = defaultdict(int)
+    with tempfile.TemporaryDirectory(prefix="roster_diff_") as directory:
+        _spill(old, directory, "old", partitions)
+        _spill(new, directory, "new", partitions)
+        opener = open if compression is None else COMPRESSION_MODULES[compression].open
+        with opener(patch_file, "wt", encoding="utf-8") as output:
+            for index in range(partitions):
+                previous = {(section, key): (fields, related)
+                            for section, key, fields, related in _records(os.path.join(directory, f"old{index}"))}
+                for section, key, fields, related in _records(os.path.join(directory, f"new{index}")):
+                    entity_type = SECTIONS[section][0]
+                    before = previous.pop((section, key), None)
+                    if before is None:
+                        output.write(_encode({"op": "add", "type": entity_type, "id": key, "entry": fields}))
+                        counts["add"] += 1
+                        old_fields, old_related = None, []
+                    else:
+                        old_fields, old_related = before
+                        if old_fields != fields:
+                            changed = {name: value for name, value in fields.items() if old_fields.get(name) != value}
+                            output.write(_encode({"op": "modify", "type": entity_type, "id": key, "fields": changed,
+                                                  "old": {name: old_fields.get(name) for name in changed}}))
+                            counts["modify"] += 1
+                    if section == "Students" and old_related != related:
+                        old_set, new_set = set(old_related), set(related)
+                        for course in related:
+                            if course not in old_set:
+                                output.write(_encode({"op": "enroll", "student": key, "course": course}))
+                                counts["enroll"] += 1
+                        for course in old_related:
+                            if course not in new_set:
+                                output.write(_encode({"op": "unenroll", "student": key, "course": course}))
+                                counts["unenroll"] += 1
+                for (section, key), (fields, related) in previous.items():
+                    output.write(_encode({"op": "remove", "type": SECTIONS[section][0], "id": key, "entry": fields}))
+                    counts["remove"] += 1
+                    if section == "Students":
+                        for course in related:
+                            output.write(_encode({"op": "unenroll", "student": key, "course": course}))
+                            counts["unenroll"] += 1
+    return dict(counts)
+
+
+def read_patch(patch_file):
+    """Yields the operations of a change set written by diff_rosters."""
+    with open_saved_file(patch_file) as file:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+class _Patch:
+    """A change set indexed for applying it to a stream of roster entries."""
+    def __init__(self, patch_file):
+        self.added = {section: [] for section in SECTIONS}
+        self.removed = {section: set() for section in SECTIONS}
+        self.modified = {section: {} for section in SECTIONS}
+        self.enrolled = {"Students": defaultdict(list), "Courses": defaultdict(list)}
+        self.unenrolled = {"Students": defaultdict(set), "Courses": defaultdict(set)}
+        self.assigned = defaultdict(list)
+        self.unassigned = defaultdict(set)
+        for operation in read_patch(patch_file):
+            kind = operation["op"]
+            if kind in ("enroll", "unenroll"):
+                student, course = operation["student"], operation["course"]
+                if kind == "enroll":
+                    self.enrolled["Students"][student].append(course)
+                    self.enrolled["Courses"][course].append(student)
+                else:
+                    self.unenrolled["Students"][student].add(course)
+                    self.unenrolled["Courses"][course].add(student)
+                continue
+            section = TYPES[operation["type"]]
+            key = operation["id"]
+            if kind == "add":
+                self.added[section].append(operation["entry"])
+                if section == "Courses":
+                    self.assigned[operation["entry"]["InstructorID"]].append(key)
+            elif kind == "remove":
+                self.removed[section].add(key)
+                if section == "Courses":
+                    self.unassigned[operation["entry"]["InstructorID"]].add(key)
+            elif kind == "modify":
+                self.modified[section][key] = operation["fields"]
+                if section == "Courses" and "InstructorID" in operation["fields"]:
+                    self.unassigned[operation["old"]["InstructorID"]].add(key)
+                    self.assigned[operation["fields"]["InstructorID"]].append(key)
+            else:
+                raise ValueError(f"Unknown patch operation: {kind}")
+
+    def _related(self, section, key, related):
+        if section == "Instructor":
+            removed, added = self.unassigned.get(key, ()), self.assigned.get(key, ())
+        elif section in self.enrolled:
+            removed, added = self.unenrolled[section].get(key, ()), self.enrolled[section].get(key, ())
+        else:
+            return related
+        if removed:
+            related = [item for item in related if item not in removed]
+        return related + [item for item in added if item not in related] if added else related
+
+    def entries(self, stream, section):
+        """Yields the patched entries of one section, then the entries the patch adds to it."""
+        _, id_field, relation = SECTIONS[section]
+        while stream.peek() is not None and stream.peek()[0] == section:
+            entry = next(stream)[1]
+            key = str(entry[id_field])
+            if key in self.removed[section]:
+                continue
+            if key in self.modified[section]:
+                entry.update(self.modified[section][key])
+            entry[relation] = self._related(section, key, entry.get(relation, []))
+            yield entry
+        for entry in self.added[section]:
+            entry = dict(entry)
+            entry[relation] = self._related(section, str(entry[id_field]), [])
+            yield entry
+
+
+class _Lookahead:
+    def __init__(self, iterator):
+        self.iterator = iterator
+        self.next = next(iterator, None)
+
+    def peek(self):
+        return self.next
+
+    def __next__(self):
+        item, self.next = self.next, next(self.iterator, None)
+        return item
+
+
+def apply_patch(source, patch_file, fileName, compact=True, compression=None):
+    """
+    Writes the roster obtained by applying a change set to a roster file.
+
+    The source is streamed; only the change set is held in memory.
+
+    Args:
+        source (str): The roster file (or database) the change set was computed from.
+        patch_file (str): The change set written by diff_rosters.
+        fileName (str): Where the patched roster is written, as by OOP.save_to_file.
+        compact (bool): Write the compact layout (see OOP.save_to_file).
+        compression (str): None, "gzip", "bz2" or "lzma".
+
+    Raises:
+        ValueError: If the source's sections are not in save_to_file's order.
+    """
+    patch = _Patch(patch_file)
+    stream = _Lookahead(iter_snapshot(source))
+    save_entries_to_file(patch.entries(stream, "Instructor"), patch.entries(stream, "Courses"),
+                         patch.entries(stream, "Students"), fileName, compact, compression)
+    if stream.peek() is not None:
+        raise ValueError(f"Section {stream.peek()[0]} is out of order in {source}")
+
+
+# Entry field -> column, for applying change sets to the Part3.py schema
+COLUMNS = {
+    "Instructor": ("instructors", "unique_id", {"Name": "name", "Age": "age", "Email": "email", "InstructorID": "unique_id"}),
+    "Course": ("courses", "course_id", {"CourseID": "course_id", "Course Name": "course_name", "InstructorID": "instructor_id"}),
+    "Student": ("students", "unique_id", {"Name": "name", "Age": "age", "Email": "email", "StudentID": "unique_id"}),
+}
+
+
+def apply_patch_to_database(connection, patch_file):
+    """
+    Applies a change set to a School Management System database in one transaction.
+
+    Entities are added and modified first (instructors, courses, then students), then
+    enrollments are changed, then entities are removed together with their registrations.
+    Enrollments naming a student or course the database does not have are skipped and
+    not counted.
+
+    Args:
+        connection (sqlite3.Connection): A connection to the database.
+        patch_file (str): The change set written by diff_rosters.
+
+    Returns:
+        dict: The number of operations applied, by operation name.
+    """
+    operations = defaultdict(list)
+    for operation in read_patch(patch_file):
+        kind = operation["op"]
+        operations[(kind, operation.get("type"))].append(operation)
+    cursor = connection.cursor()
+    counts = defaultdict(int)
+    try:
+        cursor.execute("BEGIN IMMEDIATE")
+        for entity_type in ("Instructor", "Course", "Student"):
+            table, key_column, columns = COLUMNS[entity_type]
+            for operation in operations[("add", entity_type)]:
+                entry = operation["entry"]
+                names = [column for field, column in columns.items() if field in entry]
+                cursor.execute(f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join('?' for _ in names)})",
+                               [entry[field] for field in columns if field in entry])
+                counts["add"] += 1
+            for operation in operations[("modify", entity_type)]:
+                fields = operation["fields"]
+                assignments = ", ".join(f"{columns[field]} = ?" for field in fields if field in columns)
+                if assignments:
+                    cursor.execute(f"UPDATE {table} SET {assignments} WHERE {key_column} = ?",
+                                   [value for field, value in fields.items() if field in columns] + [operation["id"]])
+                counts["modify"] += 1
+        student = "(SELECT id FROM students WHERE unique_id = ?)"
+        course = "(SELECT id FROM courses WHERE course_id = ?)"
+        unenroll = [(operation["student"], operation["course"]) for operation in operations[("unenroll", None)]]
+        cursor.executemany(f"DELETE FROM registrations WHERE student_id = {student} AND course_id = {course}", unenroll)
+        enroll = [(operation["student"], operation["course"]) for operation in operations[("enroll", None)]]
+        # An enrollment naming an unknown student or course is skipped rather than stored half-empty
+        cursor.executemany(f"""
+            INSERT INTO registrations (student_id, course_id)
+            SELECT student_id, course_id FROM (SELECT {student} AS student_id, {course} AS course_id)
+            WHERE student_id IS NOT NULL AND course_id IS NOT NULL
+        """, enroll)
+        counts["unenroll"], counts["enroll"] = len(unenroll), max(cursor.rowcount, 0)
+        removed_students = [(operation["id"],) for operation in operations[("remove", "Student")]]
+        cursor.executemany(f"DELETE FROM registrations WHERE student_id = {student}", removed_students)
+        cursor.executemany("DELETE FROM students WHERE unique_id = ?", removed_students)
+        removed_courses = [(operation["id"],) for operation in operations[("remove", "Course")]]
+        cursor.executemany(f"DELETE FROM registrations WHERE course_id = {course}", removed_courses)
+        cursor.executemany("DELETE FROM courses WHERE course_id = ?", removed_courses)
+        removed_instructors = [(operation["id"],) for operation in operations[("remove", "Instructor")]]
+        cursor.executemany("DELETE FROM instructors WHERE unique_id = ?", removed_instructors)
+        counts["remove"] = len(removed_students) + len(removed_courses) + len(removed_instructors)
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    return dict(counts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff and patch roster snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    diff = commands.add_parser("diff", help="Write the change set between two snapshots")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("patch")
+    diff.add_argument("--partitions", type=int, default=PARTITIONS)
+    diff.add_argument("--compression", choices=sorted(COMPRESSION_MODULES))
+    patch = commands.add_parser("patch", help="Apply a change set to a roster file or database")
+    patch.add_argument("source")
+    patch.add_argument("patch")
+    patch.add_argument("output", nargs="?", help="Patched roster file; omit to update a database in place")
+    patch.add_argument("--compression", choices=sorted(COMPRESSION_MODULES))
+    args = parser.parse_args()
+
+    if args.command == "diff":
+        counts = diff_rosters(args.old, args.new, args.patch, args.partitions, args.compression)
+    elif args.output is None:
+        connection = sqlite3.connect(args.source, isolation_level=None)
+        counts = apply_patch_to_database(connection, args.patch)
+        connection.close()
+    else:
+        apply_patch(args.source, args.patch, args.output, compression=args.compression)
+        counts = None
+    if counts is not None:
+        print(", ".join(f"{count} {name}" for name, count in sorted(counts.items())) or "No changes")
+
+
+if __name__ == "__main__":
+    main()
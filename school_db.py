@@ -0,0 +1,487 @@
+import queue
+import threading
+from contextlib import contextmanager
+
+from events import TableSpec, StudentAdded, InstructorAdded, CourseAdded, RegistrationCreated
+from concurrency import add_version_columns, connect
+import view_query
+
+"""Shared SQLite data layer for the School Management System
+
+This module holds the schema used by the PyQt5 application (Part3.py) together with
+the student, instructor, course and registration operations it performs, so that the
+same database can be reached without a GUI (see server.py).
+
+Classes:
+    ConnectionPool: A fixed-size pool of SQLite connections that can be shared between threads.
+
+Functions:
+    create_tables(cursor): Creates the students, instructors, courses and registrations tables, with
+        the row version columns used for optimistic updates (see concurrency.py).
+    create_views(cursor): Creates the indexes, summary table, triggers and views behind 'View All'.
+    view_all_rows(cursor, view, sort, descending, filters, after, limit): Returns a page of a VIEW_ALL view.
+    view_all_row(cursor, view, row_id, filters): Returns one row of a VIEW_ALL view.
+    view_all_changes(cursor, event, view): Returns the VIEW_ALL rows affected by a change event.
+    add_student(cursor, name, age, email, student_id, bus): Inserts a student row.
+    add_instructor(cursor, name, age, email, instructor_id, bus): Inserts an instructor row.
+    add_course(cursor, course_id, course_name, instructor_id, bus): Inserts a course row.
+    register_course(cursor, student_id, course_id, bus): Registers a student for a course.
+    list_students(cursor, after, limit): Returns a page of students.
+    list_instructors(cursor, after, limit): Returns a page of instructors.
+    list_courses(cursor, after, limit): Returns a page of courses.
+    list_registrations(cursor, after, limit): Returns a page of registrations.
+"""
+
+DATABASE_FILE = "school_management.db"
+
+# Tables watched for changes made by other processes (see events.DataVersionWatcher).
+# The columns match the rows staged by the write functions below.
+WATCHED_TABLES = [
+    TableSpec("students", ["name", "age", "email", "unique_id"], StudentAdded, rowid="id"),
+    TableSpec("instructors", ["name", "age", "email", "unique_id"], InstructorAdded, rowid="id"),
+    TableSpec("courses", ["course_id", "course_name", "instructor_id"], CourseAdded, rowid="id"),
+    TableSpec("registrations", ["student_id", "course_id"], RegistrationCreated),
+]
+
+
+def create_tables(cursor):
+    """
+    Creates the School Management System tables if they do not exist.
+
+    Registrations get an AUTOINCREMENT row id so rowids are never reused once term.py has
+    archived the table empty; databases created without it are migrated once with
+    `python terms.py migrate`.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to run the statements.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            age INTEGER,
+            email TEXT NOT NULL,
+            unique_id TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS instructors (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            age INTEGER,
+            email TEXT NOT NULL,
+            unique_id TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            course_id TEXT NOT NULL,
+            course_name TEXT NOT NULL,
+            instructor_id TEXT NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS registrations (
+            registration_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            course_id INTEGER,
+            FOREIGN KEY (student_id) REFERENCES students(id),
+            FOREIGN KEY (course_id) REFERENCES courses(id)
+        )
+    """)
+    # Added by ALTER TABLE so databases created before the column existed are migrated too
+    add_version_columns(cursor, [("students", "id"), ("instructors", "id"), ("courses", "id")])
+    create_views(cursor)
+
+
+def create_views(cursor):
+    """
+    Creates the indexes, the enrollment summary table, its triggers and the views used by
+    the 'View All' tab.
+
+    Enrollment counts are kept in 'course_enrollment_counts' by triggers on
+    'registrations' and 'courses', so reading or sorting courses by enrollment never
+    aggregates the registrations table. The table is filled from existing registrations
+    the first time it is created.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to run the statements.
+    """
+    # (student_id, course_id) covers lookups by student and the duplicate check in integrity.py
+    cursor.execute("DROP INDEX IF EXISTS idx_registrations_student")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrations_student_course ON registrations (student_id, course_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_registrations_course ON registrations (course_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_instructors_unique_id ON instructors (unique_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_courses_instructor ON courses (instructor_id)")
+    # Composite indexes for the sort keys and filters offered by 'View All' (see VIEW_ALL)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students (name, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_age ON students (age, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_unique_id ON students (unique_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_instructors_name ON instructors (name, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_instructors_age ON instructors (age, id)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_students_email_domain ON students ({view_query.email_domain('email')}, age, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_courses_course_id ON courses (course_id, id)")
+
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'course_enrollment_counts'").fetchone()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS course_enrollment_counts (
+            course_id INTEGER PRIMARY KEY,
+            enrollment_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_course_enrollment_counts_count
+        ON course_enrollment_counts (enrollment_count, course_id)
+    """)
+    if not exists:
+        cursor.execute("""
+            INSERT INTO course_enrollment_counts (course_id, enrollment_count)
+            SELECT courses.id, (SELECT COUNT(*) FROM registrations WHERE registrations.course_id = courses.id)
+            FROM courses
+        """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_courses_insert_count AFTER INSERT ON courses
+        BEGIN
+            INSERT OR IGNORE INTO course_enrollment_counts (course_id, enrollment_count) VALUES (NEW.id, 0);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_courses_delete_count AFTER DELETE ON courses
+        BEGIN
+            DELETE FROM course_enrollment_counts WHERE course_id = OLD.id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_registrations_insert_count AFTER INSERT ON registrations
+        BEGIN
+            INSERT OR IGNORE INTO course_enrollment_counts (course_id, enrollment_count) VALUES (NEW.course_id, 0);
+            UPDATE course_enrollment_counts SET enrollment_count = enrollment_count + 1 WHERE course_id = NEW.course_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_registrations_delete_count AFTER DELETE ON registrations
+        BEGIN
+            UPDATE course_enrollment_counts SET enrollment_count = enrollment_count - 1 WHERE course_id = OLD.course_id;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_registrations_update_count AFTER UPDATE OF course_id ON registrations
+        BEGIN
+            UPDATE course_enrollment_counts SET enrollment_count = enrollment_count - 1 WHERE course_id = OLD.course_id;
+            INSERT OR IGNORE INTO course_enrollment_counts (course_id, enrollment_count) VALUES (NEW.course_id, 0);
+            UPDATE course_enrollment_counts SET enrollment_count = enrollment_count + 1 WHERE course_id = NEW.course_id;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS instructor_view AS
+        SELECT instructors.id, instructors.name, instructors.age, instructors.email, instructors.unique_id,
+               (SELECT COUNT(*) FROM courses WHERE courses.instructor_id = instructors.unique_id) AS course_count
+        FROM instructors
+    """)
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS course_enrollment_view AS
+        SELECT course_enrollment_counts.course_id AS id, courses.course_id, courses.course_name, courses.instructor_id,
+               instructors.name AS instructor_name, course_enrollment_counts.enrollment_count
+        FROM course_enrollment_counts
+        JOIN courses ON courses.id = course_enrollment_counts.course_id
+        LEFT JOIN instructors ON instructors.unique_id = courses.instructor_id
+    """)
+    cursor.execute("""
+        CREATE VIEW IF NOT EXISTS student_courses_view AS
+        SELECT students.id, students.name, students.unique_id,
+               (SELECT group_concat(courses.course_id, ', ')
+                FROM registrations JOIN courses ON courses.id = registrations.course_id
+                WHERE registrations.student_id = students.id) AS courses
+        FROM students
+    """)
+
+
+# The views offered by the 'View All' tab, in the spec format of view_query: headers,
+# selected columns, source, the sort keys offered (each backed by an index) and the
+# filters supported. The first column is always the row id used to apply changes to a
+# displayed row.
+VIEW_ALL = {
+    "Students": {
+        "headers": ["ID", "Name", "Age", "Email", "Additional Info"],
+        "columns": "id, name, age, email, unique_id",
+        "source": "students",
+        "sorts": {"ID": ["id"], "Name": ["name", "id"], "Age": ["age", "id"], "Additional Info": ["unique_id", "id"]},
+        "default_sort": ("ID", False),
+        "filters": {"name": "name", "age": "age", "email": "email", "id": "unique_id"},
+    },
+    "Instructors": {
+        "headers": ["ID", "Name", "Age", "Email", "Instructor ID", "Courses Taught"],
+        "columns": "id, name, age, email, unique_id, course_count",
+        "source": "instructor_view",
+        "sorts": {"ID": ["id"], "Name": ["name", "id"], "Age": ["age", "id"], "Instructor ID": ["unique_id", "id"]},
+        "default_sort": ("ID", False),
+        "filters": {"name": "name", "age": "age", "email": "email", "id": "unique_id"},
+    },
+    "Courses": {
+        "headers": ["ID", "Course ID", "Course Name", "Instructor ID", "Instructor", "Enrolled"],
+        "columns": "id, course_id, course_name, instructor_id, instructor_name, enrollment_count",
+        "source": "course_enrollment_view",
+        "sorts": {"ID": ["id"], "Course ID": ["course_id", "id"], "Enrolled": ["enrollment_count", "id"]},
+        "default_sort": ("Enrolled", True),
+        "filters": {"name": "course_name", "id": "course_id"},
+    },
+    "Student Courses": {
+        "headers": ["ID", "Name", "Student ID", "Courses"],
+        "columns": "id, name, unique_id, courses",
+        "source": "student_courses_view",
+        "sorts": {"ID": ["id"], "Name": ["name", "id"], "Student ID": ["unique_id", "id"]},
+        "default_sort": ("ID", False),
+        "filters": {"name": "name", "id": "unique_id"},
+    },
+}
+
+VIEW_ALL_LIMIT = 1000
+
+
+def view_all_rows(cursor, view, sort=None, descending=None, filters=None, after=None, limit=VIEW_ALL_LIMIT):
+    """
+    Returns one page of a 'View All' view, sorted and filtered by SQLite.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to run the query.
+        view (str): A key of VIEW_ALL.
+        sort (str): A sort key of the view, or None for its default order.
+        descending (bool): Sort direction, or None for the default.
+        filters (dict): See view_query.where_clause().
+        after (tuple): The key returned with the previous page, or None for the first page.
+        limit (int): The maximum number of rows returned.
+
+    Returns:
+        tuple: The list of rows and the key of the next page (None on the last page).
+    """
+    return view_query.fetch_page(cursor, VIEW_ALL[view], sort, descending, filters, after, limit)
+
+
+def view_all_row(cursor, view, row_id, filters=None):
+    """Returns the row of a 'View All' view with the given row id, or None if it does not match the filters."""
+    return view_query.fetch_row(cursor, VIEW_ALL[view], row_id, filters)
+
+
+def view_all_changes(cursor, event, view):
+    """
+    Returns the row ids of a 'View All' view that a change event adds or modifies.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used for lookups.
+        event (events.ChangeEvent): An event staged by this module or read by a watcher
+            using WATCHED_TABLES.
+        view (str): The view being displayed.
+
+    Returns:
+        list of int: The row ids to re-read with view_all_row().
+    """
+    if isinstance(event, StudentAdded) and view in ("Students", "Student Courses"):
+        return [event.row_id]
+    if isinstance(event, InstructorAdded) and view == "Instructors":
+        return [event.row_id]
+    if isinstance(event, CourseAdded):
+        if view == "Courses":
+            return [event.row_id]
+        if view == "Instructors":
+            rows = cursor.execute("SELECT id FROM instructors WHERE unique_id = ?", (event.row[2],)).fetchall()
+            return [row[0] for row in rows]
+    if isinstance(event, RegistrationCreated):
+        student_id, course_id = event.row
+        if view == "Courses":
+            return [course_id]
+        if view == "Student Courses":
+            return [student_id]
+    return []
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of SQLite connections.
+
+    Connections are opened with check_same_thread disabled so that a worker thread can
+    use whichever connection it is handed, but each connection is only ever used by one
+    thread at a time. They are opened by concurrency.connect(), in autocommit mode with
+    WAL journaling, so writes go through concurrency.run_transaction().
+
+    Args:
+        database (str): Path to the SQLite database file.
+        size (int): Number of connections kept in the pool.
+        timeout (float): Seconds SQLite waits on a locked database before failing.
+    """
+    def __init__(self, database=DATABASE_FILE, size=4, timeout=5.0):
+        self.database = database
+        self.size = size
+        self._connections = queue.Queue(maxsize=size)
+        self._all = []
+        self._lock = threading.Lock()
+        for _ in range(size):
+            connection = connect(database, busy_timeout=timeout, check_same_thread=False)
+            self._all.append(connection)
+            self._connections.put(connection)
+
+    def acquire(self, timeout=None):
+        """Takes a connection out of the pool, waiting up to `timeout` seconds for one to be free."""
+        try:
+            return self._connections.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("No database connection available") from None
+
+    def release(self, connection):
+        """Returns a connection to the pool, rolling back anything left uncommitted."""
+        if connection.in_transaction:
+            connection.rollback()
+        self._connections.put(connection)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that acquires a connection and releases it afterwards."""
+        connection = self.acquire(timeout)
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self):
+        """Closes every connection owned by the pool."""
+        with self._lock:
+            for connection in self._all:
+                connection.close()
+            self._all = []
+
+
+def add_student(cursor, name, age, email, student_id, bus=None):
+    """
+    Inserts a student into the 'students' table.
+
+    Args:
+        bus (events.EventBus, optional): If given, an event is staged on it; publish it with
+            bus.flush() once the transaction commits.
+
+    Returns:
+        int: The row id of the new student.
+    """
+    cursor.execute("""
+        INSERT INTO students (name, age, email, unique_id)
+        VALUES (?, ?, ?, ?)
+    """, (name, age, email, student_id))
+    if bus is not None:
+        bus.stage(StudentAdded(cursor.lastrowid, (name, age, email, student_id)))
+    return cursor.lastrowid
+
+
+def add_instructor(cursor, name, age, email, instructor_id, bus=None):
+    """
+    Inserts an instructor into the 'instructors' table.
+
+    Args:
+        bus (events.EventBus, optional): If given, an event is staged on it; publish it with
+            bus.flush() once the transaction commits.
+
+    Returns:
+        int: The row id of the new instructor.
+    """
+    cursor.execute("""
+        INSERT INTO instructors (name, age, email, unique_id)
+        VALUES (?, ?, ?, ?)
+    """, (name, age, email, instructor_id))
+    if bus is not None:
+        bus.stage(InstructorAdded(cursor.lastrowid, (name, age, email, instructor_id)))
+    return cursor.lastrowid
+
+
+def add_course(cursor, course_id, course_name, instructor_id, bus=None):
+    """
+    Inserts a course into the 'courses' table.
+
+    Args:
+        bus (events.EventBus, optional): If given, an event is staged on it; publish it with
+            bus.flush() once the transaction commits.
+
+    Returns:
+        int: The row id of the new course.
+    """
+    cursor.execute("""
+        INSERT INTO courses (course_id, course_name, instructor_id)
+        VALUES (?, ?, ?)
+    """, (course_id, course_name, instructor_id))
+    if bus is not None:
+        bus.stage(CourseAdded(cursor.lastrowid, (course_id, course_name, instructor_id)))
+    return cursor.lastrowid
+
+
+def register_course(cursor, student_id, course_id, bus=None):
+    """
+    Registers a student for a course.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to run the statements.
+        student_id (str): The student's unique (9-digit) ID.
+        course_id (str): The course ID, e.g. "CSE101".
+        bus (events.EventBus, optional): If given, a RegistrationCreated event is staged on it.
+
+    Returns:
+        tuple: The (student row id, course row id) pair that was inserted.
+
+    Raises:
+        LookupError: If the student or the course does not exist.
+    """
+    row = cursor.execute("SELECT id FROM students WHERE unique_id = ?", (student_id,)).fetchone()
+    if row is None:
+        raise LookupError(f"Unknown student {student_id}")
+    student_row_id = row[0]
+    row = cursor.execute("SELECT id FROM courses WHERE course_id = ?", (course_id,)).fetchone()
+    if row is None:
+        raise LookupError(f"Unknown course {course_id}")
+    course_row_id = row[0]
+    cursor.execute("""
+        INSERT INTO registrations (student_id, course_id)
+        VALUES (?, ?)
+    """, (student_row_id, course_row_id))
+    if bus is not None:
+        bus.stage(RegistrationCreated(cursor.lastrowid, (student_row_id, course_row_id)))
+    return student_row_id, course_row_id
+
+
+def list_students(cursor, after=0, limit=100):
+    """Returns up to `limit` students whose row id is greater than `after`, as dictionaries."""
+    cursor.execute("""
+        SELECT id, name, age, email, unique_id FROM students
+        WHERE id > ? ORDER BY id LIMIT ?
+    """, (after, limit))
+    return [{"id": row[0], "name": row[1], "age": row[2], "email": row[3], "student_id": row[4]}
+            for row in cursor.fetchall()]
+
+
+def list_instructors(cursor, after=0, limit=100):
+    """Returns up to `limit` instructors whose row id is greater than `after`, as dictionaries."""
+    cursor.execute("""
+        SELECT id, name, age, email, unique_id FROM instructors
+        WHERE id > ? ORDER BY id LIMIT ?
+    """, (after, limit))
+    return [{"id": row[0], "name": row[1], "age": row[2], "email": row[3], "instructor_id": row[4]}
+            for row in cursor.fetchall()]
+
+
+def list_courses(cursor, after=0, limit=100):
+    """Returns up to `limit` courses whose row id is greater than `after`, as dictionaries."""
+    cursor.execute("""
+        SELECT id, course_id, course_name, instructor_id FROM courses
+        WHERE id > ? ORDER BY id LIMIT ?
+    """, (after, limit))
+    return [{"id": row[0], "course_id": row[1], "course_name": row[2], "instructor_id": row[3]}
+            for row in cursor.fetchall()]
+
+
+def list_registrations(cursor, after=0, limit=100):
+    """Returns up to `limit` registrations whose row id is greater than `after`, as dictionaries."""
+    cursor.execute("""
+        SELECT registrations.rowid, students.unique_id, courses.course_id
+        FROM registrations
+        JOIN students ON students.id = registrations.student_id
+        JOIN courses ON courses.id = registrations.course_id
+        WHERE registrations.rowid > ? ORDER BY registrations.rowid LIMIT ?
+    """, (after, limit))
+    return [{"id": row[0], "student_id": row[1], "course_id": row[2]} for row in cursor.fetchall()]
@@ -0,0 +1,270 @@
+import argparse
+import asyncio
+import json
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+import concurrency
+import school_db
+from OOP import validate_name, validate_age, validate_email, validate_studentID, validate_instructorID, validate_CourseID
+
+"""School Management HTTP/JSON Service
+
+A headless entry point to the School Management System database (the same
+school_management.db used by Part3.py). Requests are parsed on an asyncio event loop,
+while database work runs in a bounded thread pool, each job borrowing a connection
+from a school_db.ConnectionPool. Writes run in short BEGIN IMMEDIATE transactions
+retried with backoff (concurrency.run_transaction), so the service can share the
+database with running copies of Part3.py and Tkinter.py.
+
+Endpoints:
+    GET  /students         List students (query parameters: after, limit).
+    POST /students         Add a student: {"name", "age", "email", "student_id"}.
+    GET  /instructors      List instructors (query parameters: after, limit).
+    POST /instructors      Add an instructor: {"name", "age", "email", "instructor_id"}.
+    GET  /courses          List courses (query parameters: after, limit).
+    POST /courses          Add a course: {"course_id", "course_name", "instructor_id"}.
+    GET  /registrations    List registrations (query parameters: after, limit).
+    POST /registrations    Register a student for a course: {"student_id", "course_id"}.
+
+Classes:
+    SchoolServer: Owns the connection pool, the thread pool and the route table.
+
+Usage:
+    python server.py --port 8080 --workers 4
+"""
+
+MAX_BODY_SIZE = 1024 * 1024
+MAX_PAGE_SIZE = 1000
+
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class HTTPError(Exception):
+    """An error that is reported to the client with the given HTTP status."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _page_arguments(query):
+    """Reads the 'after' and 'limit' keyset pagination parameters from a parsed query string."""
+    try:
+        after = int(query.get("after", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+    except ValueError:
+        raise HTTPError(400, "'after' and 'limit' must be integers")
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise HTTPError(400, f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+    return after, limit
+
+
+def _field(body, name):
+    if not isinstance(body, dict) or name not in body:
+        raise HTTPError(400, f"Missing field '{name}'")
+    return body[name]
+
+
+class SchoolServer:
+    """
+    Serves the School Management System operations as JSON over HTTP/1.1.
+
+    Args:
+        database (str): Path to the SQLite database file.
+        workers (int): Size of the thread pool and of the connection pool.
+        queue_limit (int): Maximum number of requests waiting for a worker before
+            new requests are rejected with 503.
+    """
+    def __init__(self, database=school_db.DATABASE_FILE, workers=4, queue_limit=256):
+        self.pool = school_db.ConnectionPool(database, size=workers)
+        with self.pool.connection() as connection:
+            concurrency.run_transaction(connection, school_db.create_tables)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="school-db")
+        self.pending = asyncio.Semaphore(workers + queue_limit)
+        self.routes = {
+            ("GET", "/students"): self.list_students,
+            ("POST", "/students"): self.add_student,
+            ("GET", "/instructors"): self.list_instructors,
+            ("POST", "/instructors"): self.add_instructor,
+            ("GET", "/courses"): self.list_courses,
+            ("POST", "/courses"): self.add_course,
+            ("GET", "/registrations"): self.list_registrations,
+            ("POST", "/registrations"): self.register_course,
+        }
+
+    # Handlers run on the thread pool with a pooled connection.
+
+    def list_students(self, connection, query, body):
+        return 200, school_db.list_students(connection.cursor(), *_page_arguments(query))
+
+    def list_instructors(self, connection, query, body):
+        return 200, school_db.list_instructors(connection.cursor(), *_page_arguments(query))
+
+    def list_courses(self, connection, query, body):
+        return 200, school_db.list_courses(connection.cursor(), *_page_arguments(query))
+
+    def list_registrations(self, connection, query, body):
+        return 200, school_db.list_registrations(connection.cursor(), *_page_arguments(query))
+
+    def add_student(self, connection, query, body):
+        name = validate_name(_field(body, "name"))
+        age = validate_age(_field(body, "age"))
+        email = validate_email(_field(body, "email"))
+        student_id = validate_studentID(_field(body, "student_id"))
+        row_id = concurrency.run_transaction(
+            connection, lambda cursor: school_db.add_student(cursor, name, age, email, student_id))
+        return 201, {"id": row_id, "name": name, "age": age, "email": email, "student_id": student_id}
+
+    def add_instructor(self, connection, query, body):
+        name = validate_name(_field(body, "name"))
+        age = validate_age(_field(body, "age"))
+        email = validate_email(_field(body, "email"))
+        instructor_id = validate_instructorID(_field(body, "instructor_id"))
+        row_id = concurrency.run_transaction(
+            connection, lambda cursor: school_db.add_instructor(cursor, name, age, email, instructor_id))
+        return 201, {"id": row_id, "name": name, "age": age, "email": email, "instructor_id": instructor_id}
+
+    def add_course(self, connection, query, body):
+        course_id = validate_CourseID(_field(body, "course_id"))
+        course_name = validate_name(_field(body, "course_name"))
+        instructor_id = validate_instructorID(_field(body, "instructor_id"))
+        row_id = concurrency.run_transaction(
+            connection, lambda cursor: school_db.add_course(cursor, course_id, course_name, instructor_id))
+        return 201, {"id": row_id, "course_id": course_id, "course_name": course_name, "instructor_id": instructor_id}
+
+    def register_course(self, connection, query, body):
+        student_id = validate_studentID(_field(body, "student_id"))
+        course_id = validate_CourseID(_field(body, "course_id"))
+        concurrency.run_transaction(
+            connection, lambda cursor: school_db.register_course(cursor, student_id, course_id))
+        return 201, {"student_id": student_id, "course_id": course_id}
+
+    def _run(self, handler, query, body):
+        with self.pool.connection() as connection:
+            try:
+                return handler(connection, query, body)
+            except HTTPError as e:
+                return e.status, {"error": e.message}
+            except (ValueError, TypeError) as e:
+                return 400, {"error": str(e)}
+            except LookupError as e:
+                return 404, {"error": str(e)}
+            except sqlite3.Error as e:
+                return 500, {"error": f"Database error: {e}"}
+
+    async def dispatch(self, method, target, body):
+        """Routes one request to its handler and returns (status, payload)."""
+        url = urlsplit(target)
+        handler = self.routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.routes):
+                return 405, {"error": f"Method {method} not allowed on {url.path}"}
+            return 404, {"error": f"No route for {url.path}"}
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                return 400, {"error": "Request body is not valid JSON"}
+        if self.pending.locked():
+            return 503, {"error": "Server is busy"}
+        async with self.pending:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._run, handler, parse_qs(url.query), body)
+
+    async def handle_connection(self, reader, writer):
+        """Serves requests on one client connection until it is closed (HTTP/1.1 keep-alive)."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "Malformed request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                try:
+                    length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, 400, {"error": "Invalid Content-Length"}, False)
+                    break
+                if length > MAX_BODY_SIZE:
+                    await self._respond(writer, 413, {"error": "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """Listens on host:port until cancelled."""
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the School Management System database as JSON over HTTP.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    async def run():
+        school_server = SchoolServer(args.database, args.workers)
+        print(f"Serving {args.database} on http://{args.host}:{args.port}")
+        try:
+            await school_server.serve(args.host, args.port)
+        finally:
+            school_server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+import argparse
+import glob
+import gzip
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+
+import school_db
+
+"""Term Partitioning and Archival of Registrations
+
+The `registrations` table of the School Management System database holds the current
+term only. At the end of a term its registrations are moved into a SQLite file of their
+own (one file per term), which is then kept read-only, and the main table starts the
+new term empty. The applications keep reading and writing `registrations` exactly as
+before, so the table and its indexes stay the size of one term.
+
+Past terms are ATTACHed read-only at runtime, and a TEMP view unions them with the
+current term for queries that span terms:
+
+    all_registrations(term, registration_id, student_id, course_id)
+
+where `term` is 'current' for the main table. A condition on `term` only reads the
+matching partition.
+
+Archiving is batched and resumable: each batch is first copied into the term file and
+committed there, and only then deleted from the main table in a second transaction, by
+the original rowids the term file recorded. SQLite does not commit attached files
+atomically together when the main database is in WAL mode, so the two are never left
+to one transaction. An interrupted archive continues where it stopped when run again:
+rows already copied are not copied twice (archived rows are keyed by their original
+rowid), and copied rows still in the main table are deleted first.
+
+Archiving needs the main table to have an AUTOINCREMENT row id. Otherwise SQLite would
+number the new term's registrations from 1 again once the table is emptied, below the
+rowid high-water marks with which running applications (events.DataVersionWatcher) look
+for new rows. school_db.create_tables() creates it that way; databases created before
+are migrated once, explicitly, with `python terms.py migrate`, and archive_current_term()
+refuses to run until they are. The migration copies the table in batches while triggers
+mirror the changes applications make meanwhile, so only the final swap (dropping the old
+table and building the indexes of the new one) holds the write lock for long.
+
+Archived term files can be VACUUMed and gzip-compressed; compressed terms are
+decompressed into a temporary directory when attached.
+
+SQLite attaches at most 10 databases per connection by default, so at most 9 past terms
+can be attached at once; pass the terms you need to attach().
+
+Classes:
+    TermStore: Archives the current term and attaches past terms.
+
+Usage:
+    python terms.py migrate
+    python terms.py archive 2024-fall --batch-size 10000 --compress
+    python terms.py list
+"""
+
+TERM_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+MAX_ATTACHED_TERMS = 9
+
+# The registrations table being migrated: school_db.py's with an AUTOINCREMENT row id
+MIGRATION_TABLE = """
+    CREATE TABLE IF NOT EXISTS main.registrations_migrated (
+        registration_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        student_id INTEGER,
+        course_id INTEGER,
+        FOREIGN KEY (student_id) REFERENCES students(id),
+        FOREIGN KEY (course_id) REFERENCES courses(id)
+    )
+"""
+
+# Mirror the applications' changes into the new table while the migration copies the old one
+MIGRATION_TRIGGERS = {
+    "trg_registrations_migrate_insert": """
+        AFTER INSERT ON main.registrations BEGIN
+            INSERT OR REPLACE INTO registrations_migrated (registration_id, student_id, course_id)
+            VALUES (NEW.rowid, NEW.student_id, NEW.course_id);
+        END
+    """,
+    "trg_registrations_migrate_update": """
+        AFTER UPDATE ON main.registrations BEGIN
+            DELETE FROM registrations_migrated WHERE registration_id = OLD.rowid;
+            INSERT OR REPLACE INTO registrations_migrated (registration_id, student_id, course_id)
+            VALUES (NEW.rowid, NEW.student_id, NEW.course_id);
+        END
+    """,
+    "trg_registrations_migrate_delete": """
+        AFTER DELETE ON main.registrations BEGIN
+            DELETE FROM registrations_migrated WHERE registration_id = OLD.rowid;
+        END
+    """,
+}
+
+
+def _schema_name(term):
+    return "term_" + term.replace("-", "_")
+
+
+class TermStore:
+    """
+    Archives registrations by term and attaches archived terms for cross-term queries.
+
+    Args:
+        database (str): Path to the main School Management System database.
+        directory (str): Directory holding the term files; defaults to a 'terms' directory
+            next to the database.
+    """
+    def __init__(self, database=school_db.DATABASE_FILE, directory=None):
+        self.database = database
+        self.directory = directory or os.path.join(os.path.dirname(os.path.abspath(database)), "terms")
+        os.makedirs(self.directory, exist_ok=True)
+        # uri=True lets archived terms be attached with ?mode=ro
+        self.connection = sqlite3.connect(database, uri=True)
+        school_db.create_tables(self.connection.cursor())
+        self.connection.commit()
+        self.attached = {}
+        self._cache = None
+        self._refresh_view()
+
+    def term_path(self, term):
+        """Returns the path of a term's (uncompressed) database file."""
+        if not TERM_NAME.match(term):
+            raise ValueError("Term names may only contain letters, digits, '-' and '_'")
+        return os.path.join(self.directory, f"registrations_{term}.db")
+
+    def terms(self):
+        """Returns the names of the archived terms found in the term directory, sorted."""
+        names = set()
+        for path in glob.glob(os.path.join(self.directory, "registrations_*.db*")):
+            name = os.path.basename(path)[len("registrations_"):]
+            name = name[:-len(".db.gz")] if name.endswith(".db.gz") else name[:-len(".db")] if name.endswith(".db") else None
+            if name and self._state(name) == "archived":
+                names.add(name)
+        return sorted(names)
+
+    def _state(self, term):
+        path = self.term_path(term)
+        if not os.path.exists(path):
+            return "archived" if os.path.exists(path + ".gz") else None
+        connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            row = connection.execute("SELECT state FROM archive_state").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    # Archiving
+
+    def registrations_migrated(self):
+        """Returns True if the main registrations table has an AUTOINCREMENT row id, as archiving requires."""
+        sql = self.connection.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = 'registrations'").fetchone()[0]
+        return "AUTOINCREMENT" in sql.upper()
+
+    def migrate_registrations(self, batch_size=10000, progress=None):
+        """
+        Rebuilds a main registrations table created without an AUTOINCREMENT row id,
+        keeping every rowid; a one-off step needed before the first archive.
+
+        The rows are copied into a new table one batch per transaction, while triggers
+        copy the changes other connections make meanwhile, so applications can keep
+        running. The final transaction drops the old table and builds the indexes of the
+        new one. Calling this again after an interruption resumes the copy.
+
+        Args:
+            batch_size (int): Number of registrations copied per transaction.
+            progress (function): Called as progress(copied, total) after every batch.
+
+        Returns:
+            int: The number of registrations copied by this call.
+        """
+        if self.registrations_migrated():
+            return 0
+        self._run_immediate(self._start_migration)
+        upper, last = self.connection.execute("SELECT upper_rowid, last_rowid FROM registrations_migration").fetchone()
+        total = self.connection.execute("SELECT COUNT(*) FROM main.registrations WHERE rowid <= ?", (upper,)).fetchone()[0]
+        copied = 0
+        while last < upper:
+            def copy_batch():
+                # Rows the triggers already mirrored are newer than the ones copied here
+                rows = self.connection.execute("""
+                    SELECT rowid, student_id, course_id FROM main.registrations
+                    WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?
+                """, (last, upper, batch_size)).fetchall()
+                self.connection.executemany("""
+                    INSERT OR IGNORE INTO registrations_migrated (registration_id, student_id, course_id)
+                    VALUES (?, ?, ?)
+                """, rows)
+                reached = rows[-1][0] if len(rows) == batch_size else upper
+                self.connection.execute("UPDATE registrations_migration SET last_rowid = ?", (reached,))
+                return len(rows), reached
+            count, last = self._run_immediate(copy_batch)
+            copied += count
+            if progress is not None:
+                progress(copied, total)
+        self._run_immediate(self._finish_migration)
+        return copied
+
+    def _start_migration(self):
+        self.connection.execute(MIGRATION_TABLE)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS main.registrations_migration (
+                upper_rowid INTEGER NOT NULL,
+                last_rowid INTEGER NOT NULL
+            )
+        """)
+        # The triggers and the upper bound are set in one transaction: rows up to it are
+        # copied in batches, every change after it is mirrored by the triggers
+        if self.connection.execute("SELECT 1 FROM registrations_migration").fetchone() is None:
+            upper = self.connection.execute("SELECT COALESCE(MAX(rowid), 0) FROM main.registrations").fetchone()[0]
+            self.connection.execute("INSERT INTO registrations_migration VALUES (?, 0)", (upper,))
+        for name, body in MIGRATION_TRIGGERS.items():
+            self.connection.execute(f"CREATE TRIGGER IF NOT EXISTS main.{name} {body}")
+
+    def _finish_migration(self):
+        for name in MIGRATION_TRIGGERS:
+            self.connection.execute(f"DROP TRIGGER IF EXISTS main.{name}")
+        self.connection.execute("DROP TABLE main.registrations")
+        # The views on registrations are broken until the rename; legacy mode renames without checking them
+        self.connection.execute("PRAGMA legacy_alter_table = ON")
+        try:
+            self.connection.execute("ALTER TABLE main.registrations_migrated RENAME TO registrations")
+        finally:
+            self.connection.execute("PRAGMA legacy_alter_table = OFF")
+        self.connection.execute("DROP TABLE main.registrations_migration")
+        school_db.create_tables(self.connection.cursor())  # Restores the dropped indexes and triggers
+
+    def _run_immediate(self, work):
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = work()
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        return result
+
+    def archive_current_term(self, term, batch_size=10000, vacuum=True, compress=False, progress=None):
+        """
+        Moves the registrations of the current term into the term's own file.
+
+        Only registrations present when the archive first started belong to the term;
+        registrations made meanwhile stay in the main table for the new term. Calling
+        this again for a term whose archive was interrupted resumes it.
+
+        Each batch is committed to the term file before it is deleted from the main
+        table, so a crash never loses registrations; at worst the main table still holds
+        a batch that the term file has, which the next call deletes.
+
+        Args:
+            term (str): The name of the term being closed, e.g. "2024-fall".
+            batch_size (int): Number of registrations moved per transaction.
+            vacuum (bool): VACUUM the term file once it is complete.
+            compress (bool): gzip the term file once it is complete.
+            progress (function): Called as progress(moved, total) after every batch.
+
+        Returns:
+            int: The number of registrations moved by this call.
+
+        Raises:
+            ValueError: If the term has already been archived, or the registrations table
+                has not been migrated (see migrate_registrations).
+        """
+        if self._state(term) == "archived":
+            raise ValueError(f"Term {term} is already archived")
+        if not self.registrations_migrated():
+            raise ValueError("The registrations table reuses rowids; run 'python terms.py migrate' before archiving")
+        path = self.term_path(term)
+        self.connection.execute("ATTACH DATABASE ? AS archive_target", (path,))
+        try:
+            with self.connection:
+                self.connection.execute("""
+                    CREATE TABLE IF NOT EXISTS archive_target.registrations (
+                        source_rowid INTEGER PRIMARY KEY,
+                        student_id INTEGER,
+                        course_id INTEGER
+                    )
+                """)
+                self.connection.execute("""
+                    CREATE TABLE IF NOT EXISTS archive_target.archive_state (
+                        term TEXT NOT NULL,
+                        state TEXT NOT NULL,
+                        upper_rowid INTEGER NOT NULL,
+                        last_rowid INTEGER NOT NULL
+                    )
+                """)
+                if self.connection.execute("SELECT 1 FROM archive_target.archive_state").fetchone() is None:
+                    upper = self.connection.execute("SELECT COALESCE(MAX(rowid), 0) FROM main.registrations").fetchone()[0]
+                    self.connection.execute(
+                        "INSERT INTO archive_target.archive_state VALUES (?, 'moving', ?, 0)", (term, upper))
+            upper, last = self.connection.execute(
+                "SELECT upper_rowid, last_rowid FROM archive_target.archive_state").fetchone()
+            total = self.connection.execute(
+                "SELECT COUNT(*) FROM main.registrations WHERE rowid <= ?", (upper,)).fetchone()[0]
+            # Rows an interrupted run copied but did not get to delete
+            moved = self._delete_archived(last)
+            while True:
+                # Committed to the term file alone...
+                with self.connection:
+                    copied = self.connection.execute("""
+                        INSERT OR IGNORE INTO archive_target.registrations (source_rowid, student_id, course_id)
+                        SELECT rowid, student_id, course_id FROM main.registrations
+                        WHERE rowid > ? AND rowid <= ? ORDER BY rowid LIMIT ?
+                    """, (last, upper, batch_size)).rowcount
+                    copied_to = self.connection.execute(
+                        "SELECT COALESCE(MAX(source_rowid), 0) FROM archive_target.registrations").fetchone()[0]
+                    done = copied_to >= upper or copied <= 0
+                    self.connection.execute(
+                        "UPDATE archive_target.archive_state SET last_rowid = ?, state = ?",
+                        (copied_to, "indexing" if done else "moving"))
+                last = copied_to
+                # ...before the main table drops the rows
+                moved += self._delete_archived(last)
+                if progress is not None:
+                    progress(moved, total)
+                if done:
+                    break
+        finally:
+            self.connection.execute("DETACH DATABASE archive_target")
+        self._finish_archive(term, vacuum, compress)
+        return moved
+
+    def _delete_archived(self, last):
+        # Deletes the main table's rows up to `last` that the term file holds; repeatable
+        with self.connection:
+            return max(self.connection.execute("""
+                DELETE FROM main.registrations WHERE rowid <= ? AND EXISTS (
+                    SELECT 1 FROM archive_target.registrations WHERE source_rowid = main.registrations.rowid)
+            """, (last,)).rowcount, 0)
+
+    def _finish_archive(self, term, vacuum, compress):
+        path = self.term_path(term)
+        connection = sqlite3.connect(path)
+        try:
+            # Indexes are built once at the end, which is faster than maintaining them per batch
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_registrations_student ON registrations (student_id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS idx_registrations_course ON registrations (course_id)")
+            connection.execute("UPDATE archive_state SET state = 'archived'")
+            connection.commit()
+            if vacuum:
+                connection.execute("VACUUM")
+        finally:
+            connection.close()
+        if compress:
+            with open(path, "rb") as source, gzip.open(path + ".gz", "wb") as target:
+                shutil.copyfileobj(source, target)
+            os.remove(path)
+
+    # Cross-term queries
+
+    def attach(self, terms=None):
+        """
+        Attaches archived terms read-only and rebuilds the all_registrations view.
+
+        Args:
+            terms (list of str): The terms to attach; all archived terms if None.
+
+        Raises:
+            ValueError: If more than MAX_ATTACHED_TERMS terms would be attached.
+        """
+        terms = self.terms() if terms is None else terms
+        wanted = [term for term in terms if term not in self.attached]
+        if len(self.attached) + len(wanted) > MAX_ATTACHED_TERMS:
+            raise ValueError(f"At most {MAX_ATTACHED_TERMS} terms can be attached at once")
+        for term in wanted:
+            if self._state(term) != "archived":
+                raise ValueError(f"Term {term} is not archived")
+            path = self.term_path(term)
+            if not os.path.exists(path):
+                path = self._decompress(term)
+            self.connection.execute("ATTACH DATABASE ? AS " + _schema_name(term),
+                                    (f"file:{os.path.abspath(path)}?mode=ro",))
+            self.attached[term] = path
+        self._refresh_view()
+
+    def detach(self, term):
+        """Detaches an attached term and rebuilds the all_registrations view."""
+        if term in self.attached:
+            del self.attached[term]
+            self._refresh_view()
+            self.connection.execute("DETACH DATABASE " + _schema_name(term))
+
+    def _decompress(self, term):
+        if self._cache is None:
+            self._cache = tempfile.mkdtemp(prefix="school_terms_")
+        path = os.path.join(self._cache, os.path.basename(self.term_path(term)))
+        if not os.path.exists(path):
+            with gzip.open(self.term_path(term) + ".gz", "rb") as source, open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+        return path
+
+    def _refresh_view(self):
+        selects = ["SELECT 'current' AS term, rowid AS registration_id, student_id, course_id FROM main.registrations"]
+        for term in sorted(self.attached):
+            selects.append(f"SELECT '{term}', source_rowid, student_id, course_id FROM {_schema_name(term)}.registrations")
+        self.connection.execute("DROP VIEW IF EXISTS temp.all_registrations")
+        self.connection.execute("CREATE TEMP VIEW all_registrations AS " + " UNION ALL ".join(selects))
+
+    def close(self):
+        self.connection.close()
+        if self._cache is not None:
+            shutil.rmtree(self._cache, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive registrations by term.")
+    parser.add_argument("--database", default=school_db.DATABASE_FILE)
+    parser.add_argument("--directory", default=None, help="Directory of the term files")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="Give the registrations table the AUTOINCREMENT row id archiving needs")
+    migrate.add_argument("--batch-size", type=int, default=10000)
+    archive = commands.add_parser("archive", help="Move the current term's registrations into a term file")
+    archive.add_argument("term")
+    archive.add_argument("--batch-size", type=int, default=10000)
+    archive.add_argument("--no-vacuum", action="store_true")
+    archive.add_argument("--compress", action="store_true")
+    commands.add_parser("list", help="List archived terms and their registration counts")
+    args = parser.parse_args()
+
+    store = TermStore(args.database, args.directory)
+    try:
+        if args.command == "migrate":
+            copied = store.migrate_registrations(
+                args.batch_size,
+                progress=lambda copied, total: print(f"\r{copied}/{total} registrations copied", end="", flush=True))
+            print(f"\nMigrated the registrations table ({copied} registrations copied)")
+        elif args.command == "archive":
+            moved = store.archive_current_term(
+                args.term, args.batch_size, not args.no_vacuum, args.compress,
+                progress=lambda moved, total: print(f"\r{moved}/{total} registrations moved", end="", flush=True))
+            print(f"\nArchived {moved} registrations into term {args.term}")
+        else:
+            terms = store.terms()
+            for start in range(0, len(terms), MAX_ATTACHED_TERMS):
+                chunk = terms[start:start + MAX_ATTACHED_TERMS]
+                store.attach(chunk)
+                for term, count in store.connection.execute(
+                        "SELECT term, COUNT(*) FROM all_registrations GROUP BY term ORDER BY term").fetchall():
+                    if term in chunk:
+                        print(f"{term}: {count}")
+                for term in chunk:
+                    store.detach(term)
+            print(f"current: {store.connection.execute('SELECT COUNT(*) FROM main.registrations').fetchone()[0]}")
+    except ValueError as e:
+        # A bad term name, an archived term or an unmigrated table: a usage error, not a crash
+        parser.error(str(e))
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
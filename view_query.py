@@ -0,0 +1,153 @@
+"""Sorting, Filtering and Keyset Pagination for the "View All" Tables
+
+Both applications describe each "View All" view with a spec dictionary, and this module
+turns a spec plus the user's sort and filter choices into SQL, so that sorting and
+filtering are done by SQLite using indexes instead of on the rows already loaded into
+the table widget.
+
+Pages are read with keyset pagination: the next page starts after the sort key of the
+last row shown, e.g. `WHERE (age, id) > (?, ?) ORDER BY age, id LIMIT ?`, so reading any
+page costs an index seek plus one page of rows, however deep the user has paged. The
+first sort column may be NULL (an unset age): SQLite sorts NULLs before every value, and
+a row-value comparison with a NULL is never true, so the rows with a NULL first column
+are read by a query of their own (`age IS NULL AND id > ?`), which also seeks the index.
+
+A view spec has the following keys:
+    headers (list of str): Column headers shown to the user.
+    columns (str): The SELECT list; its first column is the row id.
+    source (str): The table or view the rows are read from.
+    id (str): The column holding the row id in `source` (defaults to "id").
+    sorts (dict): Sort label -> list of columns. The columns must identify a row (end
+        with the row id or another unique column) so that every sort key is unique; all
+        columns are sorted in the same direction. Only the first column may be NULL.
+    default_sort (tuple): (sort label, descending) used when no sort is chosen.
+    filters (dict): Filter name -> column, for the filters the view supports:
+        "name" (prefix match), "id" (prefix match), "age" (range) and "email" (domain).
+
+Functions:
+    where_clause(spec, filters): Builds the WHERE conditions and parameters for the filters.
+    fetch_page(cursor, spec, sort, descending, filters, after, limit): Reads one page of rows.
+    fetch_row(cursor, spec, row_id, filters): Reads one row if it matches the filters.
+    email_domain(column): The SQL expression used for (and indexed by) the email domain filter.
+"""
+
+
+def email_domain(column):
+    """
+    Returns the SQL expression extracting the domain from an email column.
+
+    Indexes created on this exact expression are used by the "email" filter.
+    """
+    return f"substr({column}, instr({column}, '@') + 1)"
+
+
+def _prefix_bounds(prefix):
+    # 'abc' matches ['abc', 'abc\U0010ffff'), which SQLite can answer with an index range scan
+    return prefix, prefix + "\U0010ffff"
+
+
+def where_clause(spec, filters):
+    """
+    Builds the WHERE conditions for the given filters.
+
+    Args:
+        spec (dict): The view spec.
+        filters (dict): Any of "name" and "id" (prefixes), "age_min" and "age_max" (ints)
+            and "email_domain" (str). Empty values are ignored.
+
+    Returns:
+        tuple: A list of SQL conditions and the list of their parameters.
+
+    Raises:
+        ValueError: If a filter is not supported by the view.
+    """
+    supported = spec.get("filters", {})
+    conditions = []
+    params = []
+    for name, value in (filters or {}).items():
+        if value is None or value == "":
+            continue
+        key = "age" if name in ("age_min", "age_max") else "email" if name == "email_domain" else name
+        if key not in supported:
+            raise ValueError(f"This view cannot be filtered by {key}")
+        column = supported[key]
+        if name in ("name", "id"):
+            conditions.append(f"{column} >= ? AND {column} < ?")
+            params.extend(_prefix_bounds(value))
+        elif name == "age_min":
+            conditions.append(f"{column} >= ?")
+            params.append(value)
+        elif name == "age_max":
+            conditions.append(f"{column} <= ?")
+            params.append(value)
+        elif name == "email_domain":
+            conditions.append(f"{email_domain(column)} = ?")
+            params.append(value)
+        else:
+            raise ValueError(f"Unknown filter {name}")
+    return conditions, params
+
+
+def _after_conditions(key_columns, after, descending):
+    # The conditions selecting the rows sorted after the key `after`, as (condition,
+    # parameters) for each part of the order still to come: the NULLs of the first column
+    # come first when ascending and last when descending
+    first, rest = key_columns[0], key_columns[1:]
+    operator = "<" if descending else ">"
+    if after[0] is not None:
+        parts = [(f"({', '.join(key_columns)}) {operator} ({', '.join('?' for _ in key_columns)})", list(after))]
+        return parts + [(f"{first} IS NULL", [])] if descending else parts
+    parts = []
+    if rest:
+        parts.append((f"{first} IS NULL AND ({', '.join(rest)}) {operator} ({', '.join('?' for _ in rest)})",
+                      list(after[1:])))
+    return parts if descending else parts + [(f"{first} IS NOT NULL", [])]
+
+
+def fetch_page(cursor, spec, sort=None, descending=None, filters=None, after=None, limit=100):
+    """
+    Reads one page of a view.
+
+    Args:
+        cursor (sqlite3.Cursor): The cursor used to run the query.
+        spec (dict): The view spec.
+        sort (str): A key of spec["sorts"]; the default sort if None.
+        descending (bool): Sort direction; the default sort's direction if None.
+        filters (dict): See where_clause().
+        after (tuple): The key returned with the previous page, or None for the first page.
+        limit (int): The maximum number of rows returned.
+
+    Returns:
+        tuple: The list of rows and the key to pass as `after` for the next page
+        (None if this is the last page).
+    """
+    default_sort, default_descending = spec["default_sort"]
+    if sort is None:
+        sort = default_sort
+        if descending is None:
+            descending = default_descending
+    descending = bool(descending)
+    key_columns = spec["sorts"][sort]
+    conditions, params = where_clause(spec, filters)
+    parts = [(None, [])] if after is None else _after_conditions(key_columns, after, descending)
+    direction = "DESC" if descending else "ASC"
+    rows = []
+    for condition, after_params in parts:
+        part_conditions = conditions + [condition] if condition else conditions
+        query = (f"SELECT {spec['columns']}, {', '.join(key_columns)} FROM {spec['source']}"
+                 + (f" WHERE {' AND '.join(part_conditions)}" if part_conditions else "")
+                 + f" ORDER BY {', '.join(f'{column} {direction}' for column in key_columns)} LIMIT ?")
+        rows.extend(cursor.execute(query, params + after_params + [limit - len(rows)]).fetchall())
+        if len(rows) == limit:
+            break
+    width = len(spec["headers"])
+    next_after = tuple(rows[-1][width:]) if len(rows) == limit else None
+    return [row[:width] for row in rows], next_after
+
+
+def fetch_row(cursor, spec, row_id, filters=None):
+    """Reads the row of a view with the given row id, or returns None if it does not match the filters."""
+    conditions, params = where_clause(spec, filters)
+    conditions.insert(0, f"{spec.get('id', 'id')} = ?")
+    query = f"SELECT {spec['columns']} FROM {spec['source']} WHERE {' AND '.join(conditions)}"
+    return cursor.execute(query, [row_id] + params).fetchone()